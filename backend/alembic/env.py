@@ -15,6 +15,7 @@ sys.path.append(os.getcwd())
 from app.core.config import settings
 from app.models.base import Base
 from app.models.category import Category, MCPServer
+from app.models.coordination import CoordinationJob, CoordinationLease
 
 config = context.config
 
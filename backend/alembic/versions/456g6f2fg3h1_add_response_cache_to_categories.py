@@ -0,0 +1,30 @@
+"""Add response cache settings to categories
+
+Revision ID: 456g6f2fg3h1
+Revises: 345f5e1ef2g0
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '456g6f2fg3h1'
+down_revision: Union[str, Sequence[str], None] = '345f5e1ef2g0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add response_cache_enabled and response_cache_ttl columns to categories table."""
+    op.add_column('categories', sa.Column('response_cache_enabled', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('categories', sa.Column('response_cache_ttl', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove response cache columns from categories table."""
+    op.drop_column('categories', 'response_cache_ttl')
+    op.drop_column('categories', 'response_cache_enabled')
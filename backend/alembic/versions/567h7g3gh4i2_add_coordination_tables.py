@@ -0,0 +1,51 @@
+"""Add coordination lease and job tables
+
+Revision ID: 567h7g3gh4i2
+Revises: 456g6f2fg3h1
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '567h7g3gh4i2'
+down_revision: Union[str, Sequence[str], None] = '456g6f2fg3h1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create coordination_leases and coordination_jobs tables."""
+    op.create_table('coordination_leases',
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('owner', sa.String(length=255), nullable=False),
+    sa.Column('expires_at', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('coordination_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('queue', sa.String(length=255), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('owner', sa.String(length=255), nullable=True),
+    sa.Column('lease_expires_at', sa.Float(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_coordination_jobs_queue'), 'coordination_jobs', ['queue'], unique=False)
+    op.create_index(op.f('ix_coordination_jobs_status'), 'coordination_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop coordination tables."""
+    op.drop_index(op.f('ix_coordination_jobs_status'), table_name='coordination_jobs')
+    op.drop_index(op.f('ix_coordination_jobs_queue'), table_name='coordination_jobs')
+    op.drop_table('coordination_jobs')
+    op.drop_table('coordination_leases')
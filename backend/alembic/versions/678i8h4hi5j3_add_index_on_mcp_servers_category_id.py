@@ -0,0 +1,27 @@
+"""Add index on mcp_servers.category_id
+
+Revision ID: 678i8h4hi5j3
+Revises: 567h7g3gh4i2
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '678i8h4hi5j3'
+down_revision: Union[str, Sequence[str], None] = '567h7g3gh4i2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index the foreign key used to load a category's servers and to check references when one is deleted."""
+    op.create_index(op.f('ix_mcp_servers_category_id'), 'mcp_servers', ['category_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the mcp_servers.category_id index."""
+    op.drop_index(op.f('ix_mcp_servers_category_id'), table_name='mcp_servers')
@@ -1,31 +1,121 @@
-from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from typing import Awaitable, Callable, List, Any, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from app.api import deps
-from app.models.category import Category
-from app.schemas.category import CategoryCreate, Category as CategorySchema
+from app.core.config import settings
+from app.core.metrics import CATEGORY_LIST_CACHE_LOOKUPS
+from app.models.category import Category, MCPServer
+from app.schemas.category import CategoryCreate, CategorySummary, Category as CategorySchema
+from app.services.category_cache import commit_category_change, get_category_cache
+from app.services.category_list_cache import etag_matches, get_category_list_cache
 from app.services.llm_factory import LLMFactory
 from app.services.prompt_enhancer import PromptEnhancer
+from app.services.response_cache import get_response_cache
 from langchain_core.messages import HumanMessage
 
 router = APIRouter()
 
+_full_list = TypeAdapter(List[CategorySchema])
+_summary_list = TypeAdapter(List[CategorySummary])
+
+
+async def _listing_response(
+    request: Request, key: Tuple, fetch: Callable[[], Awaitable[Tuple[bytes, Optional[int]]]],
+) -> Response:
+    """Serve a listing page from the cache (or fetch it), with ETag, If-None-Match and a next-page Link."""
+    cache = get_category_list_cache()
+    listing = cache.get(key)
+    if listing is None:
+        body, next_cursor = await fetch()
+        listing = cache.put(key, body, next_cursor)
+
+    headers = {"ETag": listing.etag, "Cache-Control": "no-cache"}
+    if listing.next_cursor is not None:
+        next_url = request.url.include_query_params(after=listing.next_cursor).remove_query_params("skip")
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    if etag_matches(request.headers.get("if-none-match"), listing.etag):
+        CATEGORY_LIST_CACHE_LOOKUPS.labels("not_modified").inc()
+        return Response(status_code=304, headers=headers)
+    return Response(listing.body, media_type="application/json", headers=headers)
+
+
+def _page(query, after: Optional[int], limit: int, skip: Optional[int]):
+    """Keyset pagination on id; skip (offset) is kept for old clients."""
+    query = query.order_by(Category.id).limit(limit)
+    if skip is not None:
+        return query.offset(skip)
+    if after is not None:
+        query = query.where(Category.id > after)
+    return query
+
+
+def _next_cursor(ids: List[int], limit: int, skip: Optional[int]) -> Optional[int]:
+    return ids[-1] if len(ids) == limit and skip is None else None
+
+
+_after = Query(None, description="Return categories with an id greater than this (the next cursor)")
+_limit = Query(100, ge=1, le=settings.CATEGORY_LIST_MAX_LIMIT)
+_skip = Query(None, ge=0, deprecated=True, description="Offset pagination; use after instead")
+
+
 @router.get("/", response_model=List[CategorySchema])
 async def read_categories(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    after: Optional[int] = _after,
+    limit: int = _limit,
+    skip: Optional[int] = _skip,
+) -> Any:
+    """
+    Retrieve categories with their MCP servers, ordered by id.
+
+    The Link header points at the next page while there is one.
+    """
+    async def fetch():
+        query = _page(select(Category).options(selectinload(Category.mcp_servers)), after, limit, skip)
+        categories = (await db.execute(query)).scalars().all()
+        body = _full_list.dump_json(_full_list.validate_python(categories, from_attributes=True))
+        return body, _next_cursor([c.id for c in categories], limit, skip)
+
+    return await _listing_response(request, ("full", after, limit, skip), fetch)
+
+
+@router.get("/summary", response_model=List[CategorySummary])
+async def read_category_summaries(
+    request: Request,
     db: AsyncSession = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    after: Optional[int] = _after,
+    limit: int = _limit,
 ) -> Any:
     """
-    Retrieve categories with their MCP servers.
+    List categories without prompts or credentials, with their server count.
     """
-    result = await db.execute(select(Category).options(selectinload(Category.mcp_servers)).offset(skip).limit(limit))
-    categories = result.scalars().all()
-    return categories
+    async def fetch():
+        server_count = (
+            select(func.count(MCPServer.id))
+            .where(MCPServer.category_id == Category.id)
+            .correlate(Category)
+            .scalar_subquery()
+        )
+        query = _page(select(
+            Category.id,
+            Category.name,
+            Category.llm_provider,
+            Category.llm_model,
+            Category.response_cache_enabled,
+            server_count.label("server_count"),
+            Category.updated_at,
+        ), after, limit, None)
+        rows = (await db.execute(query)).all()
+        summaries = [CategorySummary.model_validate(row._mapping) for row in rows]
+        return _summary_list.dump_json(summaries), _next_cursor([s.id for s in summaries], limit, None)
+
+    return await _listing_response(request, ("summary", after, limit), fetch)
 
 @router.post("/", response_model=CategorySchema)
 async def create_category(
@@ -58,9 +148,12 @@ async def create_category(
         llm_api_version=category_in.llm_api_version,
         llm_deployment_name=category_in.llm_deployment_name,
         llm_region=category_in.llm_region,
+        response_cache_enabled=category_in.response_cache_enabled,
+        response_cache_ttl=category_in.response_cache_ttl,
     )
     db.add(category)
-    await db.commit()
+    await db.flush()
+    await commit_category_change(db, category.id)
     result = await db.execute(
         select(Category)
         .where(Category.id == category.id)
@@ -69,6 +162,46 @@ async def create_category(
     return result.scalars().first()
 
 
+class ResponseCacheSettings(BaseModel):
+    enabled: bool
+    ttl_seconds: Optional[int] = None
+
+
+class ResponseCacheInvalidated(BaseModel):
+    invalidated: int
+
+
+@router.put("/{category_id}/response-cache", response_model=CategorySchema)
+async def update_response_cache(
+    category_id: int,
+    body: ResponseCacheSettings,
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    """Enable or disable the semantic response cache for a category and set its TTL."""
+    result = await db.execute(
+        select(Category)
+        .where(Category.id == category_id)
+        .options(selectinload(Category.mcp_servers))
+    )
+    category = result.scalars().first()
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    category.response_cache_enabled = body.enabled
+    category.response_cache_ttl = body.ttl_seconds
+    await commit_category_change(db, category_id)
+    await db.refresh(category)
+    if not body.enabled:
+        get_response_cache().invalidate(category_id)
+    return category
+
+
+@router.delete("/{category_id}/response-cache", response_model=ResponseCacheInvalidated)
+async def invalidate_response_cache(category_id: int) -> Any:
+    """Drop all cached responses for a category (on this worker)."""
+    return ResponseCacheInvalidated(invalidated=get_response_cache().invalidate(category_id))
+
+
 class EnhancePromptRequest(BaseModel):
     prompt: str
 
@@ -100,8 +233,7 @@ async def enhance_chat_prompt(
     db: AsyncSession = Depends(deps.get_db),
 ):
     """Enhance a user's chat message using the category's LLM."""
-    result = await db.execute(select(Category).where(Category.id == category_id))
-    category = result.scalars().first()
+    category = await get_category_cache().get(db, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
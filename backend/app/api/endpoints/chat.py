@@ -1,150 +1,115 @@
-import json
+import asyncio
 import logging
 import traceback
+import uuid
+from typing import Optional
 from contextlib import AsyncExitStack
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-import httpx
-
-import os
-
-from mcp import ClientSession
-from mcp.client.sse import sse_client
-from mcp.client.streamable_http import streamable_http_client
-from mcp.client.stdio import stdio_client, StdioServerParameters
 
 from app.api import deps
-from app.models.category import Category
-from app.services.agent import AgentService
-from app.services.mcp_client import MCPClient
+from app.core.config import settings
+from app.core.log import preview
+from app.core.metrics import ACTIVE_WEBSOCKETS
+from app.schemas.task_graph import TaskGraph
+from app.services.category_cache import get_category_cache
+from app.services.coordinator import get_coordinator
+from app.services.dispatcher import MessageDispatcher
+from app.services.outbound import OutboundQueue
 from app.services.task_decomposer import TaskDecomposer
 from app.services.task_executor import TaskExecutor
-from app.services.context_service import ContextService
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from app.services.task_runs import TaskChannel, TaskRun, get_task_registry
+from app.services.conversation_memory import ConversationMemory
+from app.services.response_cache import get_response_cache
+from app.services.tool_sessions import get_tool_session_pool
+from app.services.tool_output import READ_TOOL_OUTPUT
+from app.services.ws_protocol import WireCodec, negotiate
+from langchain_core.messages import SystemMessage, AIMessage, ToolMessage
 
 logger = logging.getLogger("app.chat")
 
 router = APIRouter()
 
+# Dispatcher lane of chat turns: they mutate the conversation history, so run one at a time
+CHAT_LANE = "chat"
+
 
 @router.websocket("/ws/chat/{category_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
     category_id: int,
+    conversation_id: Optional[str] = None,
     db: AsyncSession = Depends(deps.get_db),
 ):
-    await websocket.accept()
+    # Clients that offer a compact subprotocol get diffed (and possibly msgpack) frames
+    codec = WireCodec(negotiate(websocket))
+    await websocket.accept(subprotocol=codec.subprotocol)
+    ACTIVE_WEBSOCKETS.inc()
+    try:
+        # All sends go through a bounded queue so a slow client never stalls the session
+        async with OutboundQueue(websocket, codec=codec).running() as outbound:
+            await _run_chat_session(websocket, outbound, codec, category_id, conversation_id or uuid.uuid4().hex, db)
+    finally:
+        ACTIVE_WEBSOCKETS.dec()
+
+
+async def _run_chat_session(
+    websocket: WebSocket,
+    outbound: OutboundQueue,
+    codec: WireCodec,
+    category_id: int,
+    conversation_id: str,
+    db: AsyncSession,
+):
+    """
+    Serve one chat connection: open MCP sessions, then handle messages until disconnect.
+    conversation_id is the client's id for the conversation, kept across its reconnects.
+    """
     try:
-        # Fetch category with MCP servers eagerly loaded
-        result = await db.execute(
-            select(Category)
-            .where(Category.id == category_id)
-            .options(selectinload(Category.mcp_servers))
-        )
-        category = result.scalars().first()
+        # Category and MCP server config, usually from this worker's cache
+        category = await get_category_cache().get(db, category_id)
         if not category:
-            await websocket.send_json({"type": "error", "content": "Category not found"})
+            await outbound.send_json({"type": "error", "content": "Category not found"})
+            await outbound.drain()
             await websocket.close()
             return
 
-        # Open persistent MCP sessions for all servers in the category.
         async with AsyncExitStack() as stack:
-            mcp_sessions = {}
-            mcp_errors = {}  # server_id -> error message
-            for server in category.mcp_servers:
-                try:
-                    config = server.resource_config or {}
-                    if server.type == 'stdio':
-                        # Merge user-provided env with parent process env
-                        # so PATH and other essentials are preserved.
-                        stdio_env = None
-                        user_env = config.get("env")
-                        if user_env:
-                            stdio_env = {**os.environ, **user_env}
-                        server_params = StdioServerParameters(
-                            command=config.get("command", ""),
-                            args=config.get("args", []),
-                            env=stdio_env,
-                        )
-                        read, write = await stack.enter_async_context(
-                            stdio_client(server_params)
-                        )
-                    elif server.type == 'http':
-                        headers = MCPClient._config_to_headers(config)
-                        http_client = None
-                        if headers:
-                            http_client = await stack.enter_async_context(
-                                httpx.AsyncClient(headers=headers)
-                            )
-                        read, write, _ = await stack.enter_async_context(
-                            streamable_http_client(server.url, http_client=http_client)
-                        )
-                    else:  # 'sse' or default
-                        headers = MCPClient._config_to_headers(config)
-                        read, write = await stack.enter_async_context(
-                            sse_client(server.url, headers=headers)
-                        )
+            # The conversation lease records which worker holds the conversation; one open on
+            # another worker (e.g. a reconnect routed elsewhere before the old socket dropped) is refused
+            coordinator = get_coordinator()
+            try:
+                await stack.enter_async_context(coordinator.hold(f"conversation:{conversation_id}"))
+            except RuntimeError:
+                owner = await coordinator.lease_owner(f"conversation:{conversation_id}")
+                await outbound.send_json({
+                    "type": "error",
+                    "content": f"Conversation {conversation_id} is open on worker {owner}",
+                    "worker": owner,
+                })
+                await outbound.drain()
+                await websocket.close()
+                return
 
-                    session = await stack.enter_async_context(
-                        ClientSession(read, write)
-                    )
-                    await session.initialize()
-                    mcp_sessions[server.id] = session
-                    logger.info("Connected to MCP server: %s (%s)", server.name, server.type)
-                except Exception as e:
-                    logger.error("Failed to connect to MCP server %s (%s): %s", server.name, server.url, e)
-                    mcp_errors[server.id] = str(e)
-
-            # Track connection results for each server
-            connection_status = []
-            for server in category.mcp_servers:
-                session = mcp_sessions.get(server.id)
-                if session:
-                    try:
-                        result = await session.list_tools()
-                        tool_count = len(result.tools)
-                    except Exception:
-                        tool_count = 0
-                    connection_status.append({
-                        "id": server.id,
-                        "name": server.name,
-                        "connected": True,
-                        "error": None,
-                        "tool_count": tool_count,
-                    })
-                else:
-                    connection_status.append({
-                        "id": server.id,
-                        "name": server.name,
-                        "connected": False,
-                        "error": mcp_errors.get(server.id, "Unknown connection error"),
-                        "tool_count": 0,
-                    })
+            # MCP sessions and agent of the category, shared with this worker's other connections and
+            # task runs; runs started here keep them open after the socket closes
+            tools = await get_tool_session_pool().acquire(category)
+            stack.callback(tools.release)
+            bundle = tools.bundle
 
             # Send connection status to frontend
-            await websocket.send_json({
+            await outbound.send_json({
                 "type": "mcp_connection_status",
-                "servers": connection_status,
+                "servers": tools.connection_status,
             })
 
-            # Build agent using persistent sessions
-            logger.info("Building agent for category %d (%s)", category.id, category.name)
-            bundle = await AgentService.get_agent_runnable_with_sessions(category, mcp_sessions)
-            logger.info("Agent ready with %d tools", len(bundle.tools))
-
-            # Collect tool metadata for the decomposer
+            # Collect tool metadata for the decomposer (subtasks always get the paging tool)
             available_tools = [
                 {"name": t.name, "description": t.description}
                 for t in bundle.tools
+                if t.name != READ_TOOL_OUTPUT
             ]
 
-            # Initialize services
-            context_service = ContextService()
-
-            # Initialize chat history with system prompt
-            chat_history = []
             user_defined_prompt = category.system_prompt or "You are a helpful AI assistant."
             
             enhanced_system_prompt = (
@@ -159,130 +124,294 @@ async def websocket_endpoint(
                 "Make reasonable assumptions based on your knowledge and any other available context, "
                 "clearly state what you assumed, and continue completing the task."
             )
-            chat_history.append(SystemMessage(content=enhanced_system_prompt))
+            # Tiered conversation memory: recent turns, recall and rolling summaries
+            memory = ConversationMemory(SystemMessage(content=enhanced_system_prompt), bundle.llm)
 
-            # Track active task executors
-            active_executors: dict[str, TaskExecutor] = {}
+            # Task runs outlive this socket: they keep executing and buffer their messages
+            # until the client reconnects and sends resume_task
+            task_runs = get_task_registry()
 
-            try:
-                while True:
-                    raw = await websocket.receive_text()
-                    try:
-                        msg = json.loads(raw)
-                    except json.JSONDecodeError:
-                        # Fallback: treat as plain text chat message
-                        msg = {"type": "chat_message", "content": raw}
+            def new_task_run(task_graph: TaskGraph, chat_history: list, confirmed: bool) -> TaskRun:
+                channel = TaskChannel(task_graph.task_id, outbound)
+                executor = TaskExecutor(
+                    task_graph=task_graph,
+                    all_tools=bundle.tools,
+                    llm=bundle.llm,
+                    chat_history=chat_history,
+                    channel=channel,
+                    coordinator=coordinator,
+                    queue=tools.queue,
+                )
+                # The run holds the tool sessions until it finishes, is cancelled or is evicted
+                tools.retain()
+                run = TaskRun(executor, channel, category.id, confirmed=confirmed, on_finish=tools.release)
+                task_runs.add(run)
+                return run
 
-                    msg_type = msg.get("type", "chat_message")
+            def find_task_run(task_id: str) -> Optional[TaskRun]:
+                run = task_runs.get(task_id)
+                return run if run and run.category_id == category.id else None
 
-                    if msg_type == "chat_message":
-                        content = msg.get("content", "")
-                        logger.info("[User Message] %s", content[:200])
-                        
-                        # Compress context if needed
-                        chat_history = await context_service.compress_context(chat_history, content)
-                        
-                        chat_history.append(HumanMessage(content=content))
+            async def report_missing_task(task_id: str, content: str):
+                # Runs live on the worker that started them; name it so the client can reconnect there
+                owner = await task_runs.owner_of(task_id)
+                if owner:
+                    await outbound.send_json({
+                        "type": "error",
+                        "content": f"Task {task_id} runs on worker {owner}; reconnect to that worker to reach it",
+                        "task_id": task_id,
+                        "worker": owner,
+                    })
+                else:
+                    await outbound.send_json({"type": "error", "content": content})
 
-                        try:
-                            # Phase 1: Ask LLM whether to decompose
-                            logger.info("Checking if task decomposition is needed...")
-                            task_graph = await TaskDecomposer.maybe_decompose(
-                                user_message=content,
-                                chat_history=chat_history,
-                                category=category,
-                                available_tools=available_tools,
-                            )
+            async def handle_chat_message(msg: dict):
+                content = msg.get("content", "")
+                logger.info("[User Message] %s", preview(content, 200))
 
-                            if task_graph:
-                                logger.info("Task decomposed into %d subtasks (task_id=%s)", len(task_graph.subtasks), task_graph.task_id)
-                                for s in task_graph.subtasks:
-                                    logger.info("  subtask: %s [%s] deps=%s", s.name, s.executor.value, s.dependencies)
-
-                                # Send graph to frontend
-                                await websocket.send_json({
-                                    "type": "task_graph_created",
-                                    "task_id": task_graph.task_id,
-                                    "user_message": content,
-                                    "subtasks": [s.model_dump() for s in task_graph.subtasks],
-                                })
-
-                                # Create executor and store it, but DO NOT start yet
-                                executor = TaskExecutor(
-                                    task_graph=task_graph,
-                                    all_tools=bundle.tools,
-                                    llm=bundle.llm,
-                                    chat_history=chat_history,
-                                    websocket=websocket,
-                                )
-                                active_executors[task_graph.task_id] = {
-                                    "executor": executor,
-                                    "confirmed": False
-                                }
-                                logger.info("Task %s is pending user approval", task_graph.task_id)
-                            else:
-                                # Normal chat flow
-                                logger.info("No decomposition — running normal chat flow")
-                                input_state = {"messages": chat_history}
-                                final_state = await bundle.graph.ainvoke(input_state)
-
-                                last_msg = final_state["messages"][-1]
-                                response_text = last_msg.content
-
-                                chat_history = final_state["messages"]
-                                logger.info("[Chat Response] %s", str(response_text)[:300])
-
-                                await websocket.send_json({
-                                    "type": "chat_response",
-                                    "content": str(response_text),
-                                })
-                        except Exception as e:
-                            logger.error("Error processing message: %s\n%s", e, traceback.format_exc())
-                            chat_history.pop()
-                            try:
-                                await websocket.send_json({
-                                    "type": "error",
-                                    "content": str(e),
-                                })
-                            except:
-                                pass
-
-                    elif msg_type == "start_task":
-                        task_id = msg.get("task_id")
-                        task_data = active_executors.get(task_id)
-                        if task_data and not task_data["confirmed"]:
-                            logger.info("Starting task %s after user approval", task_id)
-                            task_data["confirmed"] = True
-                            await task_data["executor"].execute_ready_subtasks()
-                        else:
-                            await websocket.send_json({
-                                "type": "error",
-                                "content": f"Task {task_id} not found or already started",
+                # Assemble the prompt from memory within the token budget
+                memory.start_turn(content)
+
+                # Task whose subtasks were announced while the plan was still streaming
+                announced_task_id = None
+                # Executor started while the plan was still streaming (auto-start mode)
+                streamed_run = None
+                # Set once a task run owns the plan (started, or waiting for approval)
+                handed_over = False
+
+                async def retract_plan():
+                    """Stop subtasks started for an abandoned plan and tell the client to drop the ones it was shown."""
+                    nonlocal announced_task_id, streamed_run
+                    task_id, run = announced_task_id, streamed_run
+                    announced_task_id = streamed_run = None
+                    if run is not None:
+                        run.cancel()
+                        task_runs.remove(run.task_id)
+                    if task_id is not None and not outbound.closed:
+                        await outbound.send_json({
+                            "type": "task_graph_cancelled",
+                            "task_id": task_id,
+                        })
+
+                try:
+                    chat_history = await memory.build_messages(content)
+
+                    # Serve repeated standalone questions from the category's response cache
+                    use_cache = category.response_cache_enabled and (
+                        memory.turn_count == 1 or not settings.RESPONSE_CACHE_FIRST_TURN_ONLY
+                    )
+                    if use_cache:
+                        cached = await get_response_cache().lookup(category.id, enhanced_system_prompt, content)
+                        if cached is not None:
+                            memory.extend([AIMessage(content=cached)])
+                            await outbound.send_json({
+                                "type": "chat_response",
+                                "content": cached,
+                                "cached": True,
                             })
+                            return
+
+                    async def on_subtask(task_id, subtask):
+                        nonlocal announced_task_id, streamed_run
+                        announced_task_id = task_id
+                        await outbound.send_json({
+                            "type": "subtask_added",
+                            "task_id": task_id,
+                            "user_message": content,
+                            "subtask": subtask.model_dump(),
+                        })
+                        if not settings.TASK_AUTO_START:
+                            return
+                        if streamed_run is None:
+                            streamed_run = new_task_run(
+                                TaskGraph(task_id=task_id, user_message=content, subtasks=[]),
+                                chat_history,
+                                confirmed=True,
+                            )
+                            streamed_run.executor.planning = True
+                            logger.info("Task %s auto-started while planning", task_id)
+                        streamed_run.executor.add_subtask(subtask)
+
+                    # Phase 1: Ask LLM whether to decompose
+                    logger.info("Checking if task decomposition is needed...")
+                    task_graph = await TaskDecomposer.maybe_decompose(
+                        user_message=content,
+                        chat_history=chat_history,
+                        category=category,
+                        available_tools=available_tools,
+                        on_subtask=on_subtask if settings.DECOMPOSITION_STREAMING else None,
+                    )
+
+                    if announced_task_id is not None and not task_graph:
+                        # Planning failed after subtasks were announced (and, with auto-start, started)
+                        await retract_plan()
+
+                    if task_graph:
+                        logger.info("Task decomposed into %d subtasks (task_id=%s)", len(task_graph.subtasks), task_graph.task_id)
+                        for s in task_graph.subtasks:
+                            logger.debug("  subtask: %s [%s] deps=%s", s.name, s.executor.value, s.dependencies)
+
+                        run = streamed_run or new_task_run(
+                            task_graph, chat_history, confirmed=settings.TASK_AUTO_START,
+                        )
+
+                        # Send graph to frontend
+                        await run.channel.send_json({
+                            "type": "task_graph_created",
+                            "task_id": task_graph.task_id,
+                            "user_message": content,
+                            "subtasks": [s.model_dump() for s in task_graph.subtasks],
+                            "auto_started": settings.TASK_AUTO_START,
+                        })
 
-                    elif msg_type == "user_subtask_output":
-                        task_id = msg.get("task_id")
-                        subtask_id = msg.get("subtask_id")
-                        output = msg.get("output", "")
-
-                        task_data = active_executors.get(task_id)
-                        if task_data:
-                            executor = task_data["executor"]
-                            await executor.handle_user_output(subtask_id, output)
-                            if executor.is_complete():
-                                del active_executors[task_id]
+                        if settings.TASK_AUTO_START:
+                            run.spawn(run.executor.finish_planning(task_graph))
+                            handed_over = True
                         else:
-                            await websocket.send_json({
-                                "type": "error",
-                                "content": f"No active task found for task_id: {task_id}",
-                            })
+                            # Executor is registered, but DO NOT start yet
+                            logger.info("Task %s is pending user approval", task_graph.task_id)
+                            handed_over = True
+                    else:
+                        # Normal chat flow
+                        logger.info("No decomposition — running normal chat flow")
+                        input_state = {"messages": chat_history}
+                        final_state = await bundle.graph.ainvoke(input_state)
+
+                        last_msg = final_state["messages"][-1]
+                        response_text = last_msg.content
+
+                        new_messages = final_state["messages"][len(chat_history):]
+                        memory.extend(new_messages)
+
+                        # Only answers produced without tools are safe to reuse
+                        if use_cache and not any(
+                            isinstance(m, ToolMessage) or getattr(m, "tool_calls", None)
+                            for m in new_messages
+                        ):
+                            await get_response_cache().store(
+                                category.id, enhanced_system_prompt, content,
+                                str(response_text), ttl=category.response_cache_ttl,
+                            )
+                        logger.info("[Chat Response] %s", preview(response_text, 300))
+
+                        await outbound.send_json({
+                            "type": "chat_response",
+                            "content": str(response_text),
+                        })
+                except asyncio.CancelledError:
+                    # cancel_chat or a disconnect: drop the turn and retract an unfinished plan
+                    if not handed_over:
+                        await retract_plan()
+                    memory.discard_turn()
+                    raise
+                except Exception as e:
+                    logger.error("Error processing message: %s\n%s", e, traceback.format_exc())
+                    memory.discard_turn()
+                    if not handed_over:
+                        try:
+                            await retract_plan()
+                        except Exception:
+                            pass
+                    try:
+                        await outbound.send_json({
+                            "type": "error",
+                            "content": str(e),
+                        })
+                    except:
+                        pass
+
+            async def handle_start_task(msg: dict):
+                task_id = msg.get("task_id")
+                run = find_task_run(task_id)
+                if run and not run.confirmed:
+                    logger.info("Starting task %s after user approval", task_id)
+                    run.confirmed = True
+                    run.spawn(run.executor.execute_ready_subtasks())
+                else:
+                    await report_missing_task(task_id, f"Task {task_id} not found or already started")
+
+            async def handle_user_subtask_output(msg: dict):
+                task_id = msg.get("task_id")
+                subtask_id = msg.get("subtask_id")
+                output = msg.get("output", "")
+
+                run = find_task_run(task_id)
+                if run and run.status != "cancelled":
+                    run.spawn(run.executor.handle_user_output(subtask_id, output))
+                else:
+                    await report_missing_task(task_id, f"No active task found for task_id: {task_id}")
+
+            async def handle_resume_task(msg: dict):
+                # A reconnected client picks up a task: replay what it missed, then stream live
+                task_id = msg.get("task_id")
+                run = find_task_run(task_id)
+                if run:
+                    logger.info("Resuming task %s from seq %s", task_id, msg.get("after_seq", 0))
+                    await run.channel.attach(outbound, int(msg.get("after_seq", 0)))
+                else:
+                    await report_missing_task(task_id, f"No active task found for task_id: {task_id}")
+
+            async def handle_cancel_task(msg: dict):
+                task_id = msg.get("task_id")
+                run = find_task_run(task_id)
+                if run and run.status in ("pending_approval", "running"):
+                    logger.info("Cancelling task %s at the user's request", task_id)
+                    run.cancel()
+                    await run.channel.send_json({"type": "task_graph_cancelled", "task_id": task_id})
+                else:
+                    await report_missing_task(task_id, f"No active task found for task_id: {task_id}")
+
+            async def handle_cancel_chat(msg: dict):
+                if dispatcher.cancel_lane(CHAT_LANE):
+                    logger.info("Chat turn cancelled at the user's request")
+                    await outbound.send_json({"type": "chat_cancelled"})
+
+            # Task control messages run as soon as they arrive; chat turns wait for each other
+            handlers = {
+                "chat_message": (handle_chat_message, CHAT_LANE),
+                "start_task": (handle_start_task, None),
+                "user_subtask_output": (handle_user_subtask_output, None),
+                "resume_task": (handle_resume_task, None),
+                "cancel_task": (handle_cancel_task, None),
+                "cancel_chat": (handle_cancel_chat, None),
+            }
+
+            async def report_error(e: Exception):
+                await outbound.send_json({"type": "error", "content": str(e)})
+
+            dispatcher = MessageDispatcher(on_error=report_error)
+
+            try:
+                while True:
+                    # Text that is not JSON is treated as a plain chat message
+                    try:
+                        msg = await codec.receive(websocket)
+                    except ValueError as e:
+                        await outbound.send_json({"type": "error", "content": str(e)})
+                        continue
+
+                    msg_type = msg.get("type", "chat_message")
+                    if msg_type not in handlers:
+                        await outbound.send_json({"type": "error", "content": f"Unknown message type: {msg_type}"})
+                        continue
+                    handler, lane = handlers[msg_type]
+                    if not dispatcher.dispatch(lambda h=handler, m=msg: h(m), lane):
+                        await outbound.send_json({
+                            "type": "error",
+                            "content": f"Too many messages in progress, {msg_type} was dropped",
+                        })
 
             except WebSocketDisconnect:
                 logger.info("Client disconnected from category %d", category_id)
+            finally:
+                # Chat turns die with the connection; task runs keep going and buffer
+                await dispatcher.close()
+                task_runs.detach(outbound)
+                memory.close()
 
     except Exception as e:
         logger.error("Error in WebSocket setup: %s\n%s", e, traceback.format_exc())
         try:
-            await websocket.send_json({"type": "error", "content": str(e)})
+            await outbound.send_json({"type": "error", "content": str(e)})
         except:
             pass
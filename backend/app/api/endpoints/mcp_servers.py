@@ -6,6 +6,7 @@ from sqlalchemy.future import select
 from app.api import deps
 from app.models.category import MCPServer
 from app.schemas.mcp_server import MCPServerCreate, MCPServer as MCPServerSchema
+from app.services.category_cache import commit_category_change
 
 router = APIRouter()
 
@@ -26,7 +27,8 @@ async def create_mcp_server(
         resource_config=server_in.resource_config,
     )
     db.add(server)
-    await db.commit()
+    await db.flush()
+    await commit_category_change(db, server.category_id)
     await db.refresh(server)
     return server
 
@@ -45,5 +47,5 @@ async def delete_mcp_server(
         raise HTTPException(status_code=404, detail="MCP Server not found")
     
     await db.delete(server)
-    await db.commit()
+    await commit_category_change(db, server.category_id)
     return server
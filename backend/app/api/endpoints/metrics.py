@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+# Importing the module registers all collectors
+import app.core.metrics  # noqa: F401
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+def read_metrics() -> Response:
+    """
+    Prometheus scrape endpoint: LLM, tool, subtask, WebSocket and DB pool metrics.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
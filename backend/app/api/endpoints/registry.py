@@ -1,10 +1,9 @@
 from typing import List, Any, Dict
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 
 from app.api import deps
-from app.models.category import Category
+from app.services.category_cache import get_category_cache
 from app.services.registry import RegistryService
 
 router = APIRouter()
@@ -17,8 +16,7 @@ async def suggest_servers(
     """
     Suggest MCP servers based on the category's LLM configuration.
     """
-    result = await db.execute(select(Category).where(Category.id == category_id))
-    category = result.scalars().first()
+    category = await get_category_cache().get(db, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return await RegistryService.suggest_servers(category)
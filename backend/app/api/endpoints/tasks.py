@@ -0,0 +1,39 @@
+from typing import Any, Dict, List
+from fastapi import APIRouter, HTTPException
+
+from app.schemas.task_graph import TaskStatus
+from app.services.task_runs import TaskRun, get_task_registry
+
+router = APIRouter()
+
+
+async def _get_run(task_id: str) -> TaskRun:
+    # Runs are kept by the worker that started them; a request routed to another worker is
+    # answered with 421 naming the worker that has the task, so the client can retry there
+    registry = get_task_registry()
+    run = registry.get(task_id)
+    if not run:
+        owner = await registry.owner_of(task_id)
+        if owner:
+            raise HTTPException(
+                status_code=421, detail=f"Task runs on worker {owner}", headers={"X-Task-Worker": owner},
+            )
+        raise HTTPException(status_code=404, detail="Task not found")
+    return run
+
+
+@router.get("/{task_id}", response_model=TaskStatus)
+async def read_task(task_id: str) -> Any:
+    """
+    Status of a task graph, its subtasks and, once complete, the final summary.
+    Tasks keep running after the client disconnects.
+    """
+    return (await _get_run(task_id)).snapshot()
+
+
+@router.get("/{task_id}/events", response_model=List[Dict[str, Any]])
+async def read_task_events(task_id: str, after: int = 0) -> Any:
+    """
+    Buffered WebSocket messages of a task with a sequence number above `after`.
+    """
+    return (await _get_run(task_id)).channel.events_after(after)
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.core.metrics import COMPUTE_POOL_PENDING
+
+logger = logging.getLogger("app.compute_pool")
+
+
+class ComputePoolBusy(RuntimeError):
+    """Raised when no slot frees up in the compute pool within the submit timeout."""
+
+
+class ComputePool:
+    """
+    Bounded executor for CPU-bound work (embeddings, FAISS) kept off the event loop.
+
+    A thread pool suits torch/FAISS, which release the GIL; a process pool
+    can be selected for work that does not. At most `max_pending` jobs may be
+    queued or running; callers beyond that wait for a slot (backpressure) and
+    get ComputePoolBusy if none frees up within `submit_timeout` seconds.
+    Functions submitted to a process pool must be picklable module-level
+    callables.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = 2,
+        max_pending: int = 32,
+        submit_timeout: float = 30.0,
+    ):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.submit_timeout = submit_timeout
+        self._executor: Optional[Executor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = asyncio.Semaphore(max_pending)
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Jobs currently queued or running."""
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="compute"
+                    )
+                logger.info("Started %s compute pool with %d workers", self.kind, self.workers)
+            return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) on the pool, waiting for a free slot if the pool is saturated."""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.submit_timeout)
+        except asyncio.TimeoutError:
+            raise ComputePoolBusy(
+                f"Compute pool saturated ({self.max_pending} pending jobs) for {self.submit_timeout}s"
+            )
+
+        self._pending += 1
+        COMPUTE_POOL_PENDING.set(self._pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+            COMPUTE_POOL_PENDING.set(self._pending)
+            self._slots.release()
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+_compute_pool: Optional[ComputePool] = None
+
+
+def get_compute_pool() -> ComputePool:
+    """Return the process-wide compute pool, configured from settings."""
+    global _compute_pool
+    if _compute_pool is None:
+        _compute_pool = ComputePool(
+            kind=settings.COMPUTE_POOL_KIND,
+            workers=settings.COMPUTE_POOL_WORKERS,
+            max_pending=settings.COMPUTE_POOL_MAX_PENDING,
+            submit_timeout=settings.COMPUTE_POOL_SUBMIT_TIMEOUT,
+        )
+    return _compute_pool
+
+
+def shutdown_compute_pool():
+    global _compute_pool
+    if _compute_pool is not None:
+        _compute_pool.shutdown()
+        _compute_pool = None
@@ -1,16 +1,32 @@
+import atexit
 import logging
 import sys
 
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
-from typing import Optional
+from typing import Dict, Optional
+
+from app.core.log import JsonFormatter, build_queue_logging
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Vantage Agent"
     API_V1_STR: str = "/api/v1"
     DATABASE_URL: str
+
+    # Database engine / connection pool
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # seconds before a connection is replaced
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statement cache; 0 for pgbouncer
+
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"  # 'text' or 'json'
+    LOG_SAMPLE_RATE: float = 1.0  # fraction of DEBUG/INFO records kept
+    LOG_BUDGETS: Dict[str, int] = {}  # logger name prefix -> max DEBUG/INFO records per second
 
     # OpenAI Direct
     OPENAI_API_KEY: Optional[str] = None
@@ -42,6 +58,111 @@ class Settings(BaseSettings):
     # Phoenix Tracing
     PHOENIX_COLLECTOR_ENDPOINT: Optional[str] = "http://localhost:6006/v1/traces"
     PHOENIX_PROJECT_NAME: str = "vantage"
+    TRACING_ENABLED: bool = True
+    TRACING_SAMPLER: str = "ratio"  # 'ratio', 'errors' (errored spans only) or 'slow' (slow or errored spans)
+    TRACING_SAMPLE_RATIO: float = 1.0  # used by the 'ratio' sampler
+    TRACING_SLOW_THRESHOLD_MS: int = 2000  # used by the 'slow' sampler
+    TRACING_MAX_QUEUE_SIZE: int = 2048  # spans beyond this are dropped, never blocking
+    TRACING_EXPORT_BATCH_SIZE: int = 512
+    TRACING_SCHEDULE_DELAY_MS: int = 5000
+    TRACING_EXPORT_TIMEOUT: float = 10.0  # seconds per export request
+    TRACING_STARTUP_BUDGET: float = 2.0  # max seconds app startup waits for tracing setup
+
+    # CPU-bound work (embeddings, FAISS)
+    COMPUTE_POOL_KIND: str = "thread"  # 'thread' or 'process'
+    COMPUTE_POOL_WORKERS: int = 2
+    COMPUTE_POOL_MAX_PENDING: int = 32  # callers wait for a slot beyond this
+    COMPUTE_POOL_SUBMIT_TIMEOUT: float = 30.0  # seconds to wait for a slot before giving up
+
+    # Embedding micro-batching
+    EMBEDDING_MAX_BATCH: int = 64  # texts per forward pass
+    EMBEDDING_MAX_LATENCY_MS: float = 5.0  # max time a request waits for others to join its batch
+
+    # Embedding cache
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache.sqlite3"  # on-disk tier; empty to keep memory only
+    EMBEDDING_CACHE_MEMORY_ENTRIES: int = 10000  # vectors kept in the in-memory LRU
+    EMBEDDING_CACHE_DISK_ENTRIES: int = 200000  # vectors kept on disk, least recently used deleted beyond; 0 for no limit
+
+    # Conversation memory
+    MEMORY_TOKEN_BUDGET: int = 3000  # tokens for summaries, recalled and recent turns (system prompt excluded)
+    MEMORY_TIER_WEIGHTS: Dict[str, float] = {"summary": 1.0, "recall": 1.0, "recent": 2.0}
+    MEMORY_RECENT_TURNS: int = 6  # turns kept verbatim before being summarised and indexed for recall
+    MEMORY_SEGMENT_TURNS: int = 4  # evicted turns folded into each rolling summary
+    MEMORY_RECALL_K: int = 5  # older turns retrieved by similarity to the new message
+
+    # Task execution prompts
+    SUBTASK_PROMPT_TOKEN_BUDGET: int = 8000  # per subtask agent call, before tool results
+    FINAL_SUMMARY_PROMPT_TOKEN_BUDGET: int = 12000
+    PROMPT_RESULT_MODE: str = "truncate"  # 'truncate' or 'summarise' results that exceed their share
+    PROMPT_PART_WEIGHTS: Dict[str, float] = {"sections": 3.0, "history": 1.0}
+    FINAL_SUMMARY_MAP_TOKENS: int = 800  # results above this are condensed by the LLM as their subtask succeeds
+
+    # Large tool outputs
+    TOOL_OUTPUT_SPILL_CHARS: int = 20000  # outputs above this go to the blob store, replaced by a reference
+    TOOL_OUTPUT_PREVIEW_CHARS: int = 2000  # head of a spilled output kept inline
+    TOOL_OUTPUT_PAGE_CHARS: int = 8000  # page size for read_tool_output
+    BLOB_STORE_PATH: str = "data/blobs"
+    BLOB_STORE_TTL: int = 604800  # seconds since a blob was last stored or read before it is swept
+    BLOB_STORE_MAX_BYTES: int = 1024 ** 3  # least recently used blobs are swept above this total
+    BLOB_STORE_SWEEP_INTERVAL: float = 3600.0  # seconds between sweeps
+
+    # Semantic response cache (opt-in per category)
+    RESPONSE_CACHE_THRESHOLD: float = 0.92  # min cosine similarity between questions for a hit
+    RESPONSE_CACHE_TTL: int = 3600  # seconds, unless the category sets its own
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000  # per category and system prompt
+    RESPONSE_CACHE_FIRST_TURN_ONLY: bool = True  # follow-ups depend on history, so are not cached by default
+
+    # Category listing (GET /categories)
+    CATEGORY_LIST_CACHE_TTL: int = 30  # seconds a rendered page is reused; writes on the same worker clear it
+    CATEGORY_LIST_CACHE_MAX_ENTRIES: int = 256  # rendered pages kept, least recently used dropped beyond
+    CATEGORY_LIST_MAX_LIMIT: int = 500  # largest page size a client may ask for
+
+    # Category config cache (WebSocket, enhance-prompt and registry lookups)
+    CATEGORY_CONFIG_CACHE_TTL: int = 300  # seconds; a safety net, writes invalidate entries right away
+    CATEGORY_CACHE_LISTEN: bool = True  # LISTEN for other workers' changes (Postgres only)
+    CATEGORY_NOTIFY_CHANNEL: str = "vantage_category_changed"
+    CATEGORY_CACHE_LISTEN_CHECK_INTERVAL: float = 5.0  # seconds between listener connection checks
+
+    # Decomposition plan cache
+    PLAN_CACHE_ENABLED: bool = True
+    PLAN_CACHE_THRESHOLD: float = 0.93  # min cosine similarity between requests to reuse a plan
+    PLAN_CACHE_TTL: int = 86400  # seconds
+    PLAN_CACHE_MAX_ENTRIES: int = 200  # per category and tool set
+
+    # Multi-worker coordination (leases and leased subtask jobs)
+    COORDINATION_BACKEND: str = "memory"  # 'memory' (single process) or 'database' (shared by all workers)
+    COORDINATION_LEASE_TTL: float = 30.0  # seconds a conversation lease lives without renewal
+    COORDINATION_JOB_LEASE_TTL: float = 60.0  # seconds a claimed job lives without renewal before it is re-queued
+    COORDINATION_JOB_MAX_ATTEMPTS: int = 3  # claims before a job whose workers keep vanishing is failed
+    COORDINATION_POLL_INTERVAL: float = 5.0  # seconds between fallback polls; enqueues and results wake waiters at once
+    COORDINATION_JOB_TIMEOUT: float = 900.0  # seconds to wait for a job's result before failing it
+    COORDINATION_NOTIFY_CHANNEL: str = "vantage_jobs"  # Postgres channel for job wakeups (database backend)
+    COORDINATION_WORKER_CONCURRENCY: int = 4  # jobs one worker runs at once
+
+    # Streaming decomposition
+    DECOMPOSITION_STREAMING: bool = True  # emit subtask_added events while the plan is generated
+    TASK_AUTO_START: bool = False  # run subtasks as soon as they are planned, without user approval
+
+    # WebSocket outbound queue (per connection)
+    WS_OUTBOUND_QUEUE_SIZE: int = 256  # queued messages before a client counts as slow
+    WS_SLOW_CLIENT_TIMEOUT: float = 10.0  # seconds a client may stay over the limit before it is disconnected
+    WS_DRAIN_TIMEOUT: float = 5.0  # seconds to flush queued messages when a connection ends
+
+    # WebSocket inbound dispatch (per connection)
+    WS_MAX_PENDING_MESSAGES: int = 32  # handlers running or queued per lane (chat turns; control messages) before more are rejected
+
+    # Detached task runs (keep executing while the client is away)
+    TASK_EVENT_BUFFER: int = 1000  # messages per task kept for replay on reconnect
+    TASK_RUN_RETENTION: int = 3600  # seconds a finished task stays queryable
+    TASK_RUN_IDLE_TIMEOUT: int = 1800  # seconds an unfinished task may send nothing before it is cancelled and dropped
+    TASK_RUN_MAX_AGE: int = 86400  # seconds before an unfinished task is cancelled and dropped regardless
+    TASK_RUN_SWEEP_INTERVAL: float = 60.0  # seconds between checks for finished and abandoned tasks
+
+    # Provider-side prompt caching (Anthropic cache_control breakpoints)
+    PROMPT_CACHING_ENABLED: bool = True
+
+    # Tool schema compilation
+    SCHEMA_CACHE_SIZE: int = 512  # max compiled tool input models kept in memory
 
     class Config:
         env_file = ".env"
@@ -54,16 +175,31 @@ settings = get_settings()
 
 
 def setup_logging():
-    """Configure root logger for the application."""
+    """Configure root logger for the application.
+
+    Records are sampled/budgeted in the calling thread, then handed to a
+    QueueListener so formatting and stdout writes stay off the event loop.
+    """
     log_level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
 
-    formatter = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
+    if settings.LOG_FORMAT.lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            fmt="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+
+    handler, listener = build_queue_logging(
+        stream_handler,
+        sample_rate=settings.LOG_SAMPLE_RATE,
+        budgets=settings.LOG_BUDGETS,
     )
-
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(formatter)
+    listener.start()
+    atexit.register(listener.stop)
 
     root = logging.getLogger("app")
     root.setLevel(log_level)
@@ -1,8 +1,102 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.serialization import dumps_text, loads
+
+
+class PoolWaitStats:
+    """
+    Accumulates how long callers waited to check a connection out of the
+    pool. Timeouts (the pool stayed full for DB_POOL_TIMEOUT) are counted
+    apart from errors (a new connection could not be opened), so an outage
+    does not read as saturation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False, failed: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            if failed:
+                self.errors += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "wait_seconds_total": round(self.total_wait, 6),
+                "wait_seconds_avg": round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0,
+                "wait_seconds_max": round(self.max_wait, 6),
+            }
+
+
+pool_wait_stats = PoolWaitStats()
+
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait time in pool_wait_stats."""
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            pool_wait_stats.record(time.perf_counter() - t0, timed_out=True)
+            raise
+        except Exception:
+            pool_wait_stats.record(time.perf_counter() - t0, failed=True)
+            raise
+        pool_wait_stats.record(time.perf_counter() - t0)
+        return conn
+
+
+def _engine_kwargs(database_url: str) -> Dict[str, Any]:
+    """Build create_async_engine() arguments from the DB_* settings."""
+    kwargs: Dict[str, Any] = {"echo": settings.DB_ECHO}
+    url = make_url(database_url)
+
+    if url.get_backend_name() == "sqlite":
+        # SQLite uses its own single-connection pools; sizing does not apply
+        return kwargs
+
+    kwargs.update(
+        # JSON columns (job payloads carrying whole chat histories) go through the fast encoder
+        json_serializer=dumps_text,
+        json_deserializer=loads,
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if url.get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return kwargs
+
+
+engine = create_async_engine(settings.DATABASE_URL, **_engine_kwargs(settings.DATABASE_URL))
 
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
@@ -11,3 +105,19 @@ AsyncSessionLocal = sessionmaker(
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """Return current pool occupancy and checkout wait statistics."""
+    pool = engine.sync_engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),  # SQLAlchemy counts up from -pool_size
+            max_overflow=settings.DB_MAX_OVERFLOW,
+        )
+    status.update(pool_wait_stats.snapshot())
+    return status
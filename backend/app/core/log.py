@@ -0,0 +1,147 @@
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+# Attributes present on every LogRecord; anything else was passed via `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class Preview:
+    """
+    Lazily truncated view of a value for use as a logging argument.
+
+    The str() conversion and slicing only happen if the record is actually
+    formatted, so disabled or sampled-out log calls cost next to nothing.
+    """
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: int = 200):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        if self.value is None or (isinstance(self.value, str) and not self.value):
+            return "(empty)"
+        text = str(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}... (+{len(text) - self.limit} chars)"
+
+    __repr__ = __str__
+
+
+def preview(value: Any, limit: int = 200) -> Preview:
+    """Wrap a value so it is only stringified and truncated when the log line is emitted."""
+    return Preview(value, limit)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records below WARNING; warnings and errors always pass."""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class BudgetFilter(logging.Filter):
+    """
+    Per-logger rate budget: at most N records below WARNING per interval.
+
+    Budgets are matched by logger name prefix (e.g. "app.agent" also covers
+    "app.agent.tools"). The first record after a window with drops carries a
+    `suppressed` attribute with the number of records that were discarded.
+    """
+
+    def __init__(self, budgets: Dict[str, int], interval: float = 1.0):
+        super().__init__()
+        self.budgets = budgets
+        self.interval = interval
+        self._windows: Dict[str, list] = {}  # logger prefix -> [window_start, count, dropped]
+        self._lock = threading.Lock()
+
+    def _budget_for(self, name: str) -> Optional[str]:
+        best = None
+        for prefix in self.budgets:
+            if name == prefix or name.startswith(prefix + "."):
+                if best is None or len(prefix) > len(best):
+                    best = prefix
+        return best
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix = self._budget_for(record.name)
+        if prefix is None:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.setdefault(prefix, [now, 0, 0])
+            if now - window[0] >= self.interval:
+                if window[2]:
+                    record.suppressed = window[2]
+                window[:] = [now, 0, 0]
+            if window[1] >= self.budgets[prefix]:
+                window[2] += 1
+                return False
+            window[1] += 1
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Render records as one JSON object per line, including any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class LocalQueueHandler(QueueHandler):
+    """
+    QueueHandler for an in-process queue.
+
+    The stock handler formats every record in the calling thread so it can be
+    pickled; with a plain queue.Queue that is unnecessary, so records are
+    enqueued untouched and all formatting and I/O happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def build_queue_logging(
+    target: logging.Handler,
+    sample_rate: float = 1.0,
+    budgets: Optional[Dict[str, int]] = None,
+) -> tuple[QueueHandler, QueueListener]:
+    """Wrap a handler so records are filtered in the caller and emitted on a background thread."""
+    log_queue: queue.Queue = queue.Queue(-1)
+    handler = LocalQueueHandler(log_queue)
+    if sample_rate < 1.0:
+        handler.addFilter(SamplingFilter(sample_rate))
+    if budgets:
+        handler.addFilter(BudgetFilter(budgets))
+    listener = QueueListener(log_queue, target, respect_handler_level=True)
+    return handler, listener
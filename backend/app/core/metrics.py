@@ -0,0 +1,186 @@
+from typing import Any, Tuple
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+
+# Latency buckets (seconds)
+_LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+_TOOL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_SUBTASK_BUCKETS = (1, 2.5, 5, 10, 20, 40, 60, 120, 300, 600)
+
+LLM_LATENCY = Histogram(
+    "vantage_llm_request_seconds",
+    "LLM call latency",
+    ["provider", "model", "operation"],
+    buckets=_LLM_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "vantage_llm_tokens_total",
+    "LLM token usage reported by the provider",
+    ["provider", "model", "operation", "kind"],
+)
+DECOMPOSITION_LATENCY = Histogram(
+    "vantage_decomposition_seconds",
+    "Task decomposition latency, including the planning LLM call",
+    ["outcome"],
+    buckets=_LLM_BUCKETS,
+)
+TOOL_LATENCY = Histogram(
+    "vantage_tool_call_seconds",
+    "MCP tool call latency",
+    ["server", "tool"],
+    buckets=_TOOL_BUCKETS,
+)
+TOOL_CALLS = Counter(
+    "vantage_tool_calls_total",
+    "MCP tool calls by outcome",
+    ["server", "tool", "outcome"],
+)
+SUBTASK_DURATION = Histogram(
+    "vantage_subtask_seconds",
+    "System subtask execution time",
+    ["status"],
+    buckets=_SUBTASK_BUCKETS,
+)
+READY_SUBTASKS = Gauge(
+    "vantage_ready_subtasks",
+    "Subtasks whose dependencies are met and are waiting to be executed",
+)
+ACTIVE_WEBSOCKETS = Gauge(
+    "vantage_active_websockets",
+    "Open chat WebSocket connections",
+)
+COMPUTE_POOL_PENDING = Gauge(
+    "vantage_compute_pool_pending",
+    "CPU-bound jobs (embeddings, FAISS) queued or running in the compute pool",
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "vantage_embedding_batch_texts",
+    "Distinct texts per embedding forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "vantage_embedding_cache_lookups_total",
+    "Embedding cache lookups by result (memory, disk, miss)",
+    ["result"],
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "vantage_response_cache_lookups_total",
+    "Semantic response cache lookups by result (hit, miss, error)",
+    ["result"],
+)
+CATEGORY_CACHE_LOOKUPS = Counter(
+    "vantage_category_cache_lookups_total",
+    "Category config cache lookups by result (hit, miss)",
+    ["result"],
+)
+CATEGORY_LIST_CACHE_LOOKUPS = Counter(
+    "vantage_category_list_cache_lookups_total",
+    "Category listing cache lookups by result (hit, miss, not_modified)",
+    ["result"],
+)
+PROMPT_TOKENS = Histogram(
+    "vantage_prompt_part_tokens",
+    "Estimated tokens per prompt part, by prompt builder",
+    ["builder", "part"],
+    buckets=(0, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+WS_OUTBOUND_QUEUE_DEPTH = Gauge(
+    "vantage_ws_outbound_queued_messages",
+    "Messages waiting in WebSocket outbound queues, across connections",
+)
+WS_SEND_LATENCY = Histogram(
+    "vantage_ws_send_seconds",
+    "Time to write one message to a WebSocket client",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+WS_OUTBOUND_DISCARDED = Counter(
+    "vantage_ws_outbound_discarded_total",
+    "Outbound messages not sent as-is, by reason (coalesced, merged, superseded, slow_client)",
+    ["reason"],
+)
+WS_INBOUND_HANDLERS = Gauge(
+    "vantage_ws_inbound_handlers",
+    "Inbound WebSocket message handlers running or queued, across connections",
+)
+WS_INBOUND_REJECTED = Counter(
+    "vantage_ws_inbound_rejected_total",
+    "Inbound WebSocket messages rejected because too many handlers were pending",
+)
+BLOB_STORE_EVICTED = Counter(
+    "vantage_blob_store_evicted_total",
+    "Tool-output blobs removed by the blob store sweep, by reason (expired, size)",
+    ["reason"],
+)
+COORDINATOR_JOBS = Counter(
+    "vantage_coordinator_jobs_total",
+    "Coordinated jobs by event (enqueued, succeeded, failed)",
+    ["event"],
+)
+TRACING_SPANS = Counter(
+    "vantage_tracing_spans_total",
+    "Ended spans by export outcome (exported, filtered, dropped, export_failed)",
+    ["outcome"],
+)
+
+
+def llm_labels(llm: Any) -> Tuple[str, str]:
+    """Return (provider, model) metric labels for a LangChain chat model."""
+    # Tool-bound models are RunnableBindings wrapping the chat model
+    llm = getattr(llm, "bound", llm)
+    try:
+        provider = llm._llm_type
+    except Exception:
+        provider = type(llm).__name__
+    model = (
+        getattr(llm, "model_name", None)
+        or getattr(llm, "model", None)
+        or getattr(llm, "deployment_name", None)
+        or "unknown"
+    )
+    return str(provider), str(model)
+
+
+def record_llm_call(llm: Any, operation: str, elapsed: float, response: Any = None):
+    """Observe LLM latency and, when the response carries usage_metadata, token counts."""
+    provider, model = llm_labels(llm)
+    LLM_LATENCY.labels(provider, model, operation).observe(elapsed)
+
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    for kind in ("input_tokens", "output_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(provider, model, operation, kind).inc(usage[kind])
+    details = usage.get("input_token_details") or {}
+    for kind in ("cache_read", "cache_creation"):
+        if details.get(kind):
+            LLM_TOKENS.labels(provider, model, operation, kind).inc(details[kind])
+
+
+def record_tool_call(server: str, tool: str, elapsed: float, ok: bool):
+    """Observe a tool call's latency and count it by outcome."""
+    TOOL_LATENCY.labels(server, tool).observe(elapsed)
+    TOOL_CALLS.labels(server, tool, "success" if ok else "error").inc()
+
+
+class _DatabasePoolCollector:
+    """Expose connection pool occupancy and wait times from app.core.database."""
+
+    def collect(self):
+        from app.core.database import get_pool_status
+
+        status = get_pool_status()
+        for key in ("size", "checked_in", "checked_out", "overflow", "wait_seconds_max"):
+            if key in status:
+                yield GaugeMetricFamily(f"vantage_db_pool_{key}", f"Database pool {key.replace('_', ' ')}", value=status[key])
+        # Cumulative since the worker started; exposed with a _total suffix
+        for key, name in (
+            ("checkouts", "checkouts"), ("timeouts", "timeouts"), ("errors", "errors"),
+            ("wait_seconds_total", "wait_seconds"),
+        ):
+            if key in status:
+                yield CounterMetricFamily(f"vantage_db_pool_{name}", f"Database pool {name.replace('_', ' ')}", value=status[key])
+
+
+REGISTRY.register(_DatabasePoolCollector())
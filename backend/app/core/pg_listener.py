@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+logger = logging.getLogger("app.pg_listener")
+
+
+class PostgresListener:
+    """
+    LISTENs on one channel and passes each notification's payload to
+    handle(). Uses its own connection outside the pool, since it is held for
+    the life of the worker, and reconnects if it drops; on_connect() runs
+    after every (re)connect, since notifications may have been missed in
+    between. Does nothing on other databases. Subclasses override handle()
+    and on_connect().
+    """
+
+    def __init__(self, database_url: str, channel: str, check_interval: float = 5.0):
+        self.database_url = database_url
+        self.channel = channel
+        self.check_interval = check_interval
+        self._engine: Optional[AsyncEngine] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if make_url(self.database_url).get_backend_name() != "postgresql":
+            return
+        self._engine = create_async_engine(self.database_url, poolclass=NullPool)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+    def handle(self, payload: str):
+        pass
+
+    def on_connect(self):
+        pass
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            self.handle(payload)
+        except Exception as e:
+            logger.warning("Handling notification on %s failed: %s", self.channel, e)
+
+    async def _run(self):
+        while True:
+            try:
+                async with self._engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    driver = raw.driver_connection
+                    await driver.add_listener(self.channel, self._on_notify)
+                    self.on_connect()
+                    logger.info("Listening for notifications on %s", self.channel)
+                    while not driver.is_closed():
+                        await asyncio.sleep(self.check_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Listener on %s failed, reconnecting: %s", self.channel, e)
+            await asyncio.sleep(self.check_interval)
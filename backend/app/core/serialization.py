@@ -0,0 +1,58 @@
+import json
+from typing import Any, Union
+
+from fastapi import WebSocket
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # stdlib json is used instead
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Serialise what neither encoder handles natively: Pydantic models, via their own JSON dump."""
+    if isinstance(obj, BaseModel):
+        if orjson is not None and hasattr(orjson, "Fragment"):
+            # Embed Pydantic's JSON as-is instead of building a dict first
+            return orjson.Fragment(obj.model_dump_json())
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps_text(obj: Any) -> str:
+    if orjson is not None:
+        return dumps(obj).decode("utf-8")
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps().
+
+    Meant for routes without a response_model: FastAPI already serialises
+    response models straight to bytes with Pydantic, and setting a custom
+    response class (per route or as the app default) turns that off.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+async def send_json(websocket: WebSocket, msg: Any):
+    """websocket.send_json with the same compact output, encoded by dumps()."""
+    await websocket.send_text(dumps_text(msg))
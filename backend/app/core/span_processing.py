@@ -0,0 +1,83 @@
+# Imported by app.core.tracing only once tracing is enabled, so the OpenTelemetry SDK stays off the boot path
+import threading
+from typing import Callable, Optional, Sequence
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+from app.core.config import settings
+from app.core.metrics import TRACING_SPANS
+
+
+class CountingExporter(SpanExporter):
+    """Wraps a SpanExporter to release queue slots and count exported spans."""
+
+    def __init__(self, exporter: SpanExporter, on_exported: Callable[[int], None]):
+        self._exporter = exporter
+        self._on_exported = on_exported
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        try:
+            result = self._exporter.export(spans)
+            # Exporters report most failures (e.g. an unreachable collector) by return value, not by raising
+            outcome = "exported" if result == SpanExportResult.SUCCESS else "export_failed"
+            TRACING_SPANS.labels(outcome).inc(len(spans))
+            return result
+        except Exception:
+            TRACING_SPANS.labels("export_failed").inc(len(spans))
+            raise
+        finally:
+            self._on_exported(len(spans))
+
+    def shutdown(self):
+        return self._exporter.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._exporter.force_flush(timeout_millis)
+
+
+class BoundedSpanProcessor(SpanProcessor):
+    """
+    Span processor that applies tail filters and a hard queue bound before
+    handing spans to a BatchSpanProcessor.
+
+    Spans that would exceed the queue are dropped (and counted) instead of
+    ever blocking the thread that ended them.
+    """
+
+    def __init__(self, exporter: SpanExporter, keep: Callable[[ReadableSpan], bool]):
+        self._keep = keep
+        self._max_queue = settings.TRACING_MAX_QUEUE_SIZE
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._delegate = BatchSpanProcessor(
+            CountingExporter(exporter, self._release),
+            max_queue_size=self._max_queue,
+            schedule_delay_millis=settings.TRACING_SCHEDULE_DELAY_MS,
+            max_export_batch_size=min(settings.TRACING_EXPORT_BATCH_SIZE, self._max_queue),
+        )
+
+    def _release(self, count: int):
+        with self._lock:
+            self._pending = max(0, self._pending - count)
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None):
+        self._delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan):
+        if not self._keep(span):
+            TRACING_SPANS.labels("filtered").inc()
+            return
+        with self._lock:
+            if self._pending >= self._max_queue:
+                TRACING_SPANS.labels("dropped").inc()
+                return
+            self._pending += 1
+        self._delegate.on_end(span)
+
+    def shutdown(self):
+        self._delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._delegate.force_flush(timeout_millis)
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.tracing")
+
+_tracer_provider: Optional[Any] = None
+_init_lock = threading.Lock()
+
+
+def _keep_all(span) -> bool:
+    return True
+
+
+def _keep_errors(span) -> bool:
+    from opentelemetry.trace import StatusCode
+
+    return span.status is not None and span.status.status_code == StatusCode.ERROR
+
+
+def _keep_slow(span) -> bool:
+    if span.start_time is None or span.end_time is None:
+        return True
+    duration_ms = (span.end_time - span.start_time) / 1e6
+    return duration_ms >= settings.TRACING_SLOW_THRESHOLD_MS or _keep_errors(span)
+
+
+def _setup_tracing() -> Any:
+    """Import the OpenTelemetry stack, build the provider and instrument LangChain."""
+    global _tracer_provider
+
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.sampling import ALWAYS_ON, ParentBased, TraceIdRatioBased
+    from openinference.instrumentation.langchain import LangChainInstrumentor
+
+    from app.core.span_processing import BoundedSpanProcessor
+
+    mode = settings.TRACING_SAMPLER.lower()
+    if mode == "errors":
+        sampler, keep = ALWAYS_ON, _keep_errors
+    elif mode == "slow":
+        sampler, keep = ALWAYS_ON, _keep_slow
+    else:
+        sampler, keep = ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)), _keep_all
+
+    # Phoenix routes spans to a project using this resource attribute
+    resource = Resource.create({"openinference.project.name": settings.PHOENIX_PROJECT_NAME})
+    provider = TracerProvider(resource=resource, sampler=sampler)
+    exporter = OTLPSpanExporter(
+        endpoint=settings.PHOENIX_COLLECTOR_ENDPOINT,
+        timeout=settings.TRACING_EXPORT_TIMEOUT,
+    )
+    provider.add_span_processor(BoundedSpanProcessor(exporter, keep))
+    LangChainInstrumentor().instrument(tracer_provider=provider)
+
+    with _init_lock:
+        _tracer_provider = provider
+    return provider
+
+
+async def init_tracing():
+    """
+    Enable tracing in a worker thread if configured.
+
+    Startup waits at most TRACING_STARTUP_BUDGET seconds; if the imports or
+    provider setup take longer, the app starts anyway and tracing attaches
+    once the thread finishes.
+    """
+    if not settings.TRACING_ENABLED or not settings.PHOENIX_COLLECTOR_ENDPOINT:
+        logger.info("Tracing disabled")
+        return
+
+    t0 = time.time()
+    task = asyncio.ensure_future(asyncio.to_thread(_setup_tracing))
+    task.add_done_callback(_log_setup_result)
+    try:
+        await asyncio.wait_for(asyncio.shield(task), timeout=settings.TRACING_STARTUP_BUDGET)
+        logger.info(
+            "Tracing enabled in %.2fs (project=%s, endpoint=%s, sampler=%s)",
+            time.time() - t0,
+            settings.PHOENIX_PROJECT_NAME,
+            settings.PHOENIX_COLLECTOR_ENDPOINT,
+            settings.TRACING_SAMPLER,
+        )
+    except asyncio.TimeoutError:
+        logger.warning(
+            "Tracing setup exceeded %.1fs startup budget; continuing without waiting",
+            settings.TRACING_STARTUP_BUDGET,
+        )
+    except Exception:
+        # Reported by _log_setup_result
+        pass
+
+
+def _log_setup_result(task: "asyncio.Future"):
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.warning("Tracing not available: %s", exc)
+
+
+def shutdown_tracing():
+    """Flush and stop the span processor, if tracing was started."""
+    with _init_lock:
+        provider = _tracer_provider
+    if provider is not None:
+        provider.shutdown()
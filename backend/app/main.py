@@ -1,33 +1,50 @@
-import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings, setup_logging
-from app.api.endpoints import categories, registry, tools, mcp_servers, chat
+from app.core.compute_pool import shutdown_compute_pool
+from app.core.database import get_pool_status
+from app.core.serialization import FastJSONResponse
+from app.core.tracing import init_tracing, shutdown_tracing
+from app.services.blob_store import BlobSweeper, get_blob_store
+from app.services.category_cache import CategoryChangeListener
+from app.services.coordinator import get_coordinator
+from app.services.task_runs import get_task_registry
+from app.services.tool_sessions import get_tool_session_pool
+from app.api.endpoints import categories, registry, tools, mcp_servers, chat, metrics, tasks
 
 setup_logging()
 
-logger = logging.getLogger("app.tracing")
 
-# Initialize Phoenix / OpenTelemetry tracing
-try:
-    from phoenix.otel import register
-    from openinference.instrumentation.langchain import LangChainInstrumentor
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tracing is imported and configured lazily so it never delays worker boot
+    await init_tracing()
+    # Drop cached category config when other workers change it
+    category_listener = CategoryChangeListener(settings.DATABASE_URL)
+    category_listener.start()
+    # Spilled tool outputs are kept for BLOB_STORE_TTL and within BLOB_STORE_MAX_BYTES
+    blob_sweeper = BlobSweeper(get_blob_store())
+    blob_sweeper.start()
+    # Wake job waiters and workers when other workers enqueue or finish jobs
+    coordinator = get_coordinator()
+    coordinator.start()
+    # Task runs outlive their sockets; abandoned ones are evicted so they release their tool sessions
+    task_runs = get_task_registry()
+    task_runs.start()
+    yield
+    await task_runs.stop()
+    # MCP sessions (and job workers) shared by this worker's connections and task runs
+    await get_tool_session_pool().close()
+    await coordinator.stop()
+    await blob_sweeper.stop()
+    await category_listener.stop()
+    shutdown_compute_pool()
+    shutdown_tracing()
 
-    tracer_provider = register(
-        project_name=settings.PHOENIX_PROJECT_NAME,
-        endpoint=settings.PHOENIX_COLLECTOR_ENDPOINT,
-    )
-    LangChainInstrumentor().instrument(tracer_provider=tracer_provider)
-    logger.info(
-        "Phoenix tracing enabled (project=%s, endpoint=%s)",
-        settings.PHOENIX_PROJECT_NAME,
-        settings.PHOENIX_COLLECTOR_ENDPOINT,
-    )
-except Exception as e:
-    logger.warning("Phoenix tracing not available: %s", e)
 
-app = FastAPI(title=settings.PROJECT_NAME)
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
 # Set all CORS enabled origins
 app.add_middleware(
@@ -42,8 +59,16 @@ app.include_router(categories.router, prefix=f"{settings.API_V1_STR}/categories"
 app.include_router(registry.router, prefix=f"{settings.API_V1_STR}/registry", tags=["registry"])
 app.include_router(tools.router, prefix=f"{settings.API_V1_STR}/tools", tags=["tools"])
 app.include_router(mcp_servers.router, prefix=f"{settings.API_V1_STR}/mcp-servers", tags=["mcp-servers"])
+app.include_router(tasks.router, prefix=f"{settings.API_V1_STR}/tasks", tags=["tasks"])
 app.include_router(chat.router, tags=["chat"])
+app.include_router(metrics.router, tags=["metrics"])
 
-@app.get("/")
+@app.get("/", response_class=FastJSONResponse)
 def read_root():
     return {"message": "Welcome to Vantage Agent API"}
+
+
+@app.get("/health/db", response_class=FastJSONResponse)
+def read_db_pool_status():
+    """Connection pool occupancy and checkout wait times, for sizing DB_POOL_*."""
+    return get_pool_status()
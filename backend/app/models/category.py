@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import List, Optional
-from sqlalchemy import String, Text, ForeignKey, DateTime, JSON
+from sqlalchemy import Boolean, Integer, String, Text, ForeignKey, DateTime, JSON, false
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from app.models.base import Base
@@ -24,6 +24,10 @@ class Category(Base):
     llm_deployment_name: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)  # For Azure
     llm_region: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)  # For AWS
 
+    # Semantic response cache
+    response_cache_enabled: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false())
+    response_cache_ttl: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # seconds; None uses the global default
+
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
@@ -36,7 +40,7 @@ class MCPServer(Base):
     url: Mapped[str] = mapped_column(String(255))
     name: Mapped[str] = mapped_column(String(100))
     type: Mapped[str] = mapped_column(String(10))  # 'sse', 'http', or 'stdio'
-    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
+    category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"), index=True)
     resource_config: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True, default=None)
 
     category: Mapped["Category"] = relationship(back_populates="mcp_servers")
@@ -0,0 +1,31 @@
+from datetime import datetime
+from typing import Any, Optional
+from sqlalchemy import Float, Integer, String, DateTime, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from app.models.base import Base
+
+class CoordinationLease(Base):
+    __tablename__ = "coordination_leases"
+
+    # e.g. "conversation:<client conversation id>" or "task:<task id>"; held by one worker until it expires or is released
+    name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    owner: Mapped[str] = mapped_column(String(255))
+    expires_at: Mapped[float] = mapped_column(Float)  # epoch seconds
+
+class CoordinationJob(Base):
+    __tablename__ = "coordination_jobs"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    queue: Mapped[str] = mapped_column(String(255), index=True)
+    payload: Mapped[Any] = mapped_column(JSON)
+    status: Mapped[str] = mapped_column(String(20), index=True, default="pending")  # 'pending', 'running', 'succeeded', 'failed'
+
+    # Lease of the worker running the job; an expired lease makes the job claimable again
+    owner: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    lease_expires_at: Mapped[Optional[float]] = mapped_column(Float, nullable=True)  # epoch seconds
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    result: Mapped[Optional[Any]] = mapped_column(JSON, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
@@ -18,6 +18,10 @@ class CategoryBase(BaseModel):
     llm_deployment_name: Optional[str] = None
     llm_region: Optional[str] = None
 
+    # Semantic response cache
+    response_cache_enabled: bool = False
+    response_cache_ttl: Optional[int] = None
+
 class CategoryCreate(CategoryBase):
     pass
 
@@ -32,6 +36,8 @@ class CategoryUpdate(BaseModel):
     llm_api_version: Optional[str] = None
     llm_deployment_name: Optional[str] = None
     llm_region: Optional[str] = None
+    response_cache_enabled: Optional[bool] = None
+    response_cache_ttl: Optional[int] = None
 
 class CategoryInDBBase(CategoryBase):
     id: int
@@ -45,3 +51,17 @@ from app.schemas.mcp_server import MCPServer
 
 class Category(CategoryInDBBase):
     mcp_servers: List[MCPServer] = []
+
+
+class CategorySummary(BaseModel):
+    """Listing projection: no prompt or credentials, servers only counted."""
+    id: int
+    name: str
+    llm_provider: str
+    llm_model: str
+    response_cache_enabled: bool
+    server_count: int
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -47,3 +47,13 @@ class DecompositionResponse(BaseModel):
     should_decompose: bool
     reasoning: str
     subtasks: list[SubtaskSpec] = []
+
+
+class TaskStatus(BaseModel):
+    task_id: str
+    user_message: str
+    status: str  # "pending_approval", "running", "completed" or "cancelled"
+    subtasks: list[Subtask]
+    summary: Optional[str] = None
+    last_seq: int  # sequence number of the latest buffered event
+    connected: bool  # whether a client socket is attached
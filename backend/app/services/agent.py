@@ -1,6 +1,6 @@
 import logging
 import time
-from typing import List, Dict, Any, Annotated, Optional, Tuple
+from typing import List, Dict, Any, Annotated, Tuple
 from dataclasses import dataclass
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
 from langchain_core.language_models import BaseChatModel
@@ -9,7 +9,6 @@ from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 import operator
 from typing import TypedDict, Union
-from pydantic import create_model, Field
 
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -19,10 +18,37 @@ from mcp import ClientSession
 from app.models.category import Category
 from app.services.mcp_client import MCPClient
 from app.services.llm_factory import LLMFactory
+from app.services.schema_compiler import compile_schema, dump_arguments
+from app.services.tool_output import build_read_output_tool, spill_large_output
+from app.core.log import preview
+from app.core.metrics import record_llm_call, record_tool_call
 
 logger = logging.getLogger("app.agent")
 
 
+def _log_llm_request(messages: List[BaseMessage]):
+    """Log an LLM request; the per-message dump only runs when DEBUG is enabled."""
+    logger.info("[LLM Request] %d messages", len(messages), extra={"message_count": len(messages)})
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    for i, m in enumerate(messages):
+        logger.debug("  msg[%d] %s: %s", i, m.__class__.__name__, preview(m.content, 300))
+        if getattr(m, "tool_calls", None):
+            logger.debug("  msg[%d] tool_calls: %s", i, m.tool_calls)
+
+
+def _log_llm_response(response: BaseMessage, elapsed: float):
+    """Log an LLM response summary at INFO and its content at DEBUG."""
+    tool_calls = getattr(response, "tool_calls", None) or []
+    logger.info(
+        "[LLM Response] %.2fs | %d tool calls", elapsed, len(tool_calls),
+        extra={"duration_s": round(elapsed, 3), "tool_calls": len(tool_calls)},
+    )
+    logger.debug("  content: %s", preview(response.content, 500))
+    for tc in tool_calls:
+        logger.debug("  tool_call: %s(%s)", tc["name"], tc.get("args", {}))
+
+
 @dataclass
 class AgentBundle:
     """Container for agent components returned by AgentService."""
@@ -31,34 +57,6 @@ class AgentBundle:
     llm: BaseChatModel  # unbound LLM (without tools)
 
 
-# Mapping from JSON Schema types to Python types
-_JSON_TYPE_MAP = {
-    "string": str,
-    "integer": int,
-    "number": float,
-    "boolean": bool,
-    "array": list,
-    "object": dict,
-}
-
-
-def _json_schema_to_pydantic(schema: Dict[str, Any], model_name: str = "ToolInput"):
-    """Convert a JSON Schema object to a dynamic Pydantic model for args_schema."""
-    properties = schema.get("properties", {})
-    required = set(schema.get("required", []))
-
-    fields: Dict[str, Any] = {}
-    for name, prop in properties.items():
-        py_type = _JSON_TYPE_MAP.get(prop.get("type", "string"), str)
-        description = prop.get("description", "")
-
-        if name in required:
-            fields[name] = (py_type, Field(description=description))
-        else:
-            fields[name] = (Optional[py_type], Field(default=None, description=description))
-
-    return create_model(model_name, **fields)
-
 class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], operator.add]
 
@@ -87,14 +85,17 @@ class AgentService:
                     # Dynamically create a LangChain tool wrapper
 
                     # Create a closure for the tool execution
-                    async def make_tool_func(s_url=server.url, t_name=tool_def["name"], s_config=server.resource_config):
+                    async def make_tool_func(s_url=server.url, s_name=server.name, t_name=tool_def["name"], s_config=server.resource_config):
                         async def _exec(**kwargs):
+                            t0 = time.time()
                             try:
-                                res = await MCPClient.call_tool(s_url, t_name, kwargs, resource_config=s_config)
+                                res = await MCPClient.call_tool(s_url, t_name, dump_arguments(kwargs), resource_config=s_config)
+                                record_tool_call(s_name, t_name, time.time() - t0, ok=not getattr(res, "isError", False))
                                 # simplified result parsing
                                 content = [c.text for c in res.content if c.type == 'text']
-                                return "\n".join(content) if content else str(res)
+                                return await spill_large_output(t_name, "\n".join(content) if content else str(res))
                             except Exception as e:
+                                record_tool_call(s_name, t_name, time.time() - t0, ok=False)
                                 error_msg = f"[Tool Error] {t_name} failed: {e}. Make reasonable assumptions based on available context and proceed."
                                 logger.warning(error_msg)
                                 return error_msg
@@ -103,7 +104,7 @@ class AgentService:
                     tool_func = await make_tool_func()
 
                     input_schema = tool_def.get("inputSchema", {})
-                    args_schema = _json_schema_to_pydantic(input_schema, tool_def["name"] + "Input")
+                    args_schema = compile_schema(input_schema, tool_def["name"] + "Input")
 
                     tool = StructuredTool.from_function(
                         coroutine=tool_func,
@@ -115,6 +116,12 @@ class AgentService:
             except Exception as e:
                 logger.error("Failed to load tools from %s: %s", server.url, e)
 
+        # Lets the agent page through tool outputs that were too large to return inline
+        if tools:
+            tools.append(build_read_output_tool())
+        # Stable order keeps the tool schemas, the start of every prompt, cacheable
+        tools.sort(key=lambda t: t.name)
+
         # 3. Setup LLM using category configuration
         llm = LLMFactory.create_llm(
             provider=category.llm_provider,
@@ -136,14 +143,12 @@ class AgentService:
 
         def call_model(state: AgentState):
             messages = state["messages"]
-            logger.info("[LLM Request] %d messages", len(messages))
-            for i, m in enumerate(messages):
-                role = m.__class__.__name__
-                content_preview = str(m.content)[:300] if m.content else ""
-                logger.info("  msg[%d] %s: %s", i, role, content_preview)
+            _log_llm_request(messages)
             t0 = time.time()
-            response = llm.invoke(messages)
-            logger.info("[LLM Response] %.2fs | content: %s", time.time() - t0, str(response.content)[:500])
+            response = llm.invoke(LLMFactory.mark_cache_breakpoints(llm, messages))
+            elapsed = time.time() - t0
+            _log_llm_response(response, elapsed)
+            record_llm_call(llm, "agent", elapsed, response)
             return {"messages": [response]}
 
         workflow.add_node("agent", call_model)
@@ -179,32 +184,41 @@ class AgentService:
         """
         # 1. Fetch tools from all persistent sessions
         tools = []
+        server_names = {s.id: s.name for s in category.mcp_servers}
         for server_id, session in mcp_sessions.items():
             try:
                 result = await session.list_tools()
                 server_tools = [tool.model_dump() for tool in result.tools]
                 logger.info("Loaded %d tools from MCP session %s", len(server_tools), server_id)
                 for tool_def in server_tools:
-                    async def make_tool_func(sess=session, t_name=tool_def["name"]):
+                    async def make_tool_func(sess=session, s_name=server_names.get(server_id, str(server_id)), t_name=tool_def["name"]):
                         async def _exec(**kwargs):
-                            logger.info("[Tool Call] %s | args=%s", t_name, kwargs)
+                            logger.debug("[Tool Call] %s | args=%s", t_name, preview(kwargs, 500))
                             t0 = time.time()
                             try:
-                                res = await sess.call_tool(t_name, kwargs)
+                                res = await sess.call_tool(t_name, dump_arguments(kwargs))
                                 content = [c.text for c in res.content if c.type == 'text']
                                 output = "\n".join(content) if content else str(res)
-                                logger.info("[Tool Result] %s | %.2fs | output=%s", t_name, time.time() - t0, output[:500])
-                                return output
+                                elapsed = time.time() - t0
+                                record_tool_call(s_name, t_name, elapsed, ok=not getattr(res, "isError", False))
+                                logger.info(
+                                    "[Tool Result] %s | %.2fs | %d chars", t_name, elapsed, len(output),
+                                    extra={"tool": t_name, "duration_s": round(elapsed, 3), "output_chars": len(output)},
+                                )
+                                logger.debug("[Tool Result] %s | output=%s", t_name, preview(output, 500))
+                                return await spill_large_output(t_name, output)
                             except Exception as e:
                                 error_msg = f"[Tool Error] {t_name} failed: {e}. Make reasonable assumptions based on available context and proceed."
-                                logger.warning("[Tool Error] %s | %.2fs | %s", t_name, time.time() - t0, str(e))
+                                elapsed = time.time() - t0
+                                record_tool_call(s_name, t_name, elapsed, ok=False)
+                                logger.warning("[Tool Error] %s | %.2fs | %s", t_name, elapsed, str(e))
                                 return error_msg
                         return _exec
 
                     tool_func = await make_tool_func()
 
                     input_schema = tool_def.get("inputSchema", {})
-                    args_schema = _json_schema_to_pydantic(input_schema, tool_def["name"] + "Input")
+                    args_schema = compile_schema(input_schema, tool_def["name"] + "Input")
 
                     tool = StructuredTool.from_function(
                         coroutine=tool_func,
@@ -216,6 +230,12 @@ class AgentService:
             except Exception as e:
                 logger.error("Failed to load tools from session %s: %s", server_id, e)
 
+        # Lets the agent page through tool outputs that were too large to return inline
+        if tools:
+            tools.append(build_read_output_tool())
+        # Stable order keeps the tool schemas, the start of every prompt, cacheable
+        tools.sort(key=lambda t: t.name)
+
         # 2. Setup LLM using category configuration
         llm = LLMFactory.create_llm(
             provider=category.llm_provider,
@@ -243,28 +263,13 @@ class AgentService:
 
         def call_model(state: AgentState):
             messages = state["messages"]
-
-            # Log LLM input
-            logger.info("=" * 60)
-            logger.info("[LLM Request] %d messages", len(messages))
-            for i, m in enumerate(messages):
-                role = m.__class__.__name__
-                content_preview = str(m.content)[:300] if m.content else ""
-                logger.info("  msg[%d] %s: %s", i, role, content_preview)
-                if hasattr(m, "tool_calls") and m.tool_calls:
-                    logger.info("  msg[%d] tool_calls: %s", i, m.tool_calls)
+            _log_llm_request(messages)
 
             t0 = time.time()
-            response = bound_llm.invoke(messages)
+            response = bound_llm.invoke(LLMFactory.mark_cache_breakpoints(llm, messages))
             elapsed = time.time() - t0
-
-            # Log LLM output
-            logger.info("[LLM Response] %.2fs", elapsed)
-            logger.info("  content: %s", str(response.content)[:500] if response.content else "(empty)")
-            if hasattr(response, "tool_calls") and response.tool_calls:
-                for tc in response.tool_calls:
-                    logger.info("  tool_call: %s(%s)", tc["name"], tc.get("args", {}))
-            logger.info("=" * 60)
+            _log_llm_response(response, elapsed)
+            record_llm_call(llm, "agent", elapsed, response)
 
             return {"messages": [response]}
 
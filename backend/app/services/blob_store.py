@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import BLOB_STORE_EVICTED
+
+logger = logging.getLogger("app.blob_store")
+
+
+class BlobNotFound(KeyError):
+    """Raised when a blob reference does not resolve to stored content."""
+
+
+class BlobStore:
+    """
+    Content-addressed text store on the local filesystem.
+
+    Each blob is written once under `root/<sha256[:2]>/<sha256>`; storing the
+    same content again is a no-op. Writes go through a temporary file and an
+    atomic rename, so concurrent writers and readers never see partial blobs.
+    Storing or reading a blob refreshes its mtime, and sweep() removes blobs
+    unused for longer than `ttl` seconds, then the least recently used ones
+    while the total exceeds `max_bytes`. Methods do blocking file I/O; call
+    them via asyncio.to_thread from coroutines.
+    """
+
+    def __init__(self, root: str, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.root = root
+        self.ttl = ttl if ttl is not None else settings.BLOB_STORE_TTL
+        self.max_bytes = max_bytes if max_bytes is not None else settings.BLOB_STORE_MAX_BYTES
+
+    def _path(self, digest: str) -> str:
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest):
+            raise BlobNotFound(digest)
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, text: str) -> str:
+        """Store text and return its SHA-256 digest."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        if self._touch(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        logger.debug("Stored blob %s (%d bytes)", digest, len(data))
+        return digest
+
+    def get(self, digest: str) -> str:
+        """Return the text stored under digest."""
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                text = f.read().decode("utf-8")
+        except FileNotFoundError:
+            raise BlobNotFound(digest)
+        self._touch(path)
+        return text
+
+    def _touch(self, path: str) -> bool:
+        """Mark a blob as just used; returns False if it does not exist."""
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def sweep(self) -> int:
+        """Remove expired blobs, then the least recently used ones above max_bytes; returns how many were removed."""
+        if not os.path.isdir(self.root):
+            return 0
+        now = time.time()
+        blobs = []  # (mtime, size, path) of blobs that survive the TTL
+        removed = 0
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                age = now - stat.st_mtime
+                if entry.name.startswith(".tmp-"):
+                    # Left behind by a writer that died mid-put
+                    if age > 3600:
+                        self._remove(entry.path)
+                    continue
+                if age > self.ttl:
+                    if self._remove(entry.path):
+                        BLOB_STORE_EVICTED.labels("expired").inc()
+                        removed += 1
+                else:
+                    blobs.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in blobs)
+        for _, size, path in sorted(blobs):
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                BLOB_STORE_EVICTED.labels("size").inc()
+                removed += 1
+            total -= size
+        if removed:
+            logger.info("Swept %d blobs from %s (%d bytes kept)", removed, self.root, total)
+        return removed
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    """Return the process-wide blob store, configured from settings."""
+    global _store
+    if _store is None:
+        _store = BlobStore(settings.BLOB_STORE_PATH)
+    return _store
+
+
+class BlobSweeper:
+    """Runs BlobStore.sweep every BLOB_STORE_SWEEP_INTERVAL seconds, off the event loop."""
+
+    def __init__(self, store: BlobStore, interval: Optional[float] = None):
+        self.store = store
+        self.interval = interval if interval is not None else settings.BLOB_STORE_SWEEP_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.store.sweep)
+            except Exception as e:
+                logger.warning("Blob store sweep failed: %s", e)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,170 @@
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import func, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.core.metrics import CATEGORY_CACHE_LOOKUPS
+from app.core.pg_listener import PostgresListener
+from app.models.category import Category
+from app.schemas.category import Category as CategorySchema
+from app.services.category_list_cache import get_category_list_cache
+
+logger = logging.getLogger("app.category_cache")
+
+
+def _version(updated_at) -> float:
+    return updated_at.timestamp() if updated_at is not None else 0.0
+
+
+@dataclass
+class _Entry:
+    config: CategorySchema
+    version: float  # updated_at of the row it was loaded from
+    expires_at: float
+
+
+class CategoryConfigCache:
+    """
+    Read-through cache of category configuration: the row and its MCP servers.
+
+    Entries are CategorySchema objects detached from the session and shared
+    between connections as they are, so callers must treat them as read-only.
+    They are versioned by the row's updated_at (which server writes bump too,
+    see commit_category_change). An invalidation carrying a version keeps an
+    entry only if it was loaded from a strictly newer row. A load that
+    overlaps an invalidation of its category, or of everything, is returned
+    but not cached. Entries also expire after CATEGORY_CONFIG_CACHE_TTL
+    seconds, in case a notification is missed.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else settings.CATEGORY_CONFIG_CACHE_TTL
+        self._entries: Dict[int, _Entry] = {}
+        # Bumped by invalidate(None); per-category generations are kept only while a load is in flight
+        self._epoch = 0
+        self._generations: Dict[int, int] = {}
+        self._loading: Dict[int, int] = {}
+
+    async def get(self, db: AsyncSession, category_id: int) -> Optional[CategorySchema]:
+        entry = self._entries.get(category_id)
+        if entry is not None and entry.expires_at > time.monotonic():
+            CATEGORY_CACHE_LOOKUPS.labels("hit").inc()
+            return entry.config
+        CATEGORY_CACHE_LOOKUPS.labels("miss").inc()
+
+        self._loading[category_id] = self._loading.get(category_id, 0) + 1
+        started = (self._epoch, self._generations.get(category_id, 0))
+        try:
+            result = await db.execute(
+                select(Category)
+                .where(Category.id == category_id)
+                .options(selectinload(Category.mcp_servers))
+            )
+            category = result.scalars().first()
+        finally:
+            invalidated = (self._epoch, self._generations.get(category_id, 0)) != started
+            self._loading[category_id] -= 1
+            if not self._loading[category_id]:
+                del self._loading[category_id]
+                self._generations.pop(category_id, None)
+        if category is None:
+            return None
+        config = CategorySchema.model_validate(category)
+        if self.ttl > 0 and not invalidated:
+            self._entries[category_id] = _Entry(config, _version(category.updated_at), time.monotonic() + self.ttl)
+        return config
+
+    def invalidate(self, category_id: Optional[int] = None, version: Optional[float] = None) -> int:
+        """Drop a category's entry (every entry if category_id is None); returns how many were dropped."""
+        if category_id is None:
+            self._epoch += 1
+            dropped = len(self._entries)
+            self._entries.clear()
+            return dropped
+        if category_id in self._loading:
+            self._generations[category_id] = self._generations.get(category_id, 0) + 1
+        entry = self._entries.get(category_id)
+        if entry is None or (version is not None and entry.version > version):
+            return 0
+        del self._entries[category_id]
+        return 1
+
+
+_cache: Optional[CategoryConfigCache] = None
+
+
+def get_category_cache() -> CategoryConfigCache:
+    """Return the process-wide category config cache."""
+    global _cache
+    if _cache is None:
+        _cache = CategoryConfigCache()
+    return _cache
+
+
+def _apply_change(category_id: Optional[int], version: Optional[float]):
+    get_category_cache().invalidate(category_id, version)
+    get_category_list_cache().invalidate()
+
+
+async def commit_category_change(db: AsyncSession, category_id: int):
+    """
+    Commit db after a write to a category or its servers, and invalidate
+    the category on every worker: bumps updated_at (the cache version),
+    queues a NOTIFY on Postgres (delivered only if the commit succeeds),
+    commits, then invalidates this worker's caches.
+    """
+    postgres = db.bind is not None and db.bind.dialect.name == "postgresql"
+    # Writers of a category serialise on its row lock, so clock_timestamp() taken once the lock is
+    # held orders versions like commits; now() is the transaction start and would not
+    version = _version(await db.scalar(
+        update(Category)
+        .where(Category.id == category_id)
+        .values(updated_at=func.clock_timestamp() if postgres else func.now())
+        .returning(Category.updated_at)
+    ))
+    if postgres:
+        await db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {
+                "channel": settings.CATEGORY_NOTIFY_CHANNEL,
+                "payload": json.dumps({"category_id": category_id, "version": version}),
+            },
+        )
+    await db.commit()
+    _apply_change(category_id, version)
+
+
+class CategoryChangeListener(PostgresListener):
+    """
+    Applies other workers' category changes (NOTIFYs on
+    CATEGORY_NOTIFY_CHANNEL) to this worker's caches. After a reconnect
+    everything is invalidated, since notifications may have been missed in
+    between.
+    """
+
+    def __init__(self, database_url: str):
+        super().__init__(
+            database_url, settings.CATEGORY_NOTIFY_CHANNEL, settings.CATEGORY_CACHE_LISTEN_CHECK_INTERVAL,
+        )
+
+    def start(self):
+        if settings.CATEGORY_CACHE_LISTEN:
+            super().start()
+
+    def handle(self, payload: str):
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed category notification: %r", payload)
+            return
+        _apply_change(change.get("category_id"), change.get("version"))
+
+    def on_connect(self):
+        _apply_change(None, None)
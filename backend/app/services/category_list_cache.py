@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional
+
+from app.core.config import settings
+from app.core.metrics import CATEGORY_LIST_CACHE_LOOKUPS
+
+logger = logging.getLogger("app.category_list_cache")
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value covers etag (weak comparison, as RFC 9110 asks for GET)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@dataclass
+class Listing:
+    body: bytes  # JSON as sent
+    etag: str
+    next_cursor: Optional[int]  # id to pass as ?after= for the next page, None on the last page
+    expires_at: float
+
+
+class CategoryListCache:
+    """
+    Short-lived cache of rendered category listings.
+
+    Each page (view, cursor, page size) is kept as the exact JSON bytes sent
+    with an ETag hashed from them, so a hit costs neither a query nor
+    serialisation, and clients revalidate with If-None-Match. Writes to
+    categories or MCP servers clear the cache of the worker that handled
+    them; other workers serve at most CATEGORY_LIST_CACHE_TTL seconds of
+    stale listings. Since cursors and page sizes come from clients, at most
+    CATEGORY_LIST_CACHE_MAX_ENTRIES pages are kept, least recently used
+    first out, and expired pages are dropped whenever one is added.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.CATEGORY_LIST_CACHE_TTL
+        self.max_entries = max_entries if max_entries is not None else settings.CATEGORY_LIST_CACHE_MAX_ENTRIES
+        self._listings: "OrderedDict[Hashable, Listing]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Listing]:
+        listing = self._listings.get(key)
+        if listing is None or listing.expires_at <= time.monotonic():
+            self._listings.pop(key, None)
+            CATEGORY_LIST_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+        self._listings.move_to_end(key)
+        CATEGORY_LIST_CACHE_LOOKUPS.labels("hit").inc()
+        return listing
+
+    def put(self, key: Hashable, body: bytes, next_cursor: Optional[int] = None) -> Listing:
+        now = time.monotonic()
+        listing = Listing(body, etag_for(body), next_cursor, now + self.ttl)
+        if self.ttl > 0 and self.max_entries > 0:
+            for stale in [k for k, cached in self._listings.items() if cached.expires_at <= now]:
+                del self._listings[stale]
+            self._listings[key] = listing
+            self._listings.move_to_end(key)
+            while len(self._listings) > self.max_entries:
+                self._listings.popitem(last=False)
+        return listing
+
+    def invalidate(self) -> int:
+        """Drop every cached listing; returns how many were dropped."""
+        dropped = len(self._listings)
+        self._listings.clear()
+        logger.debug("Invalidated %d cached category listings", dropped)
+        return dropped
+
+
+_cache: Optional[CategoryListCache] = None
+
+
+def get_category_list_cache() -> CategoryListCache:
+    """Return the process-wide category listing cache."""
+    global _cache
+    if _cache is None:
+        _cache = CategoryListCache()
+    return _cache
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from app.core.compute_pool import get_compute_pool
+from app.core.config import settings
+from app.core.log import preview
+from app.core.metrics import PROMPT_TOKENS, record_llm_call
+from app.services.context_service import get_tokenizer, nearest
+from app.services.embedding_service import EmbeddingService, get_embedding_service
+from app.services.prompt_builder import allocate_budget
+
+logger = logging.getLogger("app.memory")
+
+SUMMARY_PROMPT = (
+    "You maintain the long-term memory of a conversation between a user and an AI assistant. "
+    "Summarise the conversation excerpt below in a few concise bullet points. Keep facts, "
+    "decisions, names, identifiers, numbers and open questions; drop pleasantries and "
+    "tool-call mechanics."
+)
+
+# Tool output is abbreviated when a turn is rendered for summaries and recall
+TOOL_OUTPUT_PREVIEW = 1000
+
+TIERS = ("summary", "recall", "recent")
+
+
+def _content_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    return str(content)
+
+
+def render_message(message: BaseMessage) -> str:
+    """Render a message as a single 'Role: text' line for summaries and recall."""
+    text = _content_text(message)
+    if isinstance(message, HumanMessage):
+        return f"User: {text}"
+    if isinstance(message, ToolMessage):
+        return f"Tool {message.name or ''}: {preview(text, TOOL_OUTPUT_PREVIEW)}"
+    if isinstance(message, AIMessage) and not text and message.tool_calls:
+        return "Assistant called: " + ", ".join(c["name"] for c in message.tool_calls)
+    role = "Assistant" if isinstance(message, AIMessage) else "System"
+    return f"{role}: {text}"
+
+
+class _Turn:
+    """One user message and everything the assistant produced in reply."""
+
+    def __init__(self, messages: List[BaseMessage]):
+        self.messages = messages
+        self._text: Optional[str] = None
+        self._tokens: Optional[int] = None
+
+    def extend(self, messages: List[BaseMessage]):
+        self.messages.extend(messages)
+        self._text = self._tokens = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(render_message(m) for m in self.messages)
+        return self._text
+
+    def tokens(self, count_tokens: Callable[[str], int]) -> int:
+        if self._tokens is None:
+            self._tokens = count_tokens("\n".join(_content_text(m) for m in self.messages))
+        return self._tokens
+
+
+class ConversationMemory:
+    """
+    Tiered memory for one chat conversation.
+
+    The most recent turns are kept verbatim. Older turns are evicted into two
+    tiers: a vector index that recalls the turns most similar to the new
+    message, and rolling LLM summaries computed in the background, with older
+    summaries folded together as the tier grows. Each prompt gets a fixed
+    token budget split across the tiers by `allocate_budget`, so prompt size
+    stays flat however long the conversation runs.
+    """
+
+    def __init__(
+        self,
+        system_message: SystemMessage,
+        llm: BaseChatModel,
+        model_name: str = "all-MiniLM-L6-v2",
+        token_budget: Optional[int] = None,
+        weights: Optional[Dict[str, float]] = None,
+        recent_turns: Optional[int] = None,
+        segment_turns: Optional[int] = None,
+        recall_k: Optional[int] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        embeddings: Optional[EmbeddingService] = None,
+    ):
+        self.system_message = system_message
+        self.llm = llm
+        self.token_budget = token_budget or settings.MEMORY_TOKEN_BUDGET
+        self.weights = weights or settings.MEMORY_TIER_WEIGHTS
+        self.recent_turns = max(1, recent_turns or settings.MEMORY_RECENT_TURNS)
+        self.segment_turns = max(1, segment_turns or settings.MEMORY_SEGMENT_TURNS)
+        self.recall_k = recall_k or settings.MEMORY_RECALL_K
+        self._count_tokens = count_tokens or (lambda text: len(get_tokenizer().encode(text)))
+        self._embeddings = embeddings or get_embedding_service(model_name)
+
+        self._turns: List[_Turn] = []  # recent window, verbatim
+        self._unsummarised: List[_Turn] = []  # evicted, waiting for the summariser
+        self._summaries: List[str] = []  # oldest first
+        self._recall_texts: List[str] = []
+        self._recall_vectors: List[List[float]] = []
+        self._summariser: Optional[asyncio.Task] = None
+        self._turn_count = 0
+
+    @property
+    def turn_count(self) -> int:
+        """Turns recorded so far, including evicted ones."""
+        return self._turn_count
+
+    # -- recording ---------------------------------------------------------
+
+    def start_turn(self, content: str):
+        """Begin a new turn with the user's message."""
+        self._turns.append(_Turn([HumanMessage(content=content)]))
+        self._turn_count += 1
+
+    def extend(self, messages: List[BaseMessage]):
+        """Append the assistant's messages (including tool calls) to the current turn."""
+        if messages:
+            self._turns[-1].extend(list(messages))
+
+    def discard_turn(self):
+        """Drop the current turn, e.g. when answering it failed."""
+        if self._turns:
+            self._turns.pop()
+            self._turn_count -= 1
+
+    # -- prompt assembly ---------------------------------------------------
+
+    async def build_messages(self, query: str) -> List[BaseMessage]:
+        """Return the messages to send for the current turn, within the token budget."""
+        await self._evict()
+        hits = await self._recall(query)
+
+        summary_tokens = [self._count_tokens(s) for s in self._summaries]
+        hit_tokens = [self._count_tokens(h) for h in hits]
+        turn_tokens = [t.tokens(self._count_tokens) for t in self._turns]
+        allocation = allocate_budget(
+            self.token_budget,
+            {"summary": sum(summary_tokens), "recall": sum(hit_tokens), "recent": sum(turn_tokens)},
+            self.weights,
+        )
+
+        # Newest turns first; the current turn is always sent
+        recent, used = [], 0
+        for turn, tokens in reversed(list(zip(self._turns, turn_tokens))):
+            if recent and used + tokens > allocation["recent"]:
+                break
+            recent.insert(0, turn)
+            used += tokens
+        summaries = _fit(self._summaries, summary_tokens, allocation["summary"], newest_first=True)
+        recalled = _fit(hits, hit_tokens, allocation["recall"])
+
+        usage = {
+            "summary": sum(self._count_tokens(s) for s in summaries),
+            "recall": sum(self._count_tokens(h) for h in recalled),
+            "recent": used,
+        }
+        for tier, tokens in usage.items():
+            PROMPT_TOKENS.labels("chat_memory", tier).observe(tokens)
+        logger.debug(
+            "Memory prompt: %d/%d turns, %d/%d summaries, %d recalled | tokens %s of %d",
+            len(recent), len(self._turns), len(summaries), len(self._summaries), len(recalled),
+            usage, self.token_budget,
+        )
+
+        parts = []
+        if summaries:
+            parts.append("## Summary of earlier conversation\n" + "\n\n".join(summaries))
+        if recalled:
+            parts.append("## Relevant earlier messages\n" + "\n\n".join(recalled))
+
+        messages: List[BaseMessage] = [self.system_message]
+        if parts:
+            messages.append(SystemMessage(
+                content="The following is memory from earlier in this conversation:\n\n" + "\n\n".join(parts)
+            ))
+        for turn in recent:
+            messages.extend(turn.messages)
+        return messages
+
+    async def _evict(self):
+        """Move turns beyond the recent window into the recall index and summariser queue."""
+        if len(self._turns) <= self.recent_turns:
+            return
+        evicted = self._turns[:-self.recent_turns]
+        del self._turns[:-self.recent_turns]
+
+        texts = [t.text for t in evicted]
+        try:
+            vectors = await self._embeddings.embed(texts)
+            self._recall_texts.extend(texts)
+            self._recall_vectors.extend(vectors)
+        except Exception as e:
+            logger.warning("Could not index %d turns for recall: %s", len(texts), e)
+
+        self._unsummarised.extend(evicted)
+        if len(self._unsummarised) >= self.segment_turns and (
+            self._summariser is None or self._summariser.done()
+        ):
+            self._summariser = asyncio.create_task(self._summarise_pending())
+
+    async def _recall(self, query: str) -> List[str]:
+        """Return indexed turns most similar to query, best match first."""
+        if not self._recall_texts:
+            return []
+        try:
+            [query_vector] = await self._embeddings.embed([query])
+            ids = await get_compute_pool().run(nearest, self._recall_vectors, query_vector, self.recall_k)
+        except Exception as e:
+            logger.warning("Skipping memory recall: %s", e)
+            return []
+        return [self._recall_texts[i] for i in ids]
+
+    # -- background summarisation -----------------------------------------
+
+    def _summary_limit(self) -> int:
+        weight_sum = sum(self.weights.get(t, 0) for t in TIERS) or 1
+        return int(self.token_budget * self.weights.get("summary", 0) / weight_sum)
+
+    async def _summarise_pending(self):
+        try:
+            while len(self._unsummarised) >= self.segment_turns:
+                segment = self._unsummarised[:self.segment_turns]
+                summary = await self._summarise("\n\n".join(t.text for t in segment))
+                del self._unsummarised[:self.segment_turns]
+                self._summaries.append(summary)
+
+                # Fold the two oldest summaries together until the tier fits its share
+                while (
+                    len(self._summaries) > 1
+                    and sum(self._count_tokens(s) for s in self._summaries) > self._summary_limit()
+                ):
+                    merged = await self._summarise("\n\n".join(self._summaries[:2]))
+                    self._summaries[:2] = [merged]
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Conversation summarisation failed: %s", e)
+
+    async def _summarise(self, text: str) -> str:
+        t0 = time.time()
+        response = await self.llm.ainvoke([SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=text)])
+        record_llm_call(self.llm, "memory_summary", time.time() - t0, response)
+        return str(response.content)
+
+    def close(self):
+        """Cancel any summarisation still running for this conversation."""
+        if self._summariser is not None and not self._summariser.done():
+            self._summariser.cancel()
+
+
+def _fit(texts: List[str], tokens: List[int], budget: int, newest_first: bool = False) -> List[str]:
+    """Keep texts in order while they fit within budget (from the end if newest_first)."""
+    order = range(len(texts) - 1, -1, -1) if newest_first else range(len(texts))
+    kept, used = [], 0
+    for i in order:
+        if used + tokens[i] > budget:
+            break
+        kept.append(i)
+        used += tokens[i]
+    return [texts[i] for i in sorted(kept)]
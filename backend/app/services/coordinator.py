@@ -0,0 +1,607 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete, or_, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.metrics import COORDINATOR_JOBS
+from app.core.pg_listener import PostgresListener
+from app.models.coordination import CoordinationJob, CoordinationLease
+
+logger = logging.getLogger("app.coordinator")
+
+# Identifies this process as a lease and job owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+@dataclass
+class Job:
+    id: str
+    queue: str
+    payload: Dict[str, Any]
+    status: str = JOB_PENDING
+    owner: Optional[str] = None
+    lease_expires_at: Optional[float] = None
+    attempts: int = 0
+    result: Any = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JOB_SUCCEEDED, JOB_FAILED)
+
+
+def queue_key(queue: str) -> str:
+    """Wakeup key signalled when work is added to a queue."""
+    return f"queue:{queue}"
+
+
+def job_key(job_id: str) -> str:
+    """Wakeup key signalled when a job finishes."""
+    return f"job:{job_id}"
+
+
+class Coordinator(ABC):
+    """
+    Placement and work distribution shared by every worker process.
+
+    Leases give one owner exclusive use of a name (a conversation, a task)
+    until they expire unless renewed, so a crashed worker's placements are
+    freed automatically. Jobs are queued work that any worker may claim; the
+    claim is itself a lease, and a job whose worker stops renewing goes back
+    to the queue until it has used COORDINATION_JOB_MAX_ATTEMPTS. The result
+    is stored on the job, where the enqueuer waits for it.
+
+    Waiters are woken through signals: enqueues signal the queue's key and
+    finished jobs their job's key, in this process directly and in others
+    through the backend (LISTEN/NOTIFY on Postgres). Polling every
+    COORDINATION_POLL_INTERVAL remains only as a fallback for missed signals
+    and expired leases.
+
+    InMemoryCoordinator serves a single process and tests; DatabaseCoordinator
+    shares state between processes through the coordination tables.
+    """
+
+    # Whether other processes can claim this coordinator's jobs; if not, there is no point queueing work
+    distributed = False
+
+    def __init__(self):
+        self._wakeups: Dict[str, asyncio.Event] = {}
+
+    def start(self):
+        """Start background work (e.g. listening for other workers' signals)."""
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew the lease on name; False if another owner holds it."""
+
+    @abstractmethod
+    async def release_lease(self, name: str, owner: str):
+        pass
+
+    @abstractmethod
+    async def lease_owner(self, name: str) -> Optional[str]:
+        """Current holder of an unexpired lease, if any."""
+
+    @abstractmethod
+    async def enqueue(self, queue: str, payload: Dict[str, Any]) -> str:
+        pass
+
+    @abstractmethod
+    async def claim(self, queue: str, owner: str, ttl: float) -> Optional[Job]:
+        """Lease the oldest claimable job on queue to owner, if any."""
+
+    @abstractmethod
+    async def renew_job(self, job_id: str, owner: str, ttl: float) -> bool:
+        """Extend a job lease; False if the job was lost to another worker."""
+
+    @abstractmethod
+    async def complete(self, job_id: str, owner: str, result: Any, failed: bool = False) -> bool:
+        """Store a job's result; ignored (False) if owner no longer holds the job."""
+
+    @abstractmethod
+    async def abandon(self, job_id: str, reason: str) -> bool:
+        """Fail a job that is not done yet, whoever holds it; False if it already finished."""
+
+    @abstractmethod
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        pass
+
+    @abstractmethod
+    async def discard(self, job_id: str):
+        """Delete a job if it is done (its waiter has the result); unfinished jobs are kept."""
+
+    def wakeup(self, key: str) -> asyncio.Event:
+        """Event set the next time key is signalled; take it before checking for work, then wait on it."""
+        event = self._wakeups.get(key)
+        if event is None:
+            event = self._wakeups[key] = asyncio.Event()
+        return event
+
+    def signal(self, key: str):
+        event = self._wakeups.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def signal_all(self):
+        """Wake every waiter, e.g. after signals from other workers may have been missed."""
+        for key in list(self._wakeups):
+            self.signal(key)
+
+    async def wait_for(self, job_id: str, timeout: Optional[float] = None) -> Job:
+        """
+        Wait until the job is done. After timeout seconds (COORDINATION_JOB_TIMEOUT
+        by default) the job is abandoned, so no worker runs it later, and
+        asyncio.TimeoutError is raised; a cancelled waiter abandons it too.
+        Either way the job is deleted once done, since only its waiter reads it.
+        """
+        timeout = timeout if timeout is not None else settings.COORDINATION_JOB_TIMEOUT
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                wakeup = self.wakeup(job_key(job_id))
+                job = await self.get_job(job_id)
+                if job is None:
+                    raise KeyError(job_id)
+                if job.done:
+                    return job
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    reason = f"no result within {timeout:g}s"
+                    await self.abandon(job_id, reason)
+                    raise asyncio.TimeoutError(f"Job {job_id}: {reason}")
+                try:
+                    await asyncio.wait_for(wakeup.wait(), min(remaining, settings.COORDINATION_POLL_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            # Nobody wants the result any more; stop workers from starting (or finishing) it for nothing
+            try:
+                await self.abandon(job_id, "waiter cancelled")
+            except Exception as e:
+                logger.warning("Abandoning job %s failed: %s", job_id, e)
+            raise
+        finally:
+            self._wakeups.pop(job_key(job_id), None)
+            try:
+                await self.discard(job_id)
+            except Exception as e:
+                logger.warning("Deleting job %s failed: %s", job_id, e)
+
+    @asynccontextmanager
+    async def hold(self, name: str, owner: str = WORKER_ID, ttl: Optional[float] = None):
+        """Hold a lease for the duration of the block, renewing it in the background."""
+        ttl = ttl or settings.COORDINATION_LEASE_TTL
+        if not await self.acquire_lease(name, owner, ttl):
+            raise RuntimeError(f"Lease {name} is held by {await self.lease_owner(name)}")
+
+        async def renew():
+            while True:
+                await asyncio.sleep(ttl / 3)
+                if not await self.acquire_lease(name, owner, ttl):
+                    logger.warning("Lost lease %s", name)
+                    return
+
+        renewer = asyncio.create_task(renew())
+        try:
+            yield
+        finally:
+            renewer.cancel()
+            await self.release_lease(name, owner)
+
+    def _expired_attempt(self, job: Job) -> bool:
+        """Whether a reclaimed job has used up its attempts; marks it failed if so."""
+        if job.attempts < settings.COORDINATION_JOB_MAX_ATTEMPTS:
+            return False
+        job.status = JOB_FAILED
+        job.result = f"Error: job abandoned after {job.attempts} attempts (worker lost)"
+        job.owner = None
+        job.lease_expires_at = None
+        COORDINATOR_JOBS.labels(JOB_FAILED).inc()
+        logger.warning("Job %s on %s failed: %s", job.id, job.queue, job.result)
+        return True
+
+
+class InMemoryCoordinator(Coordinator):
+    """Coordinator state in this process only."""
+
+    def __init__(self):
+        super().__init__()
+        self._leases: Dict[str, tuple[str, float]] = {}
+        self._jobs: Dict[str, Job] = {}
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        held = self._leases.get(name)
+        if held and held[0] != owner and held[1] > now:
+            return False
+        self._leases[name] = (owner, now + ttl)
+        return True
+
+    async def release_lease(self, name: str, owner: str):
+        if self._leases.get(name, (None,))[0] == owner:
+            del self._leases[name]
+
+    async def lease_owner(self, name: str) -> Optional[str]:
+        held = self._leases.get(name)
+        return held[0] if held and held[1] > time.time() else None
+
+    async def enqueue(self, queue: str, payload: Dict[str, Any]) -> str:
+        job = Job(id=str(uuid.uuid4()), queue=queue, payload=payload)
+        self._jobs[job.id] = job
+        COORDINATOR_JOBS.labels("enqueued").inc()
+        self.signal(queue_key(queue))
+        return job.id
+
+    async def claim(self, queue: str, owner: str, ttl: float) -> Optional[Job]:
+        now = time.time()
+        for job in self._jobs.values():
+            if job.queue != queue:
+                continue
+            if job.status == JOB_RUNNING and job.lease_expires_at < now:
+                if self._expired_attempt(job):
+                    self.signal(job_key(job.id))
+                    continue
+            elif job.status != JOB_PENDING:
+                continue
+            job.status = JOB_RUNNING
+            job.owner = owner
+            job.lease_expires_at = now + ttl
+            job.attempts += 1
+            return Job(**vars(job))
+        return None
+
+    async def renew_job(self, job_id: str, owner: str, ttl: float) -> bool:
+        job = self._jobs.get(job_id)
+        if not job or job.status != JOB_RUNNING or job.owner != owner:
+            return False
+        job.lease_expires_at = time.time() + ttl
+        return True
+
+    async def complete(self, job_id: str, owner: str, result: Any, failed: bool = False) -> bool:
+        job = self._jobs.get(job_id)
+        if not job or job.status != JOB_RUNNING or job.owner != owner:
+            return False
+        self._finish(job, JOB_FAILED if failed else JOB_SUCCEEDED, result)
+        return True
+
+    async def abandon(self, job_id: str, reason: str) -> bool:
+        job = self._jobs.get(job_id)
+        if not job or job.done:
+            return False
+        self._finish(job, JOB_FAILED, f"Error: {reason}")
+        logger.warning("Job %s on %s abandoned: %s", job.id, job.queue, reason)
+        return True
+
+    def _finish(self, job: Job, status: str, result: Any):
+        job.status = status
+        job.result = result
+        job.owner = None
+        job.lease_expires_at = None
+        COORDINATOR_JOBS.labels(status).inc()
+        self.signal(job_key(job.id))
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        return Job(**vars(job)) if job else None
+
+    async def discard(self, job_id: str):
+        job = self._jobs.get(job_id)
+        if job is not None and job.done:
+            del self._jobs[job_id]
+
+
+class DatabaseCoordinator(Coordinator):
+    """
+    Coordinator state in the coordination_leases and coordination_jobs tables.
+
+    Job claims use SELECT ... FOR UPDATE SKIP LOCKED on PostgreSQL, so
+    concurrent workers never block on or double-claim the same row. Signals
+    are sent with NOTIFY on COORDINATION_NOTIFY_CHANNEL in the transaction
+    that changes the job, so other workers only wake once it is committed.
+    """
+
+    distributed = True
+
+    def __init__(self, session_factory=None, database_url: Optional[str] = None):
+        super().__init__()
+        if session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self.session_factory = session_factory
+        self._listener = _SignalListener(self, database_url or settings.DATABASE_URL)
+
+    def start(self):
+        self._listener.start()
+
+    async def stop(self):
+        await self._listener.stop()
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+        async with self.session_factory() as session:
+            lease = (await session.execute(
+                select(CoordinationLease).where(CoordinationLease.name == name).with_for_update()
+            )).scalars().first()
+            if lease is None:
+                session.add(CoordinationLease(name=name, owner=owner, expires_at=now + ttl))
+            elif lease.owner == owner or lease.expires_at <= now:
+                lease.owner = owner
+                lease.expires_at = now + ttl
+            else:
+                return False
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Another worker created the lease first
+                return False
+        return True
+
+    async def release_lease(self, name: str, owner: str):
+        async with self.session_factory() as session:
+            await session.execute(
+                delete(CoordinationLease).where(CoordinationLease.name == name, CoordinationLease.owner == owner)
+            )
+            await session.commit()
+
+    async def lease_owner(self, name: str) -> Optional[str]:
+        async with self.session_factory() as session:
+            lease = await session.get(CoordinationLease, name)
+            return lease.owner if lease and lease.expires_at > time.time() else None
+
+    async def enqueue(self, queue: str, payload: Dict[str, Any]) -> str:
+        job_id = str(uuid.uuid4())
+        async with self.session_factory() as session:
+            session.add(CoordinationJob(id=job_id, queue=queue, payload=payload, status=JOB_PENDING, attempts=0))
+            await self._commit_and_signal(session, queue_key(queue))
+        COORDINATOR_JOBS.labels("enqueued").inc()
+        return job_id
+
+    async def claim(self, queue: str, owner: str, ttl: float) -> Optional[Job]:
+        now = time.time()
+        async with self.session_factory() as session:
+            while True:
+                row = (await session.execute(
+                    select(CoordinationJob)
+                    .where(
+                        CoordinationJob.queue == queue,
+                        or_(
+                            CoordinationJob.status == JOB_PENDING,
+                            (CoordinationJob.status == JOB_RUNNING) & (CoordinationJob.lease_expires_at < now),
+                        ),
+                    )
+                    .order_by(CoordinationJob.created_at, CoordinationJob.id)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                )).scalars().first()
+                if row is None:
+                    return None
+                job = _to_job(row)
+                if job.status == JOB_RUNNING and self._expired_attempt(job):
+                    _update_row(row, job)
+                    await self._commit_and_signal(session, job_key(job.id))
+                    continue
+                row.status = JOB_RUNNING
+                row.owner = owner
+                row.lease_expires_at = now + ttl
+                row.attempts += 1
+                await session.commit()
+                return _to_job(row)
+
+    async def renew_job(self, job_id: str, owner: str, ttl: float) -> bool:
+        async with self.session_factory() as session:
+            row = await self._lock_job(session, job_id)
+            if row is None or row.status != JOB_RUNNING or row.owner != owner:
+                return False
+            row.lease_expires_at = time.time() + ttl
+            await session.commit()
+            return True
+
+    async def complete(self, job_id: str, owner: str, result: Any, failed: bool = False) -> bool:
+        status = JOB_FAILED if failed else JOB_SUCCEEDED
+        async with self.session_factory() as session:
+            row = await self._lock_job(session, job_id)
+            if row is None or row.status != JOB_RUNNING or row.owner != owner:
+                return False
+            _finish_row(row, status, result)
+            await self._commit_and_signal(session, job_key(job_id))
+        COORDINATOR_JOBS.labels(status).inc()
+        return True
+
+    async def abandon(self, job_id: str, reason: str) -> bool:
+        async with self.session_factory() as session:
+            row = await self._lock_job(session, job_id)
+            if row is None or row.status in (JOB_SUCCEEDED, JOB_FAILED):
+                return False
+            _finish_row(row, JOB_FAILED, f"Error: {reason}")
+            await self._commit_and_signal(session, job_key(job_id))
+        COORDINATOR_JOBS.labels(JOB_FAILED).inc()
+        logger.warning("Job %s abandoned: %s", job_id, reason)
+        return True
+
+    async def get_job(self, job_id: str) -> Optional[Job]:
+        async with self.session_factory() as session:
+            row = await session.get(CoordinationJob, job_id)
+            return _to_job(row) if row else None
+
+    async def discard(self, job_id: str):
+        async with self.session_factory() as session:
+            await session.execute(
+                delete(CoordinationJob).where(
+                    CoordinationJob.id == job_id, CoordinationJob.status.in_((JOB_SUCCEEDED, JOB_FAILED)),
+                )
+            )
+            await session.commit()
+
+    @staticmethod
+    async def _lock_job(session, job_id: str):
+        return (await session.execute(
+            select(CoordinationJob).where(CoordinationJob.id == job_id).with_for_update()
+        )).scalars().first()
+
+    async def _commit_and_signal(self, session, key: str):
+        """Commit, with a NOTIFY of key to other workers on Postgres, then signal this worker."""
+        if session.bind is not None and session.bind.dialect.name == "postgresql":
+            await session.execute(
+                text("SELECT pg_notify(:channel, :key)"),
+                {"channel": settings.COORDINATION_NOTIFY_CHANNEL, "key": key},
+            )
+        await session.commit()
+        self.signal(key)
+
+
+class _SignalListener(PostgresListener):
+    """Passes NOTIFYs on COORDINATION_NOTIFY_CHANNEL to a coordinator's signals."""
+
+    def __init__(self, coordinator: Coordinator, database_url: str):
+        super().__init__(database_url, settings.COORDINATION_NOTIFY_CHANNEL)
+        self.coordinator = coordinator
+
+    def handle(self, payload: str):
+        self.coordinator.signal(payload)
+
+    def on_connect(self):
+        self.coordinator.signal_all()
+
+
+def _to_job(row) -> Job:
+    return Job(
+        id=row.id, queue=row.queue, payload=row.payload, status=row.status, owner=row.owner,
+        lease_expires_at=row.lease_expires_at, attempts=row.attempts, result=row.result,
+    )
+
+
+def _update_row(row, job: Job):
+    for key in ("status", "owner", "lease_expires_at", "result"):
+        setattr(row, key, getattr(job, key))
+
+
+def _finish_row(row, status: str, result: Any):
+    row.status = status
+    row.result = result
+    row.owner = None
+    row.lease_expires_at = None
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class JobWorker:
+    """
+    Claims jobs from one queue and runs them with a handler.
+
+    Up to `concurrency` jobs run at once; each job's lease is renewed while
+    its handler runs, and the handler's return value (or error) is stored as
+    the job result. An idle worker sleeps until the queue is signalled, or
+    COORDINATION_POLL_INTERVAL at most.
+    """
+
+    def __init__(
+        self,
+        coordinator: Coordinator,
+        queue: str,
+        handler: JobHandler,
+        owner: str = WORKER_ID,
+        concurrency: Optional[int] = None,
+    ):
+        self.coordinator = coordinator
+        self.queue = queue
+        self.handler = handler
+        self.owner = owner
+        self.ttl = settings.COORDINATION_JOB_LEASE_TTL
+        self._slots = asyncio.Semaphore(concurrency or settings.COORDINATION_WORKER_CONCURRENCY)
+        self._running: set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def running(self):
+        """Run the worker for the duration of the block."""
+        self._loop = asyncio.create_task(self._run())
+        try:
+            yield self
+        finally:
+            self._loop.cancel()
+            for task in list(self._running):
+                task.cancel()
+            # Handlers must have unwound before the caller closes what they use (e.g. MCP sessions)
+            await asyncio.gather(self._loop, *self._running, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            await self._slots.acquire()
+            # Taken before claiming, so an enqueue between the claim and the wait is not missed
+            wakeup = self.coordinator.wakeup(queue_key(self.queue))
+            try:
+                job = await self.coordinator.claim(self.queue, self.owner, self.ttl)
+            except Exception as e:
+                logger.error("Claiming from %s failed: %s", self.queue, e)
+                job = None
+            if job is None:
+                self._slots.release()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), settings.COORDINATION_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job: Job):
+        execution = asyncio.current_task()
+
+        async def heartbeat():
+            while True:
+                await asyncio.sleep(self.ttl / 3)
+                if not await self.coordinator.renew_job(job.id, self.owner, self.ttl):
+                    # Reclaimed, or abandoned by its waiter: the result would be discarded anyway
+                    logger.warning("Lost lease on job %s, stopping it", job.id)
+                    execution.cancel()
+                    return
+
+        renewer = asyncio.create_task(heartbeat())
+        try:
+            logger.info("[Job Start] %s on %s (attempt %d)", job.id, self.queue, job.attempts)
+            try:
+                result = await self.handler(job.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("[Job Failed] %s: %s", job.id, e)
+                await self.coordinator.complete(job.id, self.owner, f"Error: {e}", failed=True)
+            else:
+                await self.coordinator.complete(job.id, self.owner, result)
+        finally:
+            renewer.cancel()
+            self._slots.release()
+
+
+_coordinator: Optional[Coordinator] = None
+
+
+def get_coordinator() -> Coordinator:
+    """Return the process-wide coordinator for COORDINATION_BACKEND."""
+    global _coordinator
+    if _coordinator is None:
+        if settings.COORDINATION_BACKEND == "database":
+            _coordinator = DatabaseCoordinator()
+        else:
+            _coordinator = InMemoryCoordinator()
+        logger.info("Coordinator: %s (worker %s)", type(_coordinator).__name__, WORKER_ID)
+    return _coordinator
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import WebSocketDisconnect
+
+from app.core.config import settings
+from app.core.metrics import WS_INBOUND_HANDLERS, WS_INBOUND_REJECTED
+
+logger = logging.getLogger("app.dispatcher")
+
+Handler = Callable[[], Awaitable[None]]
+
+
+class MessageDispatcher:
+    """
+    Runs the handler of each inbound WebSocket message as its own task, so
+    the connection keeps reading while a long chat turn or task step runs.
+
+    Handlers dispatched on the same lane run one at a time in arrival order
+    (chat turns share a lane because they mutate the conversation history);
+    handlers without a lane, such as task control messages, start right
+    away. A failing handler is logged and reported through on_error without
+    ending the connection. At most WS_MAX_PENDING_MESSAGES handlers may be
+    pending at once on each lane, and as many without a lane; further
+    messages are rejected. The budgets are separate so that a backlog of
+    chat turns never crowds out cancel or task control messages.
+    """
+
+    def __init__(self, on_error: Callable[[Exception], Awaitable[None]], max_pending: Optional[int] = None):
+        self.on_error = on_error
+        self.max_pending = max_pending or settings.WS_MAX_PENDING_MESSAGES
+        self._tasks: Dict[asyncio.Task, Optional[str]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def dispatch(self, handler: Handler, lane: Optional[str] = None) -> bool:
+        """Schedule handler; returns False if too many handlers are already pending on its lane."""
+        if sum(1 for pending in self._tasks.values() if pending == lane) >= self.max_pending:
+            WS_INBOUND_REJECTED.inc()
+            return False
+        task = asyncio.create_task(self._run(handler, lane))
+        self._tasks[task] = lane
+        WS_INBOUND_HANDLERS.inc()
+        task.add_done_callback(self._done)
+        return True
+
+    async def _run(self, handler: Handler, lane: Optional[str]):
+        try:
+            if lane is None:
+                await handler()
+            else:
+                # asyncio.Lock wakes waiters first-in first-out, which keeps the lane in arrival order
+                async with self._locks.setdefault(lane, asyncio.Lock()):
+                    await handler()
+        except WebSocketDisconnect:
+            logger.debug("Client went away while a message was being handled")
+        except Exception as e:
+            logger.error("Message handler failed: %s", e, exc_info=True)
+            try:
+                await self.on_error(e)
+            except Exception:
+                pass
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.pop(task, None)
+        WS_INBOUND_HANDLERS.dec()
+
+    def cancel_lane(self, lane: str) -> int:
+        """Cancel the running and queued handlers of a lane; returns how many were cancelled."""
+        tasks = [t for t, l in self._tasks.items() if l == lane and not t.done()]
+        for task in tasks:
+            task.cancel()
+        return len(tasks)
+
+    async def close(self):
+        """Cancel all pending handlers and wait for them to unwind."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import EMBEDDING_CACHE_LOOKUPS
+
+logger = logging.getLogger("app.embedding_cache")
+
+CacheKey = Tuple[str, str]  # (model name, sha256 of text)
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache keyed by (model name, SHA-256 of text).
+
+    Two tiers: an in-memory LRU, and an optional SQLite file storing vectors
+    as float32 blobs so embeddings survive worker restarts and are shared by
+    workers on the same host. The file is an LRU too: rows record when they
+    were last stored or read, and beyond `max_disk_entries` the least
+    recently used are deleted (0 keeps everything). Memory lookups are
+    synchronous; disk reads and writes run in a thread so they never block
+    the event loop.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 10000, max_disk_entries: int = 0):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[CacheKey, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    # -- memory tier -------------------------------------------------------
+
+    def get_memory(self, model_name: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for text in texts:
+                key = (model_name, text_digest(text))
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[text] = vector
+        return found
+
+    def put_memory(self, model_name: str, vectors: Dict[str, List[float]]):
+        with self._lock:
+            for text, vector in vectors.items():
+                key = (model_name, text_digest(text))
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    # -- disk tier ---------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " digest TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (model, digest)"
+                ") WITHOUT ROWID"
+            )
+            # Files written before last_used existed count as least recently used
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(embeddings)")]
+            if "last_used" not in columns:
+                self._db.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._db.commit()
+        return self._db
+
+    def get_disk(self, model_name: str, texts: List[str]) -> Dict[str, List[float]]:
+        if not self.path or not texts:
+            return {}
+        by_digest = {text_digest(t): t for t in texts}
+        found: Dict[str, List[float]] = {}
+        digests = list(by_digest)
+        with self._db_lock:
+            db = self._connection()
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(digests), 500):
+                chunk = digests[start:start + 500]
+                rows = db.execute(
+                    f"SELECT digest, vector FROM embeddings WHERE model = ? AND digest IN ({','.join('?' * len(chunk))})",
+                    [model_name, *chunk],
+                ).fetchall()
+                for digest, blob in rows:
+                    found[by_digest[digest]] = array("f", blob).tolist()
+                if rows:
+                    hits = [digest for digest, _ in rows]
+                    db.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE model = ? AND digest IN ({','.join('?' * len(hits))})",
+                        [time.time(), model_name, *hits],
+                    )
+            db.commit()
+        return found
+
+    def put_disk(self, model_name: str, vectors: Dict[str, List[float]]):
+        if not self.path or not vectors:
+            return
+        now = time.time()
+        rows = [(model_name, text_digest(t), array("f", v).tobytes(), now) for t, v in vectors.items()]
+        with self._db_lock:
+            db = self._connection()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, digest, vector, last_used) VALUES (?, ?, ?, ?)", rows,
+            )
+            if self.max_disk_entries > 0:
+                (count,) = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+                if count > self.max_disk_entries:
+                    db.execute(
+                        "DELETE FROM embeddings WHERE (model, digest) IN"
+                        " (SELECT model, digest FROM embeddings ORDER BY last_used LIMIT ?)",
+                        [count - self.max_disk_entries],
+                    )
+            db.commit()
+
+    # -- combined ----------------------------------------------------------
+
+    async def get_many(self, model_name: str, texts: List[str]) -> Dict[str, List[float]]:
+        """Look texts up in memory, then on disk; disk hits are promoted to memory."""
+        found = self.get_memory(model_name, texts)
+        EMBEDDING_CACHE_LOOKUPS.labels("memory").inc(len(found))
+
+        missing = [t for t in texts if t not in found]
+        if missing and self.path:
+            try:
+                from_disk = await asyncio.to_thread(self.get_disk, model_name, missing)
+            except sqlite3.Error as e:
+                logger.warning("Embedding cache read failed: %s", e)
+                from_disk = {}
+            EMBEDDING_CACHE_LOOKUPS.labels("disk").inc(len(from_disk))
+            self.put_memory(model_name, from_disk)
+            found.update(from_disk)
+
+        EMBEDDING_CACHE_LOOKUPS.labels("miss").inc(len(texts) - len(found))
+        return found
+
+    async def put_many(self, model_name: str, vectors: Dict[str, List[float]]):
+        """Store freshly computed vectors in both tiers."""
+        self.put_memory(model_name, vectors)
+        if self.path:
+            try:
+                await asyncio.to_thread(self.put_disk, model_name, vectors)
+            except sqlite3.Error as e:
+                logger.warning("Embedding cache write failed: %s", e)
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, configured from settings."""
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(
+            path=settings.EMBEDDING_CACHE_PATH or None,
+            max_memory_entries=settings.EMBEDDING_CACHE_MEMORY_ENTRIES,
+            max_disk_entries=settings.EMBEDDING_CACHE_DISK_ENTRIES,
+        )
+    return _cache
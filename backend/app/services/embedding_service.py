@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from app.core.compute_pool import ComputePool, get_compute_pool
+from app.core.config import settings
+from app.core.metrics import EMBEDDING_BATCH_SIZE
+from app.services.embedding_cache import EmbeddingCache, get_embedding_cache
+
+logger = logging.getLogger("app.embedding_service")
+
+EmbedFn = Callable[[str, List[str]], List[List[float]]]
+
+
+def normalise(vector: List[float]) -> List[float]:
+    """Scale a vector to unit length, so dot products are cosine similarities."""
+    norm = sum(x * x for x in vector) ** 0.5 or 1.0
+    return [x / norm for x in vector]
+
+
+def similarities(vectors: List[List[float]], query: List[float]) -> List[float]:
+    """Cosine similarities of unit vectors to a unit query, as one matrix product. Runs on the compute pool."""
+    import numpy as np
+
+    return (np.asarray(vectors, dtype="float32") @ np.asarray(query, dtype="float32")).tolist()
+
+
+def _default_embed_fn() -> EmbedFn:
+    from app.services.context_service import embed_texts
+
+    return embed_texts
+
+
+class EmbeddingService:
+    """
+    Cross-request micro-batcher for a sentence-transformers model.
+
+    Concurrent embed() calls from any conversation are gathered for up to
+    `max_latency_ms` or until `max_batch` texts are queued, embedded in one
+    forward pass on the compute pool, and the vectors fanned back out to the
+    callers. Identical texts within a batch are embedded once, and with a
+    cache attached, texts embedded before (by any request or an earlier
+    worker) skip the model entirely.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_batch: int = 64,
+        max_latency_ms: float = 5.0,
+        pool: Optional[ComputePool] = None,
+        embed_fn: Optional[EmbedFn] = None,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.model_name = model_name
+        self.max_batch = max_batch
+        self.max_latency = max_latency_ms / 1000
+        self._pool = pool
+        self._embed_fn = embed_fn
+        self._cache = cache
+        self._queue: List[Tuple[List[str], asyncio.Future]] = []
+        self._queued_texts = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Flushes in flight; the loop only holds weak references to tasks
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, sharing a forward pass with other concurrent callers."""
+        if not texts:
+            return []
+        if self._cache is None:
+            return await self._enqueue(list(texts))
+
+        found = await self._cache.get_many(self.model_name, list(dict.fromkeys(texts)))
+        missing = [t for t in dict.fromkeys(texts) if t not in found]
+        if missing:
+            fresh = dict(zip(missing, await self._enqueue(missing)))
+            await self._cache.put_many(self.model_name, fresh)
+            found.update(fresh)
+        return [found[t] for t in texts]
+
+    async def _enqueue(self, texts: List[str]) -> List[List[float]]:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((texts, future))
+        self._queued_texts += len(texts)
+
+        if self._queued_texts >= self.max_batch:
+            self._flush_soon(0)
+        elif self._timer is None:
+            self._flush_soon(self.max_latency)
+        return await future
+
+    def _flush_soon(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        task = asyncio.create_task(self._flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flushes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Embedding flush for %s failed", self.model_name, exc_info=task.exception())
+
+    def _take_batch(self) -> List[Tuple[List[str], asyncio.Future]]:
+        """Pop queued requests totalling at most max_batch texts (at least one request)."""
+        batch, count = [], 0
+        while self._queue and (not batch or count + len(self._queue[0][0]) <= self.max_batch):
+            texts, future = self._queue.pop(0)
+            batch.append((texts, future))
+            count += len(texts)
+        self._queued_texts -= count
+        return batch
+
+    async def _flush(self):
+        self._timer = None
+        batch = self._take_batch()
+        if self._queue:
+            # More than one batch was waiting; schedule the rest right away
+            self._flush_soon(0)
+        if not batch:
+            return
+
+        unique: Dict[str, int] = {}
+        for texts, _ in batch:
+            for text in texts:
+                unique.setdefault(text, len(unique))
+        EMBEDDING_BATCH_SIZE.observe(len(unique))
+
+        try:
+            pool = self._pool or get_compute_pool()
+            embed_fn = self._embed_fn or _default_embed_fn()
+            vectors = await pool.run(embed_fn, self.model_name, list(unique))
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for texts, future in batch:
+            if not future.done():
+                future.set_result([vectors[unique[text]] for text in texts])
+
+
+_services: Dict[str, EmbeddingService] = {}
+
+
+def get_embedding_service(model_name: str) -> EmbeddingService:
+    """Return the process-wide embedding service for a model."""
+    service = _services.get(model_name)
+    if service is None:
+        service = EmbeddingService(
+            model_name,
+            max_batch=settings.EMBEDDING_MAX_BATCH,
+            max_latency_ms=settings.EMBEDDING_MAX_LATENCY_MS,
+            cache=get_embedding_cache(),
+        )
+        _services[model_name] = service
+    return service
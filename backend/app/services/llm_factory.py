@@ -1,12 +1,77 @@
-from typing import Optional
+import importlib
+from typing import Any, List, Optional
 from langchain_core.language_models import BaseChatModel
-from langchain_openai import ChatOpenAI, AzureChatOpenAI
-from langchain_anthropic import ChatAnthropic
+from langchain_core.messages import BaseMessage, SystemMessage
 from app.core.config import settings
 
+# Provider SDKs take seconds to import, so they are loaded on first use
+# rather than when the app (or a CRUD-only worker) boots.
+_LAZY_PROVIDERS = {
+    "ChatOpenAI": "langchain_openai",
+    "AzureChatOpenAI": "langchain_openai",
+    "ChatAnthropic": "langchain_anthropic",
+}
+
+
+def __getattr__(name: str):
+    module = _LAZY_PROVIDERS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def _provider_class(name: str):
+    """Return a chat model class by name, importing its SDK if needed."""
+    return globals().get(name) or __getattr__(name)
+
+
+_CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _with_cache_control(message: BaseMessage) -> BaseMessage:
+    """Copy of message whose last content block carries an Anthropic cache breakpoint."""
+    content = message.content
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [dict(b) if isinstance(b, dict) else {"type": "text", "text": str(b)} for b in content]
+    if not blocks or not blocks[-1].get("text", True):
+        return message
+    blocks[-1]["cache_control"] = _CACHE_CONTROL
+    return message.model_copy(update={"content": blocks})
+
 
 class LLMFactory:
     """Factory for creating LLM instances based on provider and credential type."""
+
+    @staticmethod
+    def supports_cache_control(llm: Any) -> bool:
+        """Whether the model takes explicit Anthropic `cache_control` breakpoints."""
+        llm = getattr(llm, "bound", llm)
+        return getattr(llm, "_llm_type", None) == "anthropic-chat"
+
+    @staticmethod
+    def mark_cache_breakpoints(llm: Any, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Mark stable prompt prefixes for provider-side prompt caching.
+
+        Callers put the byte-identical part of a prompt first: a leading
+        SystemMessage, preceded on the wire by the bound tool schemas. For
+        Anthropic models a breakpoint is set at the end of that message and
+        another on the last message, so the next call of a tool loop re-reads
+        everything before it from cache. OpenAI caches stable prefixes
+        automatically, so messages are returned unchanged for other providers.
+        """
+        if not settings.PROMPT_CACHING_ENABLED or not messages or not LLMFactory.supports_cache_control(llm):
+            return messages
+        marked = list(messages)
+        if isinstance(marked[0], SystemMessage):
+            marked[0] = _with_cache_control(marked[0])
+        if len(marked) > 1:
+            marked[-1] = _with_cache_control(marked[-1])
+        return marked
     
     @staticmethod
     def create_llm(
@@ -86,7 +151,7 @@ class LLMFactory:
             )
             if temperature is not None:
                 kwargs["temperature"] = temperature
-            return ChatOpenAI(**kwargs)
+            return _provider_class("ChatOpenAI")(**kwargs)
 
         elif provider_type == "azure":
             # Azure OpenAI
@@ -98,7 +163,7 @@ class LLMFactory:
             )
             if temperature is not None:
                 kwargs["temperature"] = temperature
-            return AzureChatOpenAI(**kwargs)
+            return _provider_class("AzureChatOpenAI")(**kwargs)
 
         elif provider_type == "aws":
             # AWS Bedrock OpenAI (if available)
@@ -142,7 +207,7 @@ class LLMFactory:
             )
             if temperature is not None:
                 kwargs["temperature"] = temperature
-            return ChatAnthropic(**kwargs)
+            return _provider_class("ChatAnthropic")(**kwargs)
 
         elif provider_type == "azure":
             # Azure Claude (using Azure OpenAI-compatible endpoint)
@@ -155,7 +220,7 @@ class LLMFactory:
             )
             if temperature is not None:
                 kwargs["temperature"] = temperature
-            return AzureChatOpenAI(**kwargs)
+            return _provider_class("AzureChatOpenAI")(**kwargs)
 
         elif provider_type == "aws":
             # AWS Bedrock Claude
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, Hashable, Optional, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.core.config import settings
+from app.core.metrics import WS_OUTBOUND_DISCARDED, WS_OUTBOUND_QUEUE_DEPTH, WS_SEND_LATENCY
+from app.services.ws_protocol import WireCodec
+
+logger = logging.getLogger("app.outbound")
+
+# Close code for clients that cannot keep up ("try again later")
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+
+def _coalesce_key(msg: Dict[str, Any]) -> Optional[Hashable]:
+    """Messages with the same key replace each other while queued; each is a full snapshot."""
+    if msg.get("type") == "subtask_status_update":
+        return ("subtask_status_update", msg.get("task_id"), msg.get("subtask_id"))
+    return None
+
+
+class OutboundQueue:
+    """
+    Bounded per-connection send queue drained by a dedicated writer task.
+
+    send_json only enqueues, so producers (the chat loop, task executors)
+    never wait on a slow client. While messages are queued:
+    - a subtask_status_update replaces the queued update for the same subtask,
+    - consecutive task_summary_chunk deltas of a task are merged into one,
+    - task_completed drops the task's queued summary chunks it supersedes.
+    A client whose queue stays above WS_OUTBOUND_QUEUE_SIZE for
+    WS_SLOW_CLIENT_TIMEOUT seconds, or reaches twice that size, is
+    disconnected; sends then raise WebSocketDisconnect. The writer encodes
+    messages with the connection's codec, so diffs are taken against what
+    was actually written.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_size: Optional[int] = None,
+        slow_timeout: Optional[float] = None,
+        codec: Optional[WireCodec] = None,
+    ):
+        self.websocket = websocket
+        self.codec = codec or WireCodec()
+        self.max_size = max_size or settings.WS_OUTBOUND_QUEUE_SIZE
+        self.slow_timeout = slow_timeout if slow_timeout is not None else settings.WS_SLOW_CLIENT_TIMEOUT
+        self._queue: Deque[Tuple[Optional[Hashable], Dict[str, Any]]] = deque()
+        self._ready = asyncio.Event()
+        self._over_since: Optional[float] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._closer: Optional[asyncio.Task] = None
+        self.closed = False
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    async def send_json(self, msg: Dict[str, Any]):
+        if self.closed:
+            raise WebSocketDisconnect(SLOW_CLIENT_CLOSE_CODE)
+        before = len(self._queue)
+        self._enqueue(msg)
+        WS_OUTBOUND_QUEUE_DEPTH.inc(len(self._queue) - before)
+        self._ready.set()
+        self._check_backlog()
+
+    def _enqueue(self, msg: Dict[str, Any]):
+        key = _coalesce_key(msg)
+        if key is not None:
+            for i, (queued_key, _) in enumerate(self._queue):
+                if queued_key == key:
+                    # Re-append rather than replace in place, so seq numbers stay in order
+                    del self._queue[i]
+                    WS_OUTBOUND_DISCARDED.labels("coalesced").inc()
+                    break
+        elif msg.get("type") == "task_summary_chunk" and self._queue:
+            _, last = self._queue[-1]
+            if last.get("type") == "task_summary_chunk" and last.get("task_id") == msg.get("task_id"):
+                self._queue[-1] = (None, {**msg, "content": last["content"] + msg["content"]})
+                WS_OUTBOUND_DISCARDED.labels("merged").inc()
+                return
+        elif msg.get("type") == "task_completed":
+            kept = [
+                item for item in self._queue
+                if not (item[1].get("type") == "task_summary_chunk" and item[1].get("task_id") == msg.get("task_id"))
+            ]
+            WS_OUTBOUND_DISCARDED.labels("superseded").inc(len(self._queue) - len(kept))
+            self._queue = deque(kept)
+        self._queue.append((key, msg))
+
+    def _check_backlog(self):
+        if len(self._queue) <= self.max_size:
+            self._over_since = None
+            return
+        now = time.monotonic()
+        if self._over_since is None:
+            self._over_since = now
+        if len(self._queue) >= 2 * self.max_size or now - self._over_since >= self.slow_timeout:
+            logger.warning("Disconnecting slow client: %d messages queued", len(self._queue))
+            WS_OUTBOUND_DISCARDED.labels("slow_client").inc(len(self._queue))
+            self._disconnect(SLOW_CLIENT_CLOSE_CODE)
+
+    async def _write(self):
+        while True:
+            await self._ready.wait()
+            while self._queue:
+                _, msg = self._queue.popleft()
+                WS_OUTBOUND_QUEUE_DEPTH.dec()
+                t0 = time.perf_counter()
+                try:
+                    await self.codec.send(self.websocket, msg)
+                except Exception as e:
+                    logger.info("Outbound send failed, closing queue: %s", e)
+                    self._discard()
+                    self.closed = True
+                    return
+                WS_SEND_LATENCY.observe(time.perf_counter() - t0)
+                self._check_backlog()
+            self._ready.clear()
+
+    def _discard(self):
+        WS_OUTBOUND_QUEUE_DEPTH.dec(len(self._queue))
+        self._queue.clear()
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Wait until queued messages have been written (or timeout seconds pass)."""
+        deadline = time.monotonic() + (timeout if timeout is not None else settings.WS_DRAIN_TIMEOUT)
+        while self._queue and not self.closed and self._writer and not self._writer.done():
+            if time.monotonic() >= deadline:
+                return
+            await asyncio.sleep(0.01)
+
+    def _disconnect(self, code: int):
+        self.closed = True
+        self._discard()
+        if self._writer:
+            self._writer.cancel()
+        self._closer = asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception as e:
+            logger.debug("Closing slow client socket failed: %s", e)
+
+    @asynccontextmanager
+    async def running(self):
+        """Run the writer for the duration of the block, flushing what is left on exit."""
+        self._writer = asyncio.create_task(self._write())
+        try:
+            yield self
+        finally:
+            await self.drain()
+            self._writer.cancel()
+            self._discard()
@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import re
+import time
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+from app.core.compute_pool import get_compute_pool
+from app.core.config import settings
+from app.schemas.task_graph import SubtaskSpec
+from app.services.embedding_service import get_embedding_service, normalise, similarities
+
+logger = logging.getLogger("app.plan_cache")
+
+
+def normalise_request(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def tool_fingerprint(available_tools: List[dict]) -> str:
+    """Hash of the tool names a plan may reference; plans never cross tool sets."""
+    names = sorted(t["name"] for t in available_tools)
+    return hashlib.sha256("\n".join(names).encode("utf-8")).hexdigest()[:16]
+
+
+def request_substitutions(template: str, request: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Phrases to swap to turn a template request into a new one.
+
+    Returns None unless the two requests differ only by replaced phrases
+    (e.g. "deploy billing to staging" -> "deploy search to prod") covering at
+    most half of the words; insertions or deletions change the shape of the
+    request, so the cached plan is not trusted for it.
+    """
+    a, b = template.split(), request.split()
+    subs = []
+    changed = 0
+    matcher = SequenceMatcher(a=[w.lower() for w in a], b=[w.lower() for w in b], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag != "replace":
+            return None
+        subs.append((" ".join(a[i1:i2]), " ".join(b[j1:j2])))
+        changed += max(i2 - i1, j2 - j1)
+    if changed * 2 > max(len(a), len(b)):
+        return None
+    return subs
+
+
+def _substitute(text: str, subs: List[Tuple[str, str]]) -> str:
+    for old, new in subs:
+        text = re.sub(rf"(?<!\w){re.escape(old)}(?!\w)", lambda _: new, text, flags=re.IGNORECASE)
+    return text
+
+
+@dataclass
+class _Template:
+    request: str
+    vector: List[float]  # unit length
+    specs: List[SubtaskSpec]
+    expires_at: float
+
+
+class PlanCache:
+    """
+    Cache of validated decomposition plans, per category and tool set.
+
+    A plan is stored as the SubtaskSpec list the LLM produced (dependencies by
+    name), matched by cosine similarity of the normalised request embedding,
+    and re-instantiated by the decomposer with fresh UUIDs. Phrases that
+    differ between the cached and the new request are substituted into
+    subtask names and descriptions.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", threshold: Optional[float] = None,
+                 max_entries: Optional[int] = None, embeddings=None):
+        self.model_name = model_name
+        self.threshold = threshold if threshold is not None else settings.PLAN_CACHE_THRESHOLD
+        self.max_entries = max_entries or settings.PLAN_CACHE_MAX_ENTRIES
+        self._embeddings = embeddings
+        self._templates: Dict[Tuple[int, str], List[_Template]] = {}
+
+    async def _embed(self, text: str) -> List[float]:
+        embeddings = self._embeddings or get_embedding_service(self.model_name)
+        [vector] = await embeddings.embed([normalise_request(text)])
+        return normalise(vector)
+
+    async def lookup(self, category_id: int, available_tools: List[dict], request: str) -> Optional[List[SubtaskSpec]]:
+        """Return specs adapted to request from the closest cached plan, or None."""
+        templates = self._templates.get((category_id, tool_fingerprint(available_tools)))
+        if not templates:
+            return None
+        now = time.time()
+        templates[:] = [t for t in templates if t.expires_at > now]
+        if not templates:
+            return None
+        # Snapshot the templates: a concurrent store may append while the scores are computed
+        candidates = list(templates)
+        try:
+            query = await self._embed(request)
+            scores = await get_compute_pool().run(similarities, [t.vector for t in candidates], query)
+        except Exception as e:
+            logger.warning("Plan cache lookup failed: %s", e)
+            return None
+
+        ranked = sorted(zip(scores, candidates), key=lambda pair: pair[0], reverse=True)
+        for score, template in ranked:
+            if score < self.threshold:
+                break
+            subs = request_substitutions(template.request, request)
+            if subs is None:
+                continue
+            logger.info(
+                "[Plan Cache Hit] category %d | similarity %.3f | substitutions %s",
+                category_id, score, subs,
+            )
+            return [
+                SubtaskSpec(
+                    name=_substitute(s.name, subs),
+                    description=_substitute(s.description, subs),
+                    executor=s.executor,
+                    depends_on=[_substitute(d, subs) for d in s.depends_on],
+                    tools=list(s.tools),
+                )
+                for s in template.specs
+            ]
+        return None
+
+    async def store(self, category_id: int, available_tools: List[dict], request: str, specs: List[SubtaskSpec]):
+        """Remember a validated plan for PLAN_CACHE_TTL seconds."""
+        try:
+            vector = await self._embed(request)
+        except Exception as e:
+            logger.warning("Plan cache store failed: %s", e)
+            return
+        templates = self._templates.setdefault((category_id, tool_fingerprint(available_tools)), [])
+        templates.append(_Template(request, vector, [s.model_copy(deep=True) for s in specs], time.time() + settings.PLAN_CACHE_TTL))
+        if len(templates) > self.max_entries:
+            del templates[: len(templates) - self.max_entries]
+
+    def invalidate(self, category_id: int) -> int:
+        """Drop every cached plan for a category; returns how many were dropped."""
+        dropped = 0
+        for key in [k for k in self._templates if k[0] == category_id]:
+            dropped += len(self._templates.pop(key))
+        return dropped
+
+
+_cache: Optional[PlanCache] = None
+
+
+def get_plan_cache() -> PlanCache:
+    """Return the process-wide plan cache."""
+    global _cache
+    if _cache is None:
+        _cache = PlanCache()
+    return _cache
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from app.core.config import settings
+from app.core.metrics import PROMPT_TOKENS, record_llm_call
+from app.services.context_service import get_tokenizer
+
+logger = logging.getLogger("app.prompt_builder")
+
+CONDENSE_PROMPT = (
+    "Condense the following output to at most {tokens} tokens for use as context in the task below. "
+    "Keep the facts, identifiers, numbers and errors that matter for the task; drop everything else.\n\n"
+    "Task: {focus}"
+)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer().encode(text))
+
+
+def allocate_budget(total: int, demands: Dict[str, int], weights: Dict[str, float]) -> Dict[str, int]:
+    """
+    Split `total` tokens across parts in proportion to their weights.
+
+    A part never gets more than it asks for; budget a part leaves unused is
+    shared out among the others, again by weight.
+    """
+    allocation = {part: 0 for part in demands}
+    active = {p for p, d in demands.items() if d > 0 and weights.get(p, 0) > 0}
+    remaining = total
+    while active and remaining > 0:
+        weight_sum = sum(weights[p] for p in active)
+        shares = {p: remaining * weights[p] / weight_sum for p in active}
+        satisfied = {p for p in active if demands[p] <= shares[p]}
+        if not satisfied:
+            for p in active:
+                allocation[p] = int(shares[p])
+            break
+        for p in satisfied:
+            allocation[p] = demands[p]
+            remaining -= demands[p]
+        active -= satisfied
+    return allocation
+
+
+def truncate_to_tokens(text: str, max_tokens: int, count: Callable[[str], int] = count_tokens) -> str:
+    """Cut text to roughly max_tokens, keeping its head and tail around an omission marker."""
+    tokens = count(text)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    keep = int(len(text) * max_tokens / tokens)
+    head = keep * 2 // 3
+    tail = keep - head
+    return (
+        f"{text[:head]}\n[... {tokens - max_tokens} of {tokens} tokens omitted ...]\n"
+        f"{text[len(text) - tail:] if tail else ''}"
+    )
+
+
+def _split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group messages into turns starting at each HumanMessage, so tool calls stay with their results."""
+    turns: List[List[BaseMessage]] = []
+    for m in messages:
+        if isinstance(m, HumanMessage) or not turns:
+            turns.append([m])
+        else:
+            turns[-1].append(m)
+    return turns
+
+
+class PromptBuilder:
+    """
+    Assembles a prompt (history plus one instruction message) within a token budget.
+
+    Leading system messages and the instruction template are sent as-is. The
+    rest of the budget is split by `allocate_budget` between labelled sections
+    (dependency or subtask results), which are truncated or condensed with the
+    LLM to fit their share, and the conversation history, trimmed to its most
+    recent whole turns. Tokens per part are logged and observed in
+    vantage_prompt_part_tokens under the builder's name.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        budget: int,
+        llm: Optional[BaseChatModel] = None,
+        mode: Optional[str] = None,
+        weights: Optional[Dict[str, float]] = None,
+        count: Callable[[str], int] = count_tokens,
+    ):
+        self.name = name
+        self.budget = budget
+        self.llm = llm
+        self.mode = mode or settings.PROMPT_RESULT_MODE
+        self.weights = weights or settings.PROMPT_PART_WEIGHTS
+        self.count = count
+        self.usage: Dict[str, int] = {}
+
+    async def build(
+        self,
+        history: List[BaseMessage],
+        sections: List[Tuple[str, str]],
+        render: Callable[[str], str],
+        focus: str = "",
+        separator: str = "\n",
+    ) -> List[BaseMessage]:
+        """
+        Return history + [HumanMessage(render(sections_text))] within the budget.
+
+        `sections` are (heading, text) pairs; `render` receives the fitted
+        "heading: text" entries joined by `separator` and returns the
+        instruction message. `focus` tells the condenser what the sections
+        are needed for.
+        """
+        system = []
+        for m in history:
+            if not isinstance(m, SystemMessage):
+                break
+            system.append(m)
+        turns = _split_turns(history[len(system):])
+
+        system_tokens = sum(self.count(str(m.content)) for m in system)
+        instruction_tokens = self.count(render(""))
+        turn_tokens = [sum(self.count(str(m.content)) for m in turn) for turn in turns]
+        section_tokens = [self.count(f"{heading}: {text}") for heading, text in sections]
+
+        available = max(0, self.budget - system_tokens - instruction_tokens)
+        allocation = allocate_budget(
+            available, {"sections": sum(section_tokens), "history": sum(turn_tokens)}, self.weights,
+        )
+
+        fitted = await self._fit_sections(sections, section_tokens, allocation["sections"], focus)
+        sections_text = separator.join(fitted)
+
+        # Most recent whole turns first; the latest turn (the user's request) is always kept
+        kept, used = [], 0
+        for turn, tokens in reversed(list(zip(turns, turn_tokens))):
+            if kept and used + tokens > allocation["history"]:
+                break
+            kept.insert(0, turn)
+            used += tokens
+
+        self.usage = {
+            "system": system_tokens,
+            "history": used,
+            "instructions": instruction_tokens,
+            "sections": self.count(sections_text),
+        }
+        self._report(len(turns) - len(kept), sum(section_tokens))
+
+        messages: List[BaseMessage] = list(system)
+        for turn in kept:
+            messages.extend(turn)
+        messages.append(HumanMessage(content=render(sections_text)))
+        return messages
+
+    async def _fit_sections(
+        self, sections: List[Tuple[str, str]], tokens: List[int], budget: int, focus: str,
+    ) -> List[str]:
+        # Share the budget evenly; small sections pass through whole and leave room for large ones
+        keys = [str(i) for i in range(len(sections))]
+        shares = allocate_budget(budget, dict(zip(keys, tokens)), {k: 1.0 for k in keys})
+
+        async def fit(i: int) -> str:
+            heading, text = sections[i]
+            if tokens[i] <= shares[keys[i]]:
+                return f"{heading}: {text}"
+            limit = max(0, shares[keys[i]] - self.count(f"{heading}: "))
+            if self.mode == "summarise" and self.llm is not None and limit > 0:
+                try:
+                    text = await self.condense(text, limit, focus)
+                except Exception as e:
+                    logger.warning("Could not condense %s, truncating instead: %s", heading, e)
+            return f"{heading}: {truncate_to_tokens(text, limit, self.count)}"
+
+        return list(await asyncio.gather(*(fit(i) for i in range(len(sections)))))
+
+    async def condense(self, text: str, max_tokens: int, focus: str) -> str:
+        """Ask the LLM to shorten text to about max_tokens, keeping what matters for focus."""
+        t0 = time.time()
+        response = await self.llm.ainvoke([
+            SystemMessage(content=CONDENSE_PROMPT.format(tokens=max_tokens, focus=focus or "(not given)")),
+            HumanMessage(content=text),
+        ])
+        record_llm_call(self.llm, "condense_result", time.time() - t0, response)
+        return str(response.content)
+
+    def _report(self, dropped_turns: int, section_demand: int):
+        for part, tokens in self.usage.items():
+            PROMPT_TOKENS.labels(self.name, part).observe(tokens)
+        total = sum(self.usage.values())
+        logger.info(
+            "[Prompt] %s | %d/%d tokens %s | %d history turns dropped | sections %d -> %d tokens",
+            self.name, total, self.budget, self.usage, dropped_turns, section_demand, self.usage["sections"],
+        )
@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.core.compute_pool import get_compute_pool
+from app.core.config import settings
+from app.core.metrics import RESPONSE_CACHE_LOOKUPS
+from app.services.embedding_service import get_embedding_service, normalise, similarities
+
+logger = logging.getLogger("app.response_cache")
+
+
+def prompt_hash(system_prompt: str) -> str:
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class _Entry:
+    question: str
+    vector: List[float]  # unit length
+    answer: str
+    expires_at: float
+
+
+class ResponseCache:
+    """
+    Semantic cache of tool-free chat answers, per category.
+
+    Entries are keyed by category and a hash of the system prompt, so editing
+    the prompt starts a fresh cache, and matched by cosine similarity between
+    the new message and cached questions, embedded with the shared embedding
+    service (the sentence-transformers model already loaded for context
+    memory). The cache lives in process memory; each worker keeps its own.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        embeddings=None,
+    ):
+        self.model_name = model_name
+        self.threshold = threshold if threshold is not None else settings.RESPONSE_CACHE_THRESHOLD
+        self.max_entries = max_entries or settings.RESPONSE_CACHE_MAX_ENTRIES
+        self._embeddings = embeddings
+        self._entries: Dict[Tuple[int, str], List[_Entry]] = {}
+
+    async def _embed(self, text: str) -> List[float]:
+        embeddings = self._embeddings or get_embedding_service(self.model_name)
+        [vector] = await embeddings.embed([text])
+        return normalise(vector)
+
+    async def lookup(self, category_id: int, system_prompt: str, message: str) -> Optional[str]:
+        """Return the cached answer for the most similar unexpired question, if close enough."""
+        entries = self._entries.get((category_id, prompt_hash(system_prompt)))
+        if not entries:
+            RESPONSE_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+        now = time.time()
+        entries[:] = [e for e in entries if e.expires_at > now]
+        if not entries:
+            RESPONSE_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+        # Snapshot the entries: a concurrent store may append while the scores are computed
+        candidates = list(entries)
+        try:
+            query = await self._embed(message)
+            scores = await get_compute_pool().run(similarities, [e.vector for e in candidates], query)
+        except Exception as e:
+            logger.warning("Response cache lookup failed: %s", e)
+            RESPONSE_CACHE_LOOKUPS.labels("error").inc()
+            return None
+
+        best_score = max(scores)
+        best = candidates[scores.index(best_score)] if best_score >= self.threshold else None
+        if best is None:
+            RESPONSE_CACHE_LOOKUPS.labels("miss").inc()
+            return None
+        RESPONSE_CACHE_LOOKUPS.labels("hit").inc()
+        logger.info("[Response Cache Hit] category %d | similarity %.3f | %r", category_id, best_score, best.question[:80])
+        return best.answer
+
+    async def store(self, category_id: int, system_prompt: str, message: str, answer: str, ttl: Optional[int] = None):
+        """Cache an answer for ttl seconds (RESPONSE_CACHE_TTL by default; 0 caches nothing)."""
+        ttl = ttl if ttl is not None else settings.RESPONSE_CACHE_TTL
+        if ttl <= 0:
+            return
+        try:
+            vector = await self._embed(message)
+        except Exception as e:
+            logger.warning("Response cache store failed: %s", e)
+            return
+        entries = self._entries.setdefault((category_id, prompt_hash(system_prompt)), [])
+        entries.append(_Entry(message, vector, answer, time.time() + ttl))
+        if len(entries) > self.max_entries:
+            del entries[: len(entries) - self.max_entries]
+
+    def invalidate(self, category_id: int) -> int:
+        """Drop every cached answer for a category; returns how many were dropped."""
+        dropped = 0
+        for key in [k for k in self._entries if k[0] == category_id]:
+            dropped += len(self._entries.pop(key))
+        logger.info("Invalidated %d cached responses for category %d", dropped, category_id)
+        return dropped
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Literal, Optional, Tuple, Type, Union
+
+from pydantic import BaseModel, Field, create_model
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.schema_compiler")
+
+# Mapping from JSON Schema primitive types to Python types
+_PRIMITIVE_TYPES: Dict[str, Any] = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def schema_fingerprint(schema: Dict[str, Any]) -> str:
+    """Return a stable hash of a JSON Schema, independent of key order."""
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _Compilation:
+    """State for a single schema -> model compilation pass."""
+
+    def __init__(self, root: Dict[str, Any], model_name: str):
+        self.root = root
+        self.model_name = model_name
+        self.defs: Dict[str, Any] = {
+            **root.get("definitions", {}),
+            **root.get("$defs", {}),
+        }
+        self.ref_models: Dict[str, Any] = {}
+        self.in_progress: set[str] = set()
+
+    def resolve_ref(self, ref: str) -> Any:
+        """Compile a local `#/$defs/X` or `#/definitions/X` reference."""
+        if ref in self.ref_models:
+            return self.ref_models[ref]
+        if ref in self.in_progress:
+            # Recursive reference: accept any object rather than recursing forever
+            return Dict[str, Any]
+
+        name = ref.rsplit("/", 1)[-1]
+        target = self.defs.get(name) if ref.startswith(("#/$defs/", "#/definitions/")) else None
+        if target is None:
+            logger.warning("Unresolvable $ref %s in schema %s", ref, self.model_name)
+            return Any
+
+        self.in_progress.add(ref)
+        try:
+            py_type = self.to_type(target, _model_name(self.model_name, name))
+        finally:
+            self.in_progress.discard(ref)
+        self.ref_models[ref] = py_type
+        return py_type
+
+    def to_type(self, schema: Any, name: str) -> Any:
+        """Translate a JSON Schema fragment into a Python type annotation."""
+        if schema is True or not isinstance(schema, dict) or not schema:
+            return Any
+
+        if "$ref" in schema:
+            return self.resolve_ref(schema["$ref"])
+
+        if "const" in schema:
+            return _literal([schema["const"]])
+
+        if "enum" in schema:
+            return _literal(schema["enum"])
+
+        for key in ("anyOf", "oneOf"):
+            if key in schema:
+                members = [
+                    self.to_type(sub, f"{name}{i}")
+                    for i, sub in enumerate(schema[key])
+                ]
+                return _union(members)
+
+        if "allOf" in schema:
+            parts = schema["allOf"]
+            if len(parts) == 1:
+                return self.to_type(parts[0], name)
+            return self.to_type(self.merge_all_of(parts), name)
+
+        json_type = schema.get("type")
+        if isinstance(json_type, list):
+            members = [self.to_type({**schema, "type": t}, name) for t in json_type]
+            return _union(members)
+
+        if json_type == "array":
+            items = schema.get("items")
+            if isinstance(items, list):
+                # Tuple-style "items" arrays are rare in tool schemas
+                return List[Any]
+            return List[self.to_type(items, f"{name}Item")]
+
+        if json_type == "object" or (json_type is None and "properties" in schema):
+            if schema.get("properties"):
+                return self.build_model(schema, name)
+            extra = schema.get("additionalProperties")
+            if isinstance(extra, dict) and extra:
+                return Dict[str, self.to_type(extra, f"{name}Value")]
+            return Dict[str, Any]
+
+        return _PRIMITIVE_TYPES.get(json_type, Any)
+
+    def merge_all_of(self, parts: List[Any]) -> Dict[str, Any]:
+        """Flatten an allOf of object schemas into a single object schema."""
+        merged: Dict[str, Any] = {"type": "object", "properties": {}, "required": []}
+        for part in parts:
+            if isinstance(part, dict) and "$ref" in part:
+                name = part["$ref"].rsplit("/", 1)[-1]
+                part = self.defs.get(name, {})
+            if not isinstance(part, dict):
+                continue
+            merged["properties"].update(part.get("properties", {}))
+            merged["required"].extend(part.get("required", []))
+        return merged
+
+    def build_model(self, schema: Dict[str, Any], name: str) -> Type[BaseModel]:
+        """Build a Pydantic model for an object schema with properties."""
+        required = set(schema.get("required", []))
+        fields: Dict[str, Any] = {}
+
+        for prop_name, prop in schema.get("properties", {}).items():
+            if prop_name.startswith("_"):
+                # Pydantic treats underscore names as private attributes
+                logger.warning("Skipping private property %s in schema %s", prop_name, name)
+                continue
+            if not isinstance(prop, dict):
+                prop = {}
+
+            py_type = self.to_type(prop, _model_name(name, prop_name))
+            description = prop.get("description", "")
+
+            if "default" in prop:
+                fields[prop_name] = (py_type, Field(default=prop["default"], description=description))
+            elif prop_name in required:
+                fields[prop_name] = (py_type, Field(description=description))
+            else:
+                fields[prop_name] = (Optional[py_type], Field(default=None, description=description))
+
+        model = create_model(name, **fields)
+        if schema.get("description"):
+            model.__doc__ = schema["description"]
+        return model
+
+
+def _model_name(parent: str, child: str) -> str:
+    """Derive a nested model name, e.g. ('DeployInput', 'target') -> 'DeployInputTarget'."""
+    cleaned = "".join(part[:1].upper() + part[1:] for part in child.replace("-", "_").split("_") if part)
+    return f"{parent}{cleaned}"
+
+
+def _literal(values: List[Any]) -> Any:
+    """Build a Literal type from enum/const values, falling back to Any if unhashable."""
+    try:
+        return Literal[tuple(values)]
+    except TypeError:
+        return Any
+
+
+def _union(members: List[Any]) -> Any:
+    """Combine member types into a Union, collapsing to Optional where null is allowed."""
+    if not members:
+        return Any
+    if Any in members:
+        return Any
+    unique: List[Any] = []
+    for m in members:
+        if m not in unique:
+            unique.append(m)
+    if len(unique) == 1:
+        return unique[0]
+    return Union[tuple(unique)]
+
+
+class SchemaCompiler:
+    """
+    Compile JSON Schemas (as published by MCP tools) into Pydantic models.
+
+    Supports nested objects, local $refs, enums/consts, anyOf/oneOf/allOf,
+    typed arrays, additionalProperties maps and defaults. Compiled models are
+    memoised by schema fingerprint with LRU eviction, so each distinct schema
+    is compiled once per process.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, str], Type[BaseModel]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compile(self, schema: Optional[Dict[str, Any]], model_name: str = "ToolInput") -> Type[BaseModel]:
+        """Return a Pydantic model for the given JSON Schema, compiling it on first use."""
+        schema = schema or {}
+        key = (schema_fingerprint(schema), model_name)
+
+        with self._lock:
+            model = self._cache.get(key)
+            if model is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return model
+            self.misses += 1
+
+        model = self._compile(schema, model_name)
+
+        with self._lock:
+            self._cache[key] = model
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return model
+
+    def clear(self):
+        """Drop all cached models and reset hit/miss counters."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @staticmethod
+    def _compile(schema: Dict[str, Any], model_name: str) -> Type[BaseModel]:
+        compilation = _Compilation(schema, model_name)
+        if schema.get("properties") or "allOf" in schema:
+            root = schema if "allOf" not in schema else compilation.merge_all_of(schema["allOf"] + [schema])
+            return compilation.build_model(root, model_name)
+        # Tools without parameters (or with non-object roots) take no arguments
+        return create_model(model_name)
+
+
+schema_compiler = SchemaCompiler(max_entries=settings.SCHEMA_CACHE_SIZE)
+
+
+def compile_schema(schema: Optional[Dict[str, Any]], model_name: str = "ToolInput") -> Type[BaseModel]:
+    """Compile a tool input schema using the process-wide SchemaCompiler."""
+    return schema_compiler.compile(schema, model_name)
+
+
+def dump_arguments(value: Any) -> Any:
+    """Convert validated tool arguments (which may hold nested models) back into plain JSON data."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_unset=True)
+    if isinstance(value, dict):
+        return {k: dump_arguments(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [dump_arguments(v) for v in value]
+    return value
@@ -0,0 +1,98 @@
+import logging
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from langchain_core.tools import StructuredTool
+
+from app.core.config import settings
+from app.core.log import preview
+from app.schemas.category import Category as CategorySchema
+from app.schemas.task_graph import Subtask
+from app.services.agent import AgentService
+from app.services.coordinator import JobHandler
+from app.services.prompt_builder import PromptBuilder
+from app.services.tool_output import READ_TOOL_OUTPUT
+
+logger = logging.getLogger("app.subtask_jobs")
+
+
+def subtask_queue(category: CategorySchema) -> str:
+    """
+    Job queue for a category's system subtasks at its current configuration;
+    any worker with that version's tools can serve it, and none with older ones.
+    """
+    version = category.updated_at.timestamp() if category.updated_at else 0.0
+    return f"subtasks:category:{category.id}:{version}"
+
+
+def subtask_payload(
+    task_id: str, subtask: Subtask, sections: List[Tuple[str, str]], history: List[BaseMessage],
+) -> Dict[str, Any]:
+    """Everything a worker needs to run a subtask, as JSON."""
+    return {
+        "task_id": task_id,
+        "subtask_id": subtask.id,
+        "name": subtask.name,
+        "description": subtask.description,
+        "tools": subtask.tools,
+        "sections": [list(s) for s in sections],
+        "history": messages_to_dict(history),
+    }
+
+
+async def run_subtask(
+    llm: BaseChatModel,
+    all_tools: List[StructuredTool],
+    name: str,
+    description: str,
+    tools: List[str],
+    sections: List[Tuple[str, str]],
+    history: List[BaseMessage],
+) -> str:
+    """Run one system subtask with a scoped LangGraph agent and return its result text."""
+    # Filter tools to only those needed for this subtask
+    if tools:
+        # The paging tool stays available so spilled outputs can be read back
+        scoped_tools = [t for t in all_tools if t.name in tools or t.name == READ_TOOL_OUTPUT]
+    else:
+        scoped_tools = all_tools
+
+    logger.debug("  scoped tools: %s", [t.name for t in scoped_tools])
+
+    # Build a scoped agent with only the relevant tools
+    scoped_graph = AgentService.build_graph(llm, scoped_tools)
+
+    # Build prompt with context from completed dependencies, within the token budget
+    def render(dep_context: str) -> str:
+        return (
+            f"Execute this subtask: {name}\n"
+            f"{description}\n\n"
+            f"Context from completed prerequisites:\n{dep_context or 'No prerequisites.'}\n\n"
+            f"Format your response in markdown. When presenting structured data, comparisons, "
+            f"lists of items with attributes, or costs/metrics, prefer using markdown tables."
+        )
+
+    builder = PromptBuilder("subtask", settings.SUBTASK_PROMPT_TOKEN_BUDGET, llm=llm)
+    messages = await builder.build(history, sections, render, focus=f"{name}: {description}")
+    logger.debug("  prompt: %s", preview(messages[-1].content, 300))
+
+    final_state = await scoped_graph.ainvoke({"messages": messages})
+    return str(final_state["messages"][-1].content)
+
+
+def subtask_handler(llm: BaseChatModel, all_tools: List[StructuredTool]) -> JobHandler:
+    """Job handler running subtask payloads with one connection's LLM and MCP tools."""
+
+    async def handle(payload: Dict[str, Any]) -> str:
+        return await run_subtask(
+            llm,
+            all_tools,
+            payload["name"],
+            payload["description"],
+            payload["tools"],
+            [tuple(s) for s in payload["sections"]],
+            messages_from_dict(payload["history"]),
+        )
+
+    return handle
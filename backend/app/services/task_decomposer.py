@@ -1,17 +1,24 @@
 import logging
 import time
 import uuid
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional, Tuple
 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.output_parsers.json import parse_json_markdown
+from langchain_core.utils.json import parse_partial_json
 
+from app.core.config import settings
+from app.core.log import preview
+from app.core.metrics import DECOMPOSITION_LATENCY, record_llm_call
 from app.models.category import Category
 from app.services.llm_factory import LLMFactory
+from app.services.plan_cache import get_plan_cache
 from app.schemas.task_graph import (
     TaskGraph,
     Subtask,
     SubtaskStatus,
     SubtaskExecutor,
+    SubtaskSpec,
     DecompositionResponse,
 )
 
@@ -58,6 +65,90 @@ If a step requires capabilities not covered by these tools, mark it as a "user"
 """
 
 
+# Called with (task_id, subtask) as each subtask of a streamed plan is complete
+SubtaskCallback = Callable[[str, Subtask], Awaitable[None]]
+
+JSON_SCHEMA_INSTRUCTION = (
+    "Respond with a JSON object matching this schema: "
+    '{"should_decompose": bool, "reasoning": str, "subtasks": [{"name": str, "description": str, '
+    '"executor": "system"|"user", "depends_on": [str], "tools": [str]}]}'
+)
+
+
+def _content_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(b.get("text", "") if isinstance(b, dict) else str(b) for b in content)
+
+
+def _strip_fence(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+    return text.removesuffix("```")
+
+
+class TaskGraphBuilder:
+    """
+    Builds a TaskGraph one SubtaskSpec at a time.
+
+    Each spec gets a fresh UUID. A subtask is released (returned from add)
+    once every subtask it depends on has been released, so released subtasks
+    always carry their full dependency list; finish() releases the rest,
+    dropping dependencies on names that never appeared, and validates the DAG.
+    """
+
+    def __init__(self, user_message: str):
+        self.task_id = str(uuid.uuid4())
+        self.user_message = user_message
+        self.subtasks: List[Subtask] = []
+        self._ids: dict[str, str] = {}
+        self._dep_names: dict[str, List[str]] = {}
+        self._waiting: List[Subtask] = []
+        self._released: set[str] = set()
+
+    def add(self, spec: SubtaskSpec) -> List[Subtask]:
+        """Add a spec; returns the subtasks this releases, in order."""
+        subtask = Subtask(
+            id=str(uuid.uuid4()),
+            name=spec.name,
+            description=spec.description,
+            executor=SubtaskExecutor(spec.executor),
+            dependencies=[],
+            tools=spec.tools if spec.executor == "system" else [],
+            status=SubtaskStatus.PENDING,
+            result=None,
+        )
+        self._ids[spec.name] = subtask.id
+        self._dep_names[subtask.id] = list(spec.depends_on)
+        self.subtasks.append(subtask)
+        self._waiting.append(subtask)
+        return self._release()
+
+    def _release(self, final: bool = False) -> List[Subtask]:
+        released = []
+        progress = True
+        while progress:
+            progress = False
+            for subtask in list(self._waiting):
+                names = self._dep_names[subtask.id]
+                if final or all(self._ids.get(n) in self._released for n in names):
+                    subtask.dependencies = [self._ids[n] for n in names if n in self._ids]
+                    self._waiting.remove(subtask)
+                    self._released.add(subtask.id)
+                    released.append(subtask)
+                    progress = True
+        return released
+
+    def finish(self) -> Tuple[Optional[TaskGraph], List[Subtask]]:
+        """Release remaining subtasks; returns (graph, or None if cyclic, newly released subtasks)."""
+        released = self._release(final=True)
+        if not TaskDecomposer._is_valid_dag(self.subtasks):
+            logger.warning("LLM produced a cyclic dependency graph, falling back to normal chat")
+            return None, released
+        return TaskGraph(task_id=self.task_id, user_message=self.user_message, subtasks=self.subtasks), released
+
+
 class TaskDecomposer:
     @staticmethod
     async def maybe_decompose(
@@ -65,11 +156,35 @@ class TaskDecomposer:
         chat_history: List[BaseMessage],
         category: Category,
         available_tools: List[dict],
+        on_subtask: Optional[SubtaskCallback] = None,
     ) -> Optional[TaskGraph]:
         """
         Ask the LLM whether this message requires decomposition.
         Returns a TaskGraph if decomposition is needed, None for normal chat.
+        A plan cached for a near-identical earlier request is reused without
+        calling the LLM. With on_subtask, the plan is streamed and each
+        subtask is reported as soon as it (and its dependencies) is complete.
         """
+        t0 = time.time()
+        if settings.PLAN_CACHE_ENABLED:
+            specs = await get_plan_cache().lookup(category.id, available_tools, user_message)
+            task_graph = TaskDecomposer._build_task_graph(user_message, specs) if specs else None
+            if task_graph:
+                DECOMPOSITION_LATENCY.labels("cached").observe(time.time() - t0)
+                return task_graph
+
+        task_graph = await TaskDecomposer._decompose(user_message, chat_history, category, available_tools, on_subtask)
+        DECOMPOSITION_LATENCY.labels("decomposed" if task_graph else "direct").observe(time.time() - t0)
+        return task_graph
+
+    @staticmethod
+    async def _decompose(
+        user_message: str,
+        chat_history: List[BaseMessage],
+        category: Category,
+        available_tools: List[dict],
+        on_subtask: Optional[SubtaskCallback] = None,
+    ) -> Optional[TaskGraph]:
         try:
             llm = LLMFactory.create_llm(
                 provider=category.llm_provider,
@@ -85,8 +200,10 @@ class TaskDecomposer:
 
             # Format tool list for the prompt
             if available_tools:
+                # Sorted so the system prompt is byte-identical across turns and cacheable
                 tool_list = "\n".join(
-                    f"- {t['name']}: {t['description']}" for t in available_tools
+                    f"- {t['name']}: {t['description']}"
+                    for t in sorted(available_tools, key=lambda t: t["name"])
                 )
             else:
                 tool_list = "(No tools available - mark all subtasks as 'user' executor)"
@@ -98,81 +215,128 @@ class TaskDecomposer:
             # Include last few messages for context (not the full history to save tokens)
             recent_history = chat_history[-6:] if len(chat_history) > 6 else chat_history
             messages.extend(recent_history)
-
-            # Use json_schema method for broad model compatibility
-            structured_llm = llm.with_structured_output(
-                DecompositionResponse, method="json_mode"
-            )
             # Append instruction to return JSON since json_mode requires it in the prompt
-            messages.append(HumanMessage(content=(
-                "Respond with a JSON object matching this schema: "
-                '{"should_decompose": bool, "reasoning": str, "subtasks": [{"name": str, "description": str, '
-                '"executor": "system"|"user", "depends_on": [str], "tools": [str]}]}'
-            )))
+            messages.append(HumanMessage(content=JSON_SCHEMA_INSTRUCTION))
+            messages = LLMFactory.mark_cache_breakpoints(llm, messages)
 
+            builder = TaskGraphBuilder(user_message)
             logger.info("[Decomposition LLM Request] %d messages", len(messages))
             t0 = time.time()
-            raw_response = await structured_llm.ainvoke(messages)
-            logger.info("[Decomposition LLM Response] %.2fs", time.time() - t0)
-
-            # Handle different response shapes from with_structured_output
-            if isinstance(raw_response, DecompositionResponse):
-                response = raw_response
-            elif isinstance(raw_response, dict):
-                response = DecompositionResponse(**raw_response)
+            if on_subtask is None:
+                response, raw_message = await TaskDecomposer._invoke(llm, messages)
             else:
-                logger.warning("Unexpected response type from structured output: %s", type(raw_response))
+                response, raw_message = await TaskDecomposer._stream(llm, messages, builder, on_subtask)
+            elapsed = time.time() - t0
+            record_llm_call(llm, "decomposition", elapsed, raw_message)
+            logger.info("[Decomposition LLM Response] %.2fs", elapsed)
+
+            if response is None:
                 return None
 
-            logger.info("Decomposition decision: should_decompose=%s, reasoning=%s", response.should_decompose, response.reasoning[:200] if response.reasoning else "")
+            logger.info("Decomposition decision: should_decompose=%s, reasoning=%s", response.should_decompose, preview(response.reasoning, 200))
 
             if not response.should_decompose or not response.subtasks:
                 return None
 
-            # Build the task graph: assign UUIDs and resolve name-based deps to IDs
-            task_id = str(uuid.uuid4())
-            name_to_id: dict[str, str] = {}
-            subtasks: List[Subtask] = []
-
-            # First pass: assign IDs
-            for spec in response.subtasks:
-                subtask_id = str(uuid.uuid4())
-                name_to_id[spec.name] = subtask_id
-
-            # Second pass: build Subtask objects with resolved dependencies
-            for spec in response.subtasks:
-                resolved_deps = []
-                for dep_name in spec.depends_on:
-                    dep_id = name_to_id.get(dep_name)
-                    if dep_id:
-                        resolved_deps.append(dep_id)
-
-                subtasks.append(Subtask(
-                    id=name_to_id[spec.name],
-                    name=spec.name,
-                    description=spec.description,
-                    executor=SubtaskExecutor(spec.executor),
-                    dependencies=resolved_deps,
-                    tools=spec.tools if spec.executor == "system" else [],
-                    status=SubtaskStatus.PENDING,
-                    result=None,
-                ))
-
-            # Validate DAG (detect cycles)
-            if not TaskDecomposer._is_valid_dag(subtasks):
-                logger.warning("LLM produced a cyclic dependency graph, falling back to normal chat")
-                return None
-
-            return TaskGraph(
-                task_id=task_id,
-                user_message=user_message,
-                subtasks=subtasks,
-            )
+            # Specs not seen while streaming (or all of them, without streaming)
+            for spec in response.subtasks[len(builder.subtasks):]:
+                released = builder.add(spec)
+                if on_subtask:
+                    for subtask in released:
+                        await on_subtask(builder.task_id, subtask)
+            task_graph, released = builder.finish()
+            if task_graph and on_subtask:
+                for subtask in released:
+                    await on_subtask(builder.task_id, subtask)
+
+            if task_graph and settings.PLAN_CACHE_ENABLED:
+                await get_plan_cache().store(category.id, available_tools, user_message, response.subtasks)
+            return task_graph
 
         except Exception as e:
             logger.error("Task decomposition failed, falling back to normal chat: %s", e)
             return None
 
+    @staticmethod
+    async def _invoke(llm, messages: List[BaseMessage]) -> Tuple[Optional[DecompositionResponse], Optional[BaseMessage]]:
+        """Run the planning call in one shot; returns (response, raw message)."""
+        # Use json_mode for broad model compatibility; the raw
+        # message is kept for its token usage
+        structured_llm = llm.with_structured_output(
+            DecompositionResponse, method="json_mode", include_raw=True
+        )
+        raw_response = await structured_llm.ainvoke(messages)
+        raw_message = None
+        if isinstance(raw_response, dict) and "parsed" in raw_response:
+            raw_message = raw_response.get("raw")
+            if raw_response.get("parsing_error"):
+                raise raw_response["parsing_error"]
+            raw_response = raw_response["parsed"]
+
+        # Handle different response shapes from with_structured_output
+        if isinstance(raw_response, DecompositionResponse):
+            return raw_response, raw_message
+        if isinstance(raw_response, dict):
+            return DecompositionResponse(**raw_response), raw_message
+        logger.warning("Unexpected response type from structured output: %s", type(raw_response))
+        return None, raw_message
+
+    @staticmethod
+    async def _stream(
+        llm, messages: List[BaseMessage], builder: TaskGraphBuilder, on_subtask: SubtaskCallback,
+    ) -> Tuple[Optional[DecompositionResponse], Optional[BaseMessage]]:
+        """
+        Stream the planning call, parsing the partial JSON as it grows.
+
+        A subtask spec is complete once the next one has started; complete
+        specs go to the builder and released subtasks to on_subtask while the
+        rest of the plan is still being generated. A spec that does not
+        validate stops streaming: it and the specs after it are taken from
+        the final parse, which is validated as a whole. Stops early when the
+        model decides not to decompose.
+        """
+        # OpenAI has a native JSON mode; other providers follow the prompt's instruction
+        if getattr(llm, "_llm_type", None) in ("openai-chat", "azure-openai-chat"):
+            llm = llm.bind(response_format={"type": "json_object"})
+
+        message = None
+        partial: dict = {}
+        deferred = False  # a streamed spec was invalid; it and later ones wait for the final parse
+        async for chunk in llm.astream(messages):
+            message = chunk if message is None else message + chunk
+            try:
+                partial = parse_partial_json(_strip_fence(_content_text(message.content))) or {}
+            except ValueError:
+                continue
+            if partial.get("should_decompose") is False:
+                break
+            specs = partial.get("subtasks") or []
+            for raw in [] if deferred else specs[len(builder.subtasks):len(specs) - 1]:
+                try:
+                    # builder.add validates the spec before recording anything
+                    released = builder.add(SubtaskSpec.model_validate(raw))
+                except ValueError as e:
+                    logger.debug("Deferring malformed streamed subtask spec to the final parse: %s", e)
+                    deferred = True
+                    break
+                for subtask in released:
+                    await on_subtask(builder.task_id, subtask)
+
+        if message is None:
+            return None, None
+        if partial.get("should_decompose") is False:
+            return DecompositionResponse(should_decompose=False, reasoning=partial.get("reasoning") or ""), message
+        return DecompositionResponse(**parse_json_markdown(_content_text(message.content))), message
+
+    @staticmethod
+    def _build_task_graph(user_message: str, specs: List[SubtaskSpec]) -> Optional[TaskGraph]:
+        """Instantiate specs as a TaskGraph with fresh UUIDs; None if the graph is not a DAG."""
+        builder = TaskGraphBuilder(user_message)
+        for spec in specs:
+            builder.add(spec)
+        task_graph, _ = builder.finish()
+        return task_graph
+
     @staticmethod
     def _is_valid_dag(subtasks: List[Subtask]) -> bool:
         """Validate that the subtask graph is a valid DAG using Kahn's algorithm."""
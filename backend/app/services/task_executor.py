@@ -1,13 +1,20 @@
+import asyncio
 import logging
 import time
-from typing import List
-from fastapi import WebSocket
+from typing import List, Optional, Tuple
 
 from langchain_core.language_models import BaseChatModel
-from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.messages import BaseMessage
 from langchain_core.tools import StructuredTool
 
-from app.services.agent import AgentService
+from app.core.config import settings
+from app.core.log import preview
+from app.core.metrics import READY_SUBTASKS, SUBTASK_DURATION, record_llm_call
+from app.services.coordinator import JOB_FAILED, Coordinator
+from app.services.llm_factory import LLMFactory
+from app.services.prompt_builder import PromptBuilder, count_tokens
+from app.services.subtask_jobs import run_subtask, subtask_payload
+from app.services.task_runs import TaskChannel
 from app.schemas.task_graph import TaskGraph, Subtask, SubtaskStatus, SubtaskExecutor
 
 logger = logging.getLogger("app.executor")
@@ -22,14 +29,73 @@ class TaskExecutor:
         all_tools: List[StructuredTool],
         llm: BaseChatModel,
         chat_history: List[BaseMessage],
-        websocket: WebSocket,
+        channel: TaskChannel,
+        coordinator: Optional[Coordinator] = None,
+        queue: Optional[str] = None,
     ):
         self.graph = task_graph
         self.all_tools = all_tools
         self.llm = llm
         self.chat_history = chat_history
-        self.websocket = websocket
+        # Outbound messages go through the task's channel, which outlives the client's socket
+        self.channel = channel
+        # With a distributed coordinator, system subtasks run as leased jobs on queue instead of inline
+        self.coordinator = coordinator
+        self.queue = queue
         self._subtask_map: dict[str, Subtask] = {s.id: s for s in task_graph.subtasks}
+        # True while the plan is still being streamed in; the task cannot complete until it is done
+        self.planning = False
+        self._background: set[asyncio.Task] = set()
+        # Condensed results, computed as each subtask succeeds (the map step of the final summary)
+        self._condensed: dict[str, asyncio.Task] = {}
+        # Set before the first await of the final summary, so branches finishing together
+        # (or a late user output) cannot start a second one
+        self._finalizing = False
+
+    def add_subtask(self, subtask: Subtask):
+        """Add a subtask from a plan that is still streaming and start whatever is ready."""
+        if subtask.id not in self._subtask_map:
+            self.graph.subtasks.append(subtask)
+            self._subtask_map[subtask.id] = subtask
+        # Run in the background so planning continues while ready subtasks execute
+        task = asyncio.create_task(self.execute_ready_subtasks())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def finish_planning(self, task_graph: TaskGraph):
+        """Adopt the final plan, then run ready subtasks (or summarise, if all are already done)."""
+        for subtask in task_graph.subtasks:
+            if subtask.id not in self._subtask_map:
+                self.graph.subtasks.append(subtask)
+                self._subtask_map[subtask.id] = subtask
+        self.planning = False
+        if self.is_complete():
+            await self._send_final_response()
+        else:
+            await self.execute_ready_subtasks()
+
+    def cancel(self):
+        """Cancel subtasks running in the background."""
+        for task in [*self._background, *self._condensed.values()]:
+            task.cancel()
+
+    def _start_condense(self, subtask: Subtask):
+        """Condense a succeeded subtask's result in the background while the rest of the graph runs."""
+        self._condensed[subtask.id] = asyncio.create_task(self._condense_result(subtask))
+
+    async def _condense_result(self, subtask: Subtask) -> str:
+        result = subtask.result or ""
+        limit = settings.FINAL_SUMMARY_MAP_TOKENS
+        if count_tokens(result) <= limit:
+            return result
+        builder = PromptBuilder("final_summary_map", limit, llm=self.llm)
+        try:
+            condensed = await builder.condense(result, limit, focus=self.graph.user_message)
+        except Exception as e:
+            logger.warning("Could not condense result of %s, using it in full: %s", subtask.name, e)
+            return result
+        logger.info("[Result Condensed] %s | %d -> %d chars", subtask.name, len(result), len(condensed))
+        return condensed
 
     def get_ready_subtasks(self) -> List[Subtask]:
         """Return subtasks whose dependencies are all 'succeeded'."""
@@ -49,62 +115,66 @@ class TaskExecutor:
     async def execute_ready_subtasks(self):
         """Find and execute all ready subtasks."""
         ready = self.get_ready_subtasks()
-        for subtask in ready:
-            if subtask.executor == SubtaskExecutor.SYSTEM:
-                await self._execute_system_subtask(subtask)
-            elif subtask.executor == SubtaskExecutor.USER and subtask.status == SubtaskStatus.PENDING:
-                # Mark user subtask as in_progress and generate a prompt for the user
-                subtask.status = SubtaskStatus.IN_PROGRESS
-                subtask.prompt = self._build_user_prompt(subtask)
-                await self._send_status_update(subtask)
+        # The gauge is shared by every executor, so count this batch in and out rather than setting it
+        waiting = len(ready)
+        READY_SUBTASKS.inc(waiting)
+        try:
+            for subtask in ready:
+                READY_SUBTASKS.dec()
+                waiting -= 1
+                if subtask.executor == SubtaskExecutor.SYSTEM:
+                    await self._execute_system_subtask(subtask)
+                elif subtask.executor == SubtaskExecutor.USER and subtask.status == SubtaskStatus.PENDING:
+                    # Mark user subtask as in_progress and generate a prompt for the user
+                    subtask.status = SubtaskStatus.IN_PROGRESS
+                    subtask.prompt = self._build_user_prompt(subtask)
+                    await self._send_status_update(subtask)
+        finally:
+            # Subtasks never reached (the loop raised or was cancelled) are no longer waiting here
+            READY_SUBTASKS.dec(waiting)
 
     async def _execute_system_subtask(self, subtask: Subtask):
-        """Execute a single system subtask using a scoped LangGraph agent."""
+        """Execute a single system subtask with a scoped agent, inline or as a leased job."""
         # Guard against re-execution from recursive execute_ready_subtasks calls
         if subtask.status != SubtaskStatus.PENDING:
             return
         subtask.status = SubtaskStatus.IN_PROGRESS
+        started = time.time()
         logger.info("[Subtask Start] %s (id=%s, tools=%s)", subtask.name, subtask.id, subtask.tools)
         await self._send_status_update(subtask)
 
         try:
-            # Filter tools to only those needed for this subtask
-            if subtask.tools:
-                scoped_tools = [t for t in self.all_tools if t.name in subtask.tools]
-            else:
-                scoped_tools = self.all_tools
-
-            logger.info("  scoped tools: %s", [t.name for t in scoped_tools])
-
-            # Build a scoped agent with only the relevant tools
-            scoped_graph = AgentService.build_graph(self.llm, scoped_tools)
-
-            # Build prompt with context from completed dependencies
-            dep_context = self._build_dependency_context(subtask)
-            prompt = (
-                f"Execute this subtask: {subtask.name}\n"
-                f"{subtask.description}\n\n"
-                f"Context from completed prerequisites:\n{dep_context}\n\n"
-                f"Format your response in markdown. When presenting structured data, comparisons, "
-                f"lists of items with attributes, or costs/metrics, prefer using markdown tables."
-            )
-
-            logger.info("  prompt: %s", prompt[:300])
-
-            input_state = {
-                "messages": self.chat_history + [HumanMessage(content=prompt)]
-            }
+            sections = self._dependency_sections(subtask)
             t0 = time.time()
-            final_state = await scoped_graph.ainvoke(input_state)
-            result_text = final_state["messages"][-1].content
+            if self.coordinator is not None and self.coordinator.distributed:
+                # Any worker serving the queue may run it; the result comes back on the job
+                job_id = await self.coordinator.enqueue(
+                    self.queue, subtask_payload(self.graph.task_id, subtask, sections, self.chat_history),
+                )
+                job = await self.coordinator.wait_for(job_id)
+                if job.status == JOB_FAILED:
+                    raise RuntimeError(str(job.result).removeprefix("Error: "))
+                result_text = job.result
+            else:
+                result_text = await run_subtask(
+                    self.llm, self.all_tools, subtask.name, subtask.description, subtask.tools,
+                    sections, self.chat_history,
+                )
 
             subtask.status = SubtaskStatus.SUCCEEDED
             subtask.result = str(result_text)
-            logger.info("[Subtask Done] %s | %.2fs | result: %s", subtask.name, time.time() - t0, str(result_text)[:300])
+            self._start_condense(subtask)
+            elapsed = time.time() - t0
+            logger.info(
+                "[Subtask Done] %s | %.2fs | %d chars", subtask.name, elapsed, len(subtask.result),
+                extra={"task_id": self.graph.task_id, "subtask_id": subtask.id, "duration_s": round(elapsed, 3)},
+            )
+            logger.debug("  result: %s", preview(subtask.result, 300))
         except Exception as e:
             subtask.status = SubtaskStatus.FAILED
             subtask.result = f"Error: {str(e)}"
             logger.error("[Subtask Failed] %s | error: %s", subtask.name, e)
+        SUBTASK_DURATION.labels(subtask.status.value).observe(time.time() - started)
 
         await self._send_status_update(subtask)
 
@@ -123,9 +193,11 @@ class TaskExecutor:
             logger.warning("User output for unknown subtask %s", subtask_id)
             return
 
-        logger.info("[User Subtask Done] %s | output: %s", subtask.name, output[:200])
+        logger.info("[User Subtask Done] %s | %d chars", subtask.name, len(output))
+        logger.debug("  output: %s", preview(output, 200))
         subtask.status = SubtaskStatus.SUCCEEDED
         subtask.result = output
+        self._start_condense(subtask)
         await self._send_status_update(subtask)
 
         # Check if this completion unlocks more subtasks
@@ -134,7 +206,7 @@ class TaskExecutor:
 
     def is_complete(self) -> bool:
         """Check if all subtasks are in a terminal state."""
-        return all(
+        return not self.planning and all(
             s.status in (SubtaskStatus.SUCCEEDED, SubtaskStatus.FAILED)
             for s in self.graph.subtasks
         )
@@ -165,17 +237,24 @@ class TaskExecutor:
             "result": subtask.result,
             "prompt": subtask.prompt,
         }
-        await self.websocket.send_json(msg)
+        await self.channel.send_json(msg)
 
         # If all complete, generate a final consolidated response for the chat
         if self.is_complete():
-            logger.info("All subtasks complete for task %s — generating final summary", self.graph.task_id)
-            summary = await self._build_final_response()
-            await self.websocket.send_json({
-                "type": "task_completed",
-                "task_id": self.graph.task_id,
-                "summary": summary,
-            })
+            await self._send_final_response()
+
+    async def _send_final_response(self):
+        """Send the synthesized final response for the completed task, once."""
+        if self._finalizing:
+            return
+        self._finalizing = True
+        logger.info("All subtasks complete for task %s — generating final summary", self.graph.task_id)
+        summary = await self._build_final_response()
+        await self.channel.send_json({
+            "type": "task_completed",
+            "task_id": self.graph.task_id,
+            "summary": summary,
+        })
 
     def _build_user_prompt(self, subtask: Subtask) -> str:
         """Generate a prompt that the user can paste into their local LLM to execute this subtask."""
@@ -204,42 +283,74 @@ class TaskExecutor:
 
         return "\n".join(prompt_parts)
 
-    def _build_dependency_context(self, subtask: Subtask) -> str:
-        """Gather results from completed dependency subtasks."""
-        parts = []
+    def _dependency_sections(self, subtask: Subtask) -> List[Tuple[str, str]]:
+        """("[name]", result) of completed dependency subtasks."""
+        sections = []
         for dep_id in subtask.dependencies:
             dep = self._subtask_map.get(dep_id)
             if dep and dep.result:
-                parts.append(f"[{dep.name}]: {dep.result}")
+                sections.append((f"[{dep.name}]", dep.result))
+        return sections
+
+    def _build_dependency_context(self, subtask: Subtask) -> str:
+        """Gather results from completed dependency subtasks."""
+        parts = [f"{heading}: {result}" for heading, result in self._dependency_sections(subtask)]
         return "\n".join(parts) if parts else "No prerequisites."
 
     async def _build_final_response(self) -> str:
-        """Synthesize a single final response from all subtask results using the LLM."""
-        # Build context from all subtask results
-        subtask_details = []
+        """
+        Synthesize a single final response from all subtask results using the LLM.
+
+        Results were condensed as their subtasks succeeded; this is the reduce
+        step over those partial summaries, streamed to the client as
+        task_summary_chunk events.
+        """
+        # Build context from the condensed subtask results, fitted to the token budget
+        condensed = {}
+        for subtask_id, task in self._condensed.items():
+            try:
+                condensed[subtask_id] = await task
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Condensing subtask %s failed: %s", subtask_id, e)
+        sections = []
         for s in self.graph.subtasks:
             status = "SUCCEEDED" if s.status == SubtaskStatus.SUCCEEDED else "FAILED"
-            subtask_details.append(f"[{status}] {s.name}: {s.result or '(no output)'}")
-        all_results = "\n\n".join(subtask_details)
-
-        prompt = (
-            f"The user asked: {self.graph.user_message}\n\n"
-            f"The following subtasks were executed to answer the request. "
-            f"Synthesize a single, clear, final response for the user based on these results. "
-            f"Do NOT list subtask names or mention that subtasks were executed. "
-            f"Present the information as a direct answer to the user's original question. "
-            f"Use markdown formatting with tables where appropriate.\n\n"
-            f"Subtask results:\n{all_results}"
-        )
+            sections.append((f"[{status}] {s.name}", condensed.get(s.id) or s.result or "(no output)"))
+
+        def render(all_results: str) -> str:
+            return (
+                f"The user asked: {self.graph.user_message}\n\n"
+                f"The following subtasks were executed to answer the request. "
+                f"Synthesize a single, clear, final response for the user based on these results. "
+                f"Do NOT list subtask names or mention that subtasks were executed. "
+                f"Present the information as a direct answer to the user's original question. "
+                f"Use markdown formatting with tables where appropriate.\n\n"
+                f"Subtask results:\n{all_results}"
+            )
 
         try:
+            builder = PromptBuilder("final_summary", settings.FINAL_SUMMARY_PROMPT_TOKEN_BUDGET, llm=self.llm)
+            messages = await builder.build(
+                self.chat_history, sections, render, focus=self.graph.user_message, separator="\n\n",
+            )
             logger.info("[Final Summary LLM Request] Synthesizing final response")
             t0 = time.time()
-            response = await self.llm.ainvoke(
-                self.chat_history + [HumanMessage(content=prompt)]
-            )
-            summary = str(response.content)
-            logger.info("[Final Summary LLM Response] %.2fs | %s", time.time() - t0, summary[:300])
+            response = None
+            async for chunk in self.llm.astream(LLMFactory.mark_cache_breakpoints(self.llm, messages)):
+                response = chunk if response is None else response + chunk
+                if chunk.text:
+                    await self.channel.send_json({
+                        "type": "task_summary_chunk",
+                        "task_id": self.graph.task_id,
+                        "content": chunk.text,
+                    })
+            elapsed = time.time() - t0
+            record_llm_call(self.llm, "final_summary", elapsed, response)
+            summary = response.text if response is not None else ""
+            logger.info("[Final Summary LLM Response] %.2fs | %d chars", elapsed, len(summary))
+            logger.debug("  summary: %s", preview(summary, 300))
             return summary
         except Exception as e:
             logger.error("Failed to generate final summary via LLM: %s", e)
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+from fastapi import WebSocket
+
+from app.core.config import settings
+from app.schemas.task_graph import TaskStatus
+from app.services.coordinator import WORKER_ID, Coordinator, get_coordinator
+
+logger = logging.getLogger("app.task_runs")
+
+
+def task_lease(task_id: str) -> str:
+    """Name of the lease held by the worker running a task."""
+    return f"task:{task_id}"
+
+
+class TaskChannel:
+    """
+    Outbound messages of one task, decoupled from any particular socket.
+
+    Every message gets a sequence number and is buffered (the last
+    TASK_EVENT_BUFFER of them), then forwarded to the attached socket if
+    there is one. A failed send detaches the socket instead of raising, so
+    the task keeps running while the client is away; a reconnecting client
+    attaches again and is replayed what it missed.
+    """
+
+    def __init__(self, task_id: str, websocket: Optional[WebSocket] = None, max_events: Optional[int] = None):
+        self.task_id = task_id
+        self.websocket = websocket
+        self.events: deque[Dict[str, Any]] = deque(maxlen=max_events or settings.TASK_EVENT_BUFFER)
+        self.last_seq = 0
+        self.last_sent_at = time.time()
+        self.summary: Optional[str] = None
+
+    async def send_json(self, msg: Dict[str, Any]):
+        self.last_seq += 1
+        self.last_sent_at = time.time()
+        msg = {**msg, "seq": self.last_seq}
+        self.events.append(msg)
+        if msg.get("type") == "task_completed":
+            self.summary = msg.get("summary")
+        if self.websocket is None:
+            return
+        try:
+            await self.websocket.send_json(msg)
+        except Exception as e:
+            logger.info("Client of task %s went away, buffering events: %s", self.task_id, e)
+            self.websocket = None
+
+    def events_after(self, seq: int) -> List[Dict[str, Any]]:
+        return [m for m in self.events if m["seq"] > seq]
+
+    async def attach(self, websocket: WebSocket, after_seq: int = 0):
+        """Replay buffered events newer than after_seq to websocket, then forward new ones to it."""
+        missed = self.events_after(after_seq)
+        if missed and missed[0]["seq"] > after_seq + 1:
+            await websocket.send_json({
+                "type": "task_events_truncated",
+                "task_id": self.task_id,
+                "first_seq": missed[0]["seq"],
+            })
+        # Events may arrive while replaying; attach only once caught up, without yielding in between
+        while missed:
+            for msg in missed:
+                await websocket.send_json(msg)
+                after_seq = msg["seq"]
+            missed = self.events_after(after_seq)
+        self.websocket = websocket
+
+
+class TaskRun:
+    """
+    A task graph's executor and channel, living independently of the socket
+    that created it. on_finish is called once the run completes, is
+    cancelled or is evicted, to release what it holds (its tool sessions).
+    """
+
+    def __init__(
+        self,
+        executor,
+        channel: TaskChannel,
+        category_id: int,
+        confirmed: bool = False,
+        on_finish: Optional[Callable[[], None]] = None,
+    ):
+        self.executor = executor
+        self.channel = channel
+        self.category_id = category_id
+        self.confirmed = confirmed
+        self.cancelled = False
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._on_finish = on_finish
+        self._work: set[asyncio.Task] = set()
+
+    @property
+    def task_id(self) -> str:
+        return self.executor.graph.task_id
+
+    def spawn(self, coro: Coroutine):
+        """Run a step of the task (start, user output, ...) in the background."""
+        task = asyncio.create_task(coro)
+        self._work.add(task)
+        task.add_done_callback(self._step_done)
+
+    def _step_done(self, task: asyncio.Task):
+        self._work.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Task %s step failed: %s", self.task_id, task.exception())
+        if not self._work and self.executor.is_complete():
+            self._finish()
+
+    def _finish(self):
+        if self.finished_at is None:
+            self.finished_at = time.time()
+        if self._on_finish is not None:
+            on_finish, self._on_finish = self._on_finish, None
+            on_finish()
+
+    def cancel(self):
+        self.cancelled = True
+        for task in self._work:
+            task.cancel()
+        self.executor.cancel()
+        self._finish()
+
+    @property
+    def status(self) -> str:
+        if self.cancelled:
+            return "cancelled"
+        if self.executor.is_complete():
+            return "completed"
+        return "running" if self.confirmed else "pending_approval"
+
+    def snapshot(self) -> TaskStatus:
+        graph = self.executor.graph
+        return TaskStatus(
+            task_id=graph.task_id,
+            user_message=graph.user_message,
+            status=self.status,
+            subtasks=graph.subtasks,
+            summary=self.channel.summary,
+            last_seq=self.channel.last_seq,
+            connected=self.channel.websocket is not None,
+        )
+
+
+class TaskRegistry:
+    """
+    Task runs of this process, kept TASK_RUN_RETENTION seconds after they
+    finish. Unfinished runs are cancelled and dropped once they have sent
+    nothing for TASK_RUN_IDLE_TIMEOUT seconds (e.g. a plan never approved)
+    or are older than TASK_RUN_MAX_AGE, so abandoned runs do not hold their
+    tool sessions forever. Swept every TASK_RUN_SWEEP_INTERVAL seconds, and
+    whenever a run is added.
+
+    Runs live in this process only. With a distributed coordinator the
+    registry holds a task:<task_id> lease per run, so a worker asked about a
+    task it does not have can tell which worker does (see owner_of).
+    """
+
+    def __init__(self, sweep_interval: Optional[float] = None, coordinator: Optional[Coordinator] = None):
+        self._runs: Dict[str, TaskRun] = {}
+        self._leases: Dict[str, asyncio.Task] = {}
+        self.sweep_interval = sweep_interval if sweep_interval is not None else settings.TASK_RUN_SWEEP_INTERVAL
+        self._coordinator = coordinator
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def coordinator(self) -> Coordinator:
+        if self._coordinator is None:
+            self._coordinator = get_coordinator()
+        return self._coordinator
+
+    def start(self):
+        if self.sweep_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop sweeping and cancel the runs still going (the process is shutting down)."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for run in self._runs.values():
+            if run.finished_at is None:
+                run.cancel()
+        leases = list(self._leases.values())
+        self._leases.clear()
+        for lease in leases:
+            lease.cancel()
+        await asyncio.gather(*leases, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                self._prune()
+            except Exception as e:
+                logger.warning("Task run sweep failed: %s", e)
+
+    def add(self, run: TaskRun):
+        self._prune()
+        self._runs[run.task_id] = run
+        if self.coordinator.distributed:
+            self._leases[run.task_id] = asyncio.create_task(self._hold(run.task_id))
+
+    def get(self, task_id: str) -> Optional[TaskRun]:
+        return self._runs.get(task_id)
+
+    def remove(self, task_id: str):
+        self._drop(task_id)
+
+    async def owner_of(self, task_id: str) -> Optional[str]:
+        """The other worker running task_id, if it is not here but another worker has it."""
+        if task_id in self._runs or not self.coordinator.distributed:
+            return None
+        owner = await self.coordinator.lease_owner(task_lease(task_id))
+        return owner if owner != WORKER_ID else None
+
+    async def _hold(self, task_id: str):
+        try:
+            async with self.coordinator.hold(task_lease(task_id)):
+                await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Could not hold the lease of task %s: %s", task_id, e)
+
+    def _drop(self, task_id: str):
+        self._runs.pop(task_id, None)
+        lease = self._leases.pop(task_id, None)
+        if lease is not None:
+            lease.cancel()
+
+    def detach(self, websocket: WebSocket):
+        """Stop forwarding to a socket that closed; its tasks keep running and buffering."""
+        for run in self._runs.values():
+            if run.channel.websocket is websocket:
+                run.channel.websocket = None
+
+    def _prune(self):
+        now = time.time()
+        for run in self._runs.values():
+            # Runs finished by steps they did not spawn (auto-started subtasks) are noticed here
+            if run.finished_at is None and not run._work and run.executor.is_complete():
+                run._finish()
+        idle_cutoff = now - settings.TASK_RUN_IDLE_TIMEOUT
+        age_cutoff = now - settings.TASK_RUN_MAX_AGE
+        for task_id, run in list(self._runs.items()):
+            if run.finished_at is None and (run.channel.last_sent_at < idle_cutoff or run.created_at < age_cutoff):
+                logger.warning("Evicting task %s (%s, idle since %.0fs)", task_id, run.status, now - run.channel.last_sent_at)
+                run.cancel()
+                self._drop(task_id)
+        cutoff = now - settings.TASK_RUN_RETENTION
+        for task_id in [t for t, run in self._runs.items() if run.finished_at and run.finished_at < cutoff]:
+            self._drop(task_id)
+
+
+_registry: Optional[TaskRegistry] = None
+
+
+def get_task_registry() -> TaskRegistry:
+    """Return the process-wide task registry."""
+    global _registry
+    if _registry is None:
+        _registry = TaskRegistry()
+    return _registry
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import math
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+from app.services.blob_store import BlobNotFound, get_blob_store
+
+logger = logging.getLogger("app.tool_output")
+
+READ_TOOL_OUTPUT = "read_tool_output"
+BLOB_PREFIX = "blob:"
+
+
+async def spill_large_output(tool_name: str, output: str) -> str:
+    """
+    Return output unchanged, or, above TOOL_OUTPUT_SPILL_CHARS, store it in the
+    blob store and return a reference with a preview instead.
+
+    The full text then lives on disk once rather than in every ToolMessage,
+    history copy and LLM request; the agent pages through it with the
+    read_tool_output tool when it needs more than the preview.
+    """
+    if len(output) <= settings.TOOL_OUTPUT_SPILL_CHARS:
+        return output
+    try:
+        digest = await asyncio.to_thread(get_blob_store().put, output)
+    except OSError as e:
+        logger.warning("Could not spill %s output to the blob store, sending inline: %s", tool_name, e)
+        return output
+
+    pages = math.ceil(len(output) / settings.TOOL_OUTPUT_PAGE_CHARS)
+    logger.info("[Tool Output Spilled] %s | %d chars -> %s%s", tool_name, len(output), BLOB_PREFIX, digest)
+    return (
+        f"[Output of {tool_name} is {len(output)} characters and was stored as "
+        f"ref=\"{BLOB_PREFIX}{digest}\" ({pages} pages). Preview of the start:]\n"
+        f"{output[:settings.TOOL_OUTPUT_PREVIEW_CHARS]}\n"
+        f"[... call {READ_TOOL_OUTPUT} with this ref and page=1..{pages} to read the full output.]"
+    )
+
+
+class ReadToolOutputInput(BaseModel):
+    ref: str = Field(description=f"Reference of a stored tool output, e.g. \"{BLOB_PREFIX}<sha256>\"")
+    page: int = Field(default=1, ge=1, description="1-based page number")
+
+
+async def read_tool_output(ref: str, page: int = 1) -> str:
+    """Return one page of a stored tool output."""
+    digest = ref.strip().removeprefix(BLOB_PREFIX)
+    try:
+        text = await asyncio.to_thread(get_blob_store().get, digest)
+    except BlobNotFound:
+        return f"[Tool Error] {READ_TOOL_OUTPUT}: no stored output for ref {ref!r}."
+
+    size = settings.TOOL_OUTPUT_PAGE_CHARS
+    pages = max(1, math.ceil(len(text) / size))
+    if page > pages:
+        return f"[Tool Error] {READ_TOOL_OUTPUT}: page {page} out of range, output has {pages} pages."
+    return f"[Page {page} of {pages}]\n{text[(page - 1) * size:page * size]}"
+
+
+def build_read_output_tool() -> StructuredTool:
+    """The paging tool offered to the agent alongside MCP tools."""
+    return StructuredTool.from_function(
+        coroutine=read_tool_output,
+        name=READ_TOOL_OUTPUT,
+        description=(
+            "Read a page of a large tool output that was stored by reference instead of being "
+            "returned in full. Pass the ref from the truncated output and a page number."
+        ),
+        args_schema=ReadToolOutputInput,
+    )
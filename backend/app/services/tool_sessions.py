@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+from contextlib import AsyncExitStack
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.stdio import StdioServerParameters, stdio_client
+from mcp.client.streamable_http import streamable_http_client
+
+from app.schemas.category import Category as CategorySchema
+from app.services.agent import AgentBundle, AgentService
+from app.services.coordinator import JobWorker, get_coordinator
+from app.services.mcp_client import MCPClient
+from app.services.subtask_jobs import subtask_handler, subtask_queue
+
+logger = logging.getLogger("app.tool_sessions")
+
+
+async def open_mcp_sessions(
+    stack: AsyncExitStack, category: CategorySchema,
+) -> Tuple[Dict[int, ClientSession], List[Dict[str, Any]]]:
+    """
+    Open a session to each of the category's MCP servers on stack; returns the
+    sessions by server id and every server's connection status (a server that
+    fails to connect is reported, not raised).
+    """
+    mcp_sessions = {}
+    mcp_errors = {}  # server_id -> error message
+    for server in category.mcp_servers:
+        try:
+            config = server.resource_config or {}
+            if server.type == 'stdio':
+                # Merge user-provided env with parent process env
+                # so PATH and other essentials are preserved.
+                stdio_env = None
+                user_env = config.get("env")
+                if user_env:
+                    stdio_env = {**os.environ, **user_env}
+                server_params = StdioServerParameters(
+                    command=config.get("command", ""),
+                    args=config.get("args", []),
+                    env=stdio_env,
+                )
+                read, write = await stack.enter_async_context(
+                    stdio_client(server_params)
+                )
+            elif server.type == 'http':
+                headers = MCPClient._config_to_headers(config)
+                http_client = None
+                if headers:
+                    http_client = await stack.enter_async_context(
+                        httpx.AsyncClient(headers=headers)
+                    )
+                read, write, _ = await stack.enter_async_context(
+                    streamable_http_client(server.url, http_client=http_client)
+                )
+            else:  # 'sse' or default
+                headers = MCPClient._config_to_headers(config)
+                read, write = await stack.enter_async_context(
+                    sse_client(server.url, headers=headers)
+                )
+
+            session = await stack.enter_async_context(
+                ClientSession(read, write)
+            )
+            await session.initialize()
+            mcp_sessions[server.id] = session
+            logger.info("Connected to MCP server: %s (%s)", server.name, server.type)
+        except Exception as e:
+            logger.error("Failed to connect to MCP server %s (%s): %s", server.name, server.url, e)
+            mcp_errors[server.id] = str(e)
+
+    # Track connection results for each server
+    connection_status = []
+    for server in category.mcp_servers:
+        session = mcp_sessions.get(server.id)
+        if session:
+            try:
+                result = await session.list_tools()
+                tool_count = len(result.tools)
+            except Exception:
+                tool_count = 0
+            connection_status.append({
+                "id": server.id,
+                "name": server.name,
+                "connected": True,
+                "error": None,
+                "tool_count": tool_count,
+            })
+        else:
+            connection_status.append({
+                "id": server.id,
+                "name": server.name,
+                "connected": False,
+                "error": mcp_errors.get(server.id, "Unknown connection error"),
+                "tool_count": 0,
+            })
+    return mcp_sessions, connection_status
+
+
+class ToolSessions:
+    """
+    One category version's MCP sessions and agent, shared by the connections
+    and task runs of this process that use it.
+
+    The sessions are opened and closed by a task of their own rather than by
+    a socket, so task runs keep their tools after the client disconnects;
+    they close once the last holder releases them. With a distributed
+    coordinator, the category's subtask jobs are served with them as well.
+    """
+
+    def __init__(self, category: CategorySchema, on_close: Callable[["ToolSessions"], None]):
+        self.category = category
+        self.key = (category.id, category.updated_at)
+        self.queue = subtask_queue(category)
+        self.bundle: Optional[AgentBundle] = None
+        self.connection_status: List[Dict[str, Any]] = []
+        self.holders = 0
+        self._on_close = on_close
+        self._ready = asyncio.get_running_loop().create_future()
+        self._released = asyncio.Event()
+        self._task = asyncio.create_task(self._own())
+
+    def retain(self):
+        self.holders += 1
+
+    def release(self):
+        self.holders -= 1
+        if self.holders <= 0:
+            self._released.set()
+            self._on_close(self)
+
+    async def wait_ready(self):
+        """Wait until the sessions are open and the agent is built; raises if that failed."""
+        await asyncio.shield(self._ready)
+
+    async def close(self):
+        self._released.set()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _own(self):
+        try:
+            async with AsyncExitStack() as stack:
+                mcp_sessions, self.connection_status = await open_mcp_sessions(stack, self.category)
+
+                logger.info("Building agent for category %d (%s)", self.category.id, self.category.name)
+                self.bundle = await AgentService.get_agent_runnable_with_sessions(self.category, mcp_sessions)
+                logger.info("Agent ready with %d tools", len(self.bundle.tools))
+
+                # Other workers' conversations may queue subtasks for this category version
+                coordinator = get_coordinator()
+                if coordinator.distributed:
+                    await stack.enter_async_context(
+                        JobWorker(coordinator, self.queue, subtask_handler(self.bundle.llm, self.bundle.tools)).running()
+                    )
+
+                self._ready.set_result(None)
+                await self._released.wait()
+        except Exception as e:
+            if self._ready.done():
+                logger.error("Tool sessions of category %d failed: %s", self.category.id, e)
+            else:
+                self._ready.set_exception(e)
+        finally:
+            if not self._ready.done():
+                self._ready.cancel()
+            self._on_close(self)
+            logger.info("Closed tool sessions of category %d", self.category.id)
+
+
+class ToolSessionPool:
+    """
+    ToolSessions of this process by category version. A category change
+    opens new sessions for later holders while runs still using the old ones
+    keep them until they finish. Closed with the app (see main.lifespan).
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[int, Any], ToolSessions] = {}
+
+    async def acquire(self, category: CategorySchema) -> ToolSessions:
+        """Hold the category's tool sessions, opening them if needed; call release() on them when done."""
+        key = (category.id, category.updated_at)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = ToolSessions(category, self._discard)
+        entry.retain()
+        try:
+            await entry.wait_ready()
+        except BaseException:
+            entry.release()
+            raise
+        return entry
+
+    def _discard(self, entry: ToolSessions):
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+
+    async def close(self):
+        entries = list(self._entries.values())
+        self._entries.clear()
+        await asyncio.gather(*(entry.close() for entry in entries))
+
+
+_pool: Optional[ToolSessionPool] = None
+
+
+def get_tool_session_pool() -> ToolSessionPool:
+    """Return the process-wide tool session pool."""
+    global _pool
+    if _pool is None:
+        _pool = ToolSessionPool()
+    return _pool
@@ -0,0 +1,133 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.core.serialization import dumps_text, loads, send_json
+
+try:
+    import msgpack
+except ImportError:
+    try:
+        import ormsgpack as msgpack
+    except ImportError:  # the msgpack subprotocol is not offered
+        msgpack = None
+
+# Subprotocols a client may request in Sec-WebSocket-Protocol, in order of preference
+COMPACT_MSGPACK = "vantage.compact.msgpack"
+COMPACT_JSON = "vantage.compact.json"
+
+# Per-subtask fields diffed against what the client already has
+SUBTASK_STATE_FIELDS = ("status", "result", "prompt")
+
+
+def supported_subprotocols() -> List[str]:
+    return ([COMPACT_MSGPACK] if msgpack is not None else []) + [COMPACT_JSON]
+
+
+def negotiate(websocket: WebSocket) -> Optional[str]:
+    """Pick the first subprotocol the client offered that this server supports (None: plain JSON)."""
+    supported = supported_subprotocols()
+    for offered in websocket.scope.get("subprotocols") or []:
+        if offered in supported:
+            return offered
+    return None
+
+
+class WireCodec:
+    """
+    Encoding of one connection's frames.
+
+    Without a negotiated subprotocol messages are sent as-is as JSON text,
+    which is what the bundled frontend expects. The compact subprotocols
+    send diffs (see CompactState) as JSON text or msgpack binary frames.
+    """
+
+    def __init__(self, subprotocol: Optional[str] = None):
+        self.subprotocol = subprotocol
+        self.compact = CompactState() if subprotocol else None
+
+    async def send(self, websocket: WebSocket, msg: Dict[str, Any]):
+        if self.compact is None:
+            await send_json(websocket, msg)
+            return
+        data = self.encode(self.compact.reduce(msg))
+        if isinstance(data, bytes):
+            await websocket.send_bytes(data)
+        else:
+            await websocket.send_text(data)
+
+    def encode(self, msg: Dict[str, Any]) -> Union[str, bytes]:
+        if self.subprotocol == COMPACT_MSGPACK:
+            return msgpack.packb(msg)
+        return dumps_text(msg)
+
+    async def receive(self, websocket: WebSocket) -> Dict[str, Any]:
+        """Read the next message; a text frame that is not JSON is taken as a chat message."""
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("bytes") is not None:
+            if msgpack is None:
+                raise ValueError("Binary frames need the msgpack subprotocol")
+            msg = msgpack.unpackb(message["bytes"])
+        else:
+            raw = message.get("text") or ""
+            try:
+                msg = loads(raw)
+            except json.JSONDecodeError:
+                return {"type": "chat_message", "content": raw}
+        if not isinstance(msg, dict):
+            raise ValueError("Messages must be objects")
+        return msg
+
+
+class CompactState:
+    """
+    What the client of a compact connection has already received, used to
+    leave out repeated text:
+    - subtask_status_update carries status and only those of result and
+      prompt that changed since the client last saw the subtask,
+    - subtasks in subtask_added and task_graph_created carry their id and
+      only the fields the client does not have yet,
+    - task_completed carries "summary_from_chunks": true instead of the
+      summary when the task_summary_chunk messages already spelled it out.
+    Omitted fields mean "unchanged". Replayed messages are full snapshots,
+    so a reconnecting client (with a fresh state) gets everything again.
+    """
+
+    def __init__(self):
+        self._subtasks: Dict[Tuple[Any, Any], Dict[str, Any]] = {}
+        self._chunks: Dict[Any, List[str]] = {}
+
+    def reduce(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        kind = msg.get("type")
+        task_id = msg.get("task_id")
+        if kind == "subtask_status_update":
+            changed = self._changed(task_id, msg.get("subtask_id"), {
+                k: msg[k] for k in SUBTASK_STATE_FIELDS if k in msg
+            })
+            reduced = {k: v for k, v in msg.items() if k not in SUBTASK_STATE_FIELDS}
+            return {**reduced, "status": msg.get("status"), **changed}
+        if kind == "subtask_added" and msg.get("subtask"):
+            return {**msg, "subtask": self._reduce_subtask(task_id, msg["subtask"])}
+        if kind == "task_graph_created":
+            return {**msg, "subtasks": [self._reduce_subtask(task_id, s) for s in msg.get("subtasks", [])]}
+        if kind == "task_summary_chunk":
+            self._chunks.setdefault(task_id, []).append(msg.get("content", ""))
+            return msg
+        if kind == "task_completed":
+            streamed = self._chunks.pop(task_id, None)
+            if streamed is not None and "".join(streamed) == msg.get("summary"):
+                reduced = {k: v for k, v in msg.items() if k != "summary"}
+                return {**reduced, "summary_from_chunks": True}
+        return msg
+
+    def _reduce_subtask(self, task_id: Any, subtask: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": subtask.get("id"), **self._changed(task_id, subtask.get("id"), subtask)}
+
+    def _changed(self, task_id: Any, subtask_id: Any, fields: Dict[str, Any]) -> Dict[str, Any]:
+        known = self._subtasks.setdefault((task_id, subtask_id), {})
+        changed = {k: v for k, v in fields.items() if k not in known or known[k] != v}
+        known.update(changed)
+        return changed
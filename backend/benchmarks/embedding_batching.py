@@ -0,0 +1,75 @@
+"""
+Benchmark: cross-request embedding micro-batching vs. one forward pass per request.
+
+Simulates many conversations embedding a few texts each, concurrently, and
+reports texts/second for both strategies.
+
+    cd backend
+    python -m benchmarks.embedding_batching                  # real all-MiniLM-L6-v2
+    python -m benchmarks.embedding_batching --simulate       # synthetic model cost, no download
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+from app.core.compute_pool import ComputePool  # noqa: E402
+from app.services.context_service import embed_texts  # noqa: E402
+from app.services.embedding_service import EmbeddingService  # noqa: E402
+
+
+def _simulated_embed(model_name, texts):
+    """Fixed per-call overhead plus a small per-text cost, like a batched forward pass."""
+    time.sleep(0.004 + 0.0002 * len(texts))
+    return [[0.0] * 384 for _ in texts]
+
+
+async def _run(strategy, embed_fn, args, pool):
+    service = EmbeddingService(
+        args.model, max_batch=args.max_batch, max_latency_ms=args.max_latency_ms,
+        pool=pool, embed_fn=embed_fn,
+    )
+
+    async def conversation(c):
+        for r in range(args.requests):
+            texts = [f"conversation {c} message {r} part {i}" for i in range(args.texts)]
+            if strategy == "batched":
+                await service.embed(texts)
+            else:
+                await pool.run(embed_fn, args.model, texts)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(conversation(c) for c in range(args.conversations)))
+    elapsed = time.perf_counter() - t0
+    total = args.conversations * args.requests * args.texts
+    print(f"{strategy:>12}: {total} texts in {elapsed:.2f}s -> {total / elapsed:,.0f} texts/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--simulate", action="store_true", help="use a synthetic embed function")
+    parser.add_argument("--conversations", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=10, help="embed calls per conversation")
+    parser.add_argument("--texts", type=int, default=2, help="texts per embed call")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    embed_fn = _simulated_embed if args.simulate else embed_texts
+    pool = ComputePool(workers=args.workers, max_pending=args.conversations * 2)
+    try:
+        # Warm up (loads the model once)
+        await pool.run(embed_fn, args.model, ["warm up"])
+        await _run("per-request", embed_fn, args, pool)
+        await _run("batched", embed_fn, args, pool)
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
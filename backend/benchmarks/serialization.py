@@ -0,0 +1,118 @@
+"""
+Benchmark: JSON serialisation paths for the heaviest payloads.
+
+Compares the stdlib path (model_dump() then json.dumps) with
+app.core.serialization (orjson when installed) and with Pydantic's own
+model_dump_json / TypeAdapter.dump_json, for:
+- a task graph whose subtasks carry large results (GET /tasks/{id}, replays),
+- the WebSocket messages sent while that graph runs,
+- a category list with MCP servers (GET /categories).
+
+    cd backend
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --subtasks 50 --result-kb 64
+"""
+
+import argparse
+import json
+import os
+import timeit
+from datetime import datetime
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.core import serialization  # noqa: E402
+from app.schemas.category import Category  # noqa: E402
+from app.schemas.mcp_server import MCPServer  # noqa: E402
+from app.schemas.task_graph import Subtask, SubtaskExecutor, SubtaskStatus, TaskGraph  # noqa: E402
+
+
+def _stdlib(obj) -> bytes:
+    """What Starlette's JSONResponse / WebSocket.send_json do."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _task_graph(subtasks: int, result_kb: int) -> TaskGraph:
+    result = ("Service latency p99 rose to 840ms after the deploy; rolled back. " * 16 * result_kb)[:result_kb * 1024]
+    return TaskGraph(
+        task_id="bench",
+        user_message="Investigate the latency regression and write up the findings",
+        subtasks=[
+            Subtask(
+                id=f"s{i}", name=f"Step {i}", description=f"Check component {i} for regressions",
+                executor=SubtaskExecutor.SYSTEM, dependencies=[f"s{i - 1}"] if i else [],
+                tools=["query_metrics", "read_logs"], status=SubtaskStatus.SUCCEEDED, result=result,
+            )
+            for i in range(subtasks)
+        ],
+    )
+
+
+def _categories(count: int, servers: int) -> List[Category]:
+    prompt = "You are a site reliability assistant. Follow the runbooks. " * 40
+    return [
+        Category(
+            id=c, name=f"Category {c}", system_prompt=prompt, created_at=datetime(2026, 1, 1),
+            mcp_servers=[
+                MCPServer(id=c * 100 + s, category_id=c, name=f"server-{s}", url=f"https://mcp{s}.internal/sse",
+                          resource_config={"timeout": 30, "headers": {"X-Team": "sre"}})
+                for s in range(servers)
+            ],
+        )
+        for c in range(count)
+    ]
+
+
+def _report(name: str, cases, number: int):
+    print(f"\n{name}")
+    baseline = None
+    for label, fn in cases:
+        size = len(fn())
+        seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+        baseline = baseline or seconds
+        print(f"  {label:<34} {seconds * 1e3:8.3f} ms  {size / 1024:8.1f} KiB  x{baseline / seconds:5.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subtasks", type=int, default=20)
+    parser.add_argument("--result-kb", type=int, default=16, help="size of each subtask result")
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--servers", type=int, default=5, help="MCP servers per category")
+    parser.add_argument("--number", type=int, default=50, help="iterations per measurement")
+    args = parser.parse_args()
+
+    print(f"orjson: {'yes' if serialization.orjson is not None else 'no (stdlib fallback)'}")
+
+    graph = _task_graph(args.subtasks, args.result_kb)
+    _report("Task graph", [
+        ("model_dump + json.dumps", lambda: _stdlib(graph.model_dump(mode="json"))),
+        ("model_dump + serialization.dumps", lambda: serialization.dumps(graph.model_dump())),
+        ("serialization.dumps(model)", lambda: serialization.dumps(graph)),
+        ("model_dump_json", lambda: graph.model_dump_json().encode("utf-8")),
+    ], args.number)
+
+    messages = [
+        {"type": "subtask_status_update", "task_id": graph.task_id, "subtask_id": s.id,
+         "status": s.status.value, "result": s.result, "prompt": s.prompt, "seq": i}
+        for i, s in enumerate(graph.subtasks)
+    ]
+    _report("WebSocket messages (one per subtask)", [
+        ("json.dumps", lambda: b"".join(_stdlib(m) for m in messages)),
+        ("serialization.dumps", lambda: b"".join(serialization.dumps(m) for m in messages)),
+    ], args.number)
+
+    categories = _categories(args.categories, args.servers)
+    adapter = TypeAdapter(List[Category])
+    _report("Category list", [
+        ("model_dump + json.dumps", lambda: _stdlib([c.model_dump(mode="json") for c in categories])),
+        ("serialization.dumps(models)", lambda: serialization.dumps(categories)),
+        ("TypeAdapter.dump_json (FastAPI)", lambda: adapter.dump_json(categories)),
+    ], args.number)
+
+
+if __name__ == "__main__":
+    main()
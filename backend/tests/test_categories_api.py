@@ -0,0 +1,119 @@
+"""
+Unit tests for the category listing endpoints (keyset pages, summaries and ETags).
+"""
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.api import deps
+from app.api.endpoints import categories, mcp_servers
+from app.models.category import Category, MCPServer
+from app.services.category_list_cache import CategoryListCache, get_category_list_cache
+
+
+@pytest.fixture
+async def client(test_db_engine):
+    """An API client over the categories and MCP server routes, on in-memory SQLite with five categories."""
+    session_factory = sessionmaker(test_db_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        for i in range(5):
+            category = Category(name=f"Category {i}", system_prompt="You are helpful. " * 100)
+            category.mcp_servers = [MCPServer(name=f"s{j}", url="", type="stdio") for j in range(i % 3)]
+            session.add(category)
+        await session.commit()
+
+    async def get_db():
+        async with session_factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(categories.router, prefix="/categories")
+    app.include_router(mcp_servers.router, prefix="/mcp-servers")
+    app.dependency_overrides[deps.get_db] = get_db
+    get_category_list_cache().invalidate()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    get_category_list_cache().invalidate()
+
+
+class TestPagination:
+    """Test suite for keyset pagination and the summary projection."""
+
+    @pytest.mark.asyncio
+    async def test_pages_follow_the_next_link(self, client):
+        """Test that following Link rel=next walks every category exactly once, in id order."""
+        seen = []
+        url = "/categories/?limit=2"
+        while url:
+            response = await client.get(url)
+            assert response.status_code == 200
+            page = response.json()
+            seen += [c["id"] for c in page]
+            url = response.links.get("next", {}).get("url")
+
+        assert seen == sorted(seen) and len(set(seen)) == 5
+        assert "mcp_servers" in page[0]
+
+    @pytest.mark.asyncio
+    async def test_summary_omits_prompts_and_counts_servers(self, client):
+        """Test that summaries carry server counts but no prompt or credentials."""
+        response = await client.get("/categories/summary")
+        summaries = response.json()
+
+        assert [s["server_count"] for s in summaries] == [0, 1, 2, 0, 1]
+        assert "system_prompt" not in summaries[0] and "llm_api_key" not in summaries[0]
+
+
+class TestConditionalRequests:
+    """Test suite for ETags and cache invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_if_none_match_returns_304_until_a_write(self, client):
+        """Test that a matching ETag gets 304, and that adding a server changes the listing."""
+        first = await client.get("/categories/")
+        etag = first.headers["etag"]
+
+        cached = await client.get("/categories/", headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        created = await client.post("/mcp-servers/", json={
+            "name": "new", "url": "", "type": "stdio", "category_id": first.json()[0]["id"],
+        })
+        assert created.status_code == 200
+
+        changed = await client.get("/categories/", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert len(changed.json()[0]["mcp_servers"]) == 1
+
+
+class TestListingCacheBounds:
+    """Test suite for the size bounds of the listing cache."""
+
+    def test_least_recently_used_pages_are_dropped(self):
+        """Test that at most max_entries pages are kept, and that a read counts as a use."""
+        cache = CategoryListCache(ttl=30, max_entries=2)
+        cache.put(("full", None, 10, 0), b"[1]")
+        cache.put(("full", None, 20, 0), b"[2]")
+        cache.get(("full", None, 10, 0))
+        cache.put(("full", None, 30, 0), b"[3]")
+
+        assert cache.get(("full", None, 10, 0)) is not None
+        assert cache.get(("full", None, 20, 0)) is None
+        assert cache.get(("full", None, 30, 0)) is not None
+
+    def test_expired_pages_are_dropped_on_put(self, monkeypatch):
+        """Test that expired pages do not linger until their own key is requested again."""
+        now = [100.0]
+        monkeypatch.setattr("app.services.category_list_cache.time.monotonic", lambda: now[0])
+        cache = CategoryListCache(ttl=30, max_entries=100)
+        for after in range(10):
+            cache.put(("full", after, 10, 0), b"[]")
+
+        now[0] += 60
+        cache.put(("full", None, 10, 0), b"[]")
+
+        assert list(cache._listings) == [("full", None, 10, 0)]
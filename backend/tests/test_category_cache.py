@@ -0,0 +1,138 @@
+"""
+Unit tests for the category config cache and its invalidation.
+"""
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.models.category import Category, MCPServer
+from app.services import category_cache
+from app.services.category_cache import CategoryChangeListener, CategoryConfigCache, commit_category_change
+
+
+@pytest.fixture
+async def session_factory(test_db_engine):
+    """A session factory on in-memory SQLite holding one category with one server."""
+    factory = sessionmaker(test_db_engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        category = Category(id=1, name="Ops", system_prompt="You run ops.")
+        category.mcp_servers = [MCPServer(name="k8s", url="", type="stdio")]
+        session.add(category)
+        await session.commit()
+    return factory
+
+
+class TestReadThrough:
+    """Test suite for cached reads."""
+
+    @pytest.mark.asyncio
+    async def test_second_read_skips_the_database(self, session_factory):
+        """Test that a cached category is served even after the row is gone behind the cache's back."""
+        cache = CategoryConfigCache()
+        async with session_factory() as db:
+            first = await cache.get(db, 1)
+            await db.execute(delete(MCPServer))
+            await db.execute(delete(Category))
+            await db.commit()
+            second = await cache.get(db, 1)
+
+        assert second is first
+        assert [s.name for s in second.mcp_servers] == ["k8s"]
+
+    @pytest.mark.asyncio
+    async def test_missing_category_is_not_cached(self, session_factory):
+        """Test that unknown ids return None and are looked up again next time."""
+        cache = CategoryConfigCache()
+        async with session_factory() as db:
+            assert await cache.get(db, 2) is None
+            db.add(Category(id=2, name="Data", system_prompt="You analyse data."))
+            await db.commit()
+            assert (await cache.get(db, 2)).name == "Data"
+
+    @pytest.mark.asyncio
+    async def test_load_racing_an_invalidation_is_not_cached(self, session_factory):
+        """Test that a row read before an invalidation is returned but not kept."""
+        cache = CategoryConfigCache()
+        async with session_factory() as db:
+            original = db.execute
+
+            async def execute_then_invalidate(*args, **kwargs):
+                result = await original(*args, **kwargs)
+                cache.invalidate(1)
+                return result
+
+            with patch.object(db, "execute", execute_then_invalidate):
+                assert (await cache.get(db, 1)).name == "Ops"
+
+        assert 1 not in cache._entries
+
+    @pytest.mark.asyncio
+    async def test_load_racing_a_full_invalidation_is_not_cached(self, session_factory):
+        """Test that invalidating everything also stops loads of categories that were not cached yet."""
+        cache = CategoryConfigCache()
+        async with session_factory() as db:
+            original = db.execute
+
+            async def execute_then_invalidate(*args, **kwargs):
+                result = await original(*args, **kwargs)
+                cache.invalidate()
+                return result
+
+            with patch.object(db, "execute", execute_then_invalidate):
+                assert (await cache.get(db, 1)).name == "Ops"
+            assert 1 not in cache._entries
+
+            await cache.get(db, 1)
+        assert 1 in cache._entries
+
+    @pytest.mark.asyncio
+    async def test_generations_are_dropped_after_loads(self, session_factory):
+        """Test that invalidations leave no per-category state behind once no load is in flight."""
+        cache = CategoryConfigCache()
+        async with session_factory() as db:
+            await cache.get(db, 1)
+        for category_id in range(100):
+            cache.invalidate(category_id)
+
+        assert cache._generations == {} and cache._loading == {}
+
+
+class TestInvalidation:
+    """Test suite for versioned invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_server_write_invalidates_the_category(self, session_factory):
+        """Test that commit_category_change bumps updated_at and drops the cached entry."""
+        cache = CategoryConfigCache()
+        with patch.object(category_cache, "get_category_cache", return_value=cache):
+            async with session_factory() as db:
+                before = await cache.get(db, 1)
+                db.add(MCPServer(name="github", url="", type="stdio", category_id=1))
+                await db.flush()
+                await commit_category_change(db, 1)
+                after = await cache.get(db, 1)
+
+        assert [s.name for s in after.mcp_servers] == ["k8s", "github"]
+        assert after.updated_at >= before.updated_at  # SQLite timestamps have one-second resolution
+
+    @pytest.mark.asyncio
+    async def test_older_notification_keeps_newer_entry(self, session_factory):
+        """Test that an invalidation only drops entries loaded from an older or equal version."""
+        cache = CategoryConfigCache()
+        async with session_factory() as db:
+            await cache.get(db, 1)
+        version = cache._entries[1].version
+
+        assert cache.invalidate(1, version=version - 10) == 0
+        assert cache.invalidate(1, version=version) == 1
+
+    def test_notification_invalidates_caches(self):
+        """Test that a NOTIFY payload from another worker invalidates the category and listings."""
+        listener = CategoryChangeListener("postgresql+asyncpg://localhost/vantage")
+        with patch.object(category_cache, "_apply_change") as apply_change:
+            listener._on_notify(None, 123, "vantage_category_changed", '{"category_id": 7, "version": 1.5}')
+            listener._on_notify(None, 123, "vantage_category_changed", "not json")
+
+        apply_change.assert_called_once_with(7, 1.5)
@@ -0,0 +1,67 @@
+"""
+Unit tests for the bounded compute pool.
+"""
+
+import asyncio
+import math
+import threading
+import pytest
+from app.core.compute_pool import ComputePool, ComputePoolBusy
+
+
+class TestComputePool:
+    """Test suite for ComputePool class."""
+
+    @pytest.mark.asyncio
+    async def test_run_executes_off_loop_thread(self):
+        """Test that work runs on a pool thread and returns its result."""
+        pool = ComputePool(workers=1)
+        try:
+            thread_name = await pool.run(lambda: threading.current_thread().name)
+        finally:
+            pool.shutdown()
+
+        assert thread_name.startswith("compute")
+        assert pool.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_saturated_pool_raises_busy(self):
+        """Test that callers beyond max_pending give up after submit_timeout."""
+        pool = ComputePool(workers=1, max_pending=1, submit_timeout=0.05)
+        release = threading.Event()
+        try:
+            blocker = asyncio.create_task(pool.run(release.wait, 5))
+            await asyncio.sleep(0.01)
+            with pytest.raises(ComputePoolBusy):
+                await pool.run(lambda: None)
+            release.set()
+            assert await blocker is True
+        finally:
+            release.set()
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_waiting_caller_runs_when_slot_frees(self):
+        """Test that backpressure delays rather than rejects callers within the timeout."""
+        pool = ComputePool(workers=1, max_pending=1, submit_timeout=5)
+        release = threading.Event()
+        try:
+            blocker = asyncio.create_task(pool.run(release.wait, 5))
+            waiter = asyncio.create_task(pool.run(lambda: "ran"))
+            await asyncio.sleep(0.05)
+            assert not waiter.done()
+            release.set()
+            assert await blocker is True
+            assert await waiter == "ran"
+        finally:
+            release.set()
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_process_pool(self):
+        """Test that a process pool runs picklable module-level functions."""
+        pool = ComputePool(kind="process", workers=1)
+        try:
+            assert await pool.run(math.sqrt, 16) == 4.0
+        finally:
+            pool.shutdown()
@@ -1,12 +1,11 @@
 """
 Unit tests for the ContextService.
 
-Tests context compression and token counting functionality.
+Tests token counting, message rendering and nearest-neighbour ranking.
 """
 
-import pytest
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from app.services.context_service import ContextService
+from app.services.context_service import ContextService, nearest
 
 
 class TestContextService:
@@ -36,21 +35,6 @@ class TestContextService:
         assert "Hello" in text
         assert "Hi there!" in text
 
-    @pytest.mark.asyncio
-    async def test_compress_context_no_compression_needed(self):
-        """Test that small context is not compressed."""
-        service = ContextService()
-        messages = [
-            HumanMessage(content="Short message"),
-            AIMessage(content="Short response")
-        ]
-        
-        result = await service.compress_context(messages, "New message")
-        
-        # Should return original messages unchanged
-        assert len(result) == len(messages)
-        assert result == messages
-
     def test_system_message_extraction(self):
         """Test that system messages are correctly identified."""
         service = ContextService()
@@ -70,3 +54,9 @@ class TestContextService:
         assert "System:" in text
         assert "helpful assistant" in text
 
+    def test_nearest_returns_closest_indices(self):
+        """Test FAISS ranking used for retrieving relevant past messages."""
+        vectors = [[0.0, 0.0], [10.0, 10.0], [1.0, 1.0], [9.0, 9.0]]
+        result = nearest(vectors, [0.5, 0.5], k=2)
+        assert sorted(result) == [0, 2]
+        assert len(nearest(vectors, [0.0, 0.0], k=10)) == 4
@@ -0,0 +1,118 @@
+"""
+Unit tests for the tiered ConversationMemory.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from app.core.compute_pool import ComputePool
+from app.services.conversation_memory import ConversationMemory, allocate_budget
+from app.services.embedding_service import EmbeddingService
+
+
+def _words(text):
+    return len(text.split())
+
+
+def _embed(model_name, texts):
+    # Crude normalised bag-of-letters vectors: enough for nearest-neighbour tests
+    vectors = [[float(t.lower().count(c)) for c in "abcdefghijklmnopqrstuvwxyz"] for t in texts]
+    return [[x / (sum(y * y for y in v) ** 0.5 or 1) for x in v] for v in vectors]
+
+
+class TestAllocateBudget:
+    """Test suite for allocate_budget function."""
+
+    def test_splits_by_weight_when_all_tiers_are_hungry(self):
+        """Test that the budget is shared in proportion to weights."""
+        allocation = allocate_budget(
+            400, {"summary": 1000, "recall": 1000, "recent": 1000},
+            {"summary": 1, "recall": 1, "recent": 2},
+        )
+        assert allocation == {"summary": 100, "recall": 100, "recent": 200}
+
+    def test_redistributes_unused_budget(self):
+        """Test that budget a tier does not need goes to the others."""
+        allocation = allocate_budget(
+            400, {"summary": 20, "recall": 0, "recent": 1000},
+            {"summary": 1, "recall": 1, "recent": 2},
+        )
+        assert allocation == {"summary": 20, "recall": 0, "recent": 380}
+
+
+class TestConversationMemory:
+    """Test suite for ConversationMemory class."""
+
+    @pytest.fixture
+    def pool(self):
+        pool = ComputePool(workers=1)
+        yield pool
+        pool.shutdown()
+
+    @pytest.fixture
+    def llm(self):
+        llm = MagicMock()
+        llm.ainvoke = AsyncMock(return_value=AIMessage(content="- summary"))
+        return llm
+
+    def _memory(self, llm, pool, **kwargs):
+        defaults = dict(
+            token_budget=1000, recent_turns=2, segment_turns=2, recall_k=1,
+            count_tokens=_words,
+            embeddings=EmbeddingService("m", max_latency_ms=1, pool=pool, embed_fn=_embed),
+        )
+        return ConversationMemory(SystemMessage(content="system"), llm, **{**defaults, **kwargs})
+
+    async def _talk(self, memory, user, reply):
+        memory.start_turn(user)
+        messages = await memory.build_messages(user)
+        memory.extend([AIMessage(content=reply)])
+        return messages
+
+    @pytest.mark.asyncio
+    async def test_keeps_recent_turns_verbatim(self, llm, pool):
+        """Test that the prompt holds the system message and the recent window."""
+        memory = self._memory(llm, pool)
+        await self._talk(memory, "hello", "hi there")
+        messages = await self._talk(memory, "how are you", "fine")
+
+        assert [m.content for m in messages] == ["system", "hello", "hi there", "how are you"]
+        assert isinstance(messages[-1], HumanMessage)
+
+    @pytest.mark.asyncio
+    async def test_summarises_and_recalls_evicted_turns(self, llm, pool):
+        """Test that turns beyond the window are summarised in the background and recalled."""
+        memory = self._memory(llm, pool)
+        await self._talk(memory, "zebra zoo zigzag", "zzz")
+        await self._talk(memory, "apples", "ok")
+        await self._talk(memory, "bananas", "ok")
+        await self._talk(memory, "cherries", "ok")
+        await asyncio.sleep(0.05)  # let the background summariser finish
+
+        messages = await self._talk(memory, "zebra zoo", "noted")
+
+        llm.ainvoke.assert_awaited()
+        memory_text = messages[1].content
+        assert "- summary" in memory_text
+        assert "User: zebra zoo zigzag" in memory_text
+        assert [m.content for m in messages[2:]] == ["cherries", "ok", "zebra zoo"]
+
+    @pytest.mark.asyncio
+    async def test_trims_recent_window_to_budget(self, llm, pool):
+        """Test that older recent turns are dropped when they exceed the budget."""
+        memory = self._memory(llm, pool, token_budget=5, recent_turns=10)
+        await self._talk(memory, "one two three four five six", "seven")
+        messages = await self._talk(memory, "short", "reply")
+
+        assert [m.content for m in messages] == ["system", "short"]
+
+    @pytest.mark.asyncio
+    async def test_discard_turn_drops_failed_message(self, llm, pool):
+        """Test that a failed turn is not kept in memory."""
+        memory = self._memory(llm, pool)
+        memory.start_turn("broken")
+        memory.discard_turn()
+        messages = await self._talk(memory, "again", "ok")
+
+        assert [m.content for m in messages] == ["system", "again"]
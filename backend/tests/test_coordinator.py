@@ -0,0 +1,248 @@
+"""
+Unit tests for the coordination layer (leases, leased jobs and job workers).
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import patch
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.models.base import Base
+from app.services.coordinator import (
+    JOB_FAILED, JOB_SUCCEEDED, Coordinator, DatabaseCoordinator, InMemoryCoordinator, JobWorker, queue_key,
+)
+
+
+@pytest.fixture(params=["memory", "database"])
+async def coordinator(request):
+    """Run each test against both backends; the database one on in-memory SQLite."""
+    if request.param == "memory":
+        yield InMemoryCoordinator()
+    else:
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        yield DatabaseCoordinator(sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+        await engine.dispose()
+
+
+class TestCoordinator:
+    """Test suite for the Coordinator interface."""
+
+    def test_backends_must_implement_every_operation(self):
+        """Test that the base class and incomplete backends cannot be instantiated."""
+        class LeasesOnly(Coordinator):
+            async def acquire_lease(self, name, owner, ttl):
+                return True
+
+        with pytest.raises(TypeError):
+            Coordinator()
+        with pytest.raises(TypeError):
+            LeasesOnly()
+
+
+class TestLeases:
+    """Test suite for lease acquisition and expiry."""
+
+    @pytest.mark.asyncio
+    async def test_lease_is_exclusive_until_released(self, coordinator):
+        """Test that only one owner holds a lease, and that it can be taken after release."""
+        assert await coordinator.acquire_lease("conversation:1", "w1", 30)
+        assert not await coordinator.acquire_lease("conversation:1", "w2", 30)
+        assert await coordinator.acquire_lease("conversation:1", "w1", 30)  # renewal
+        assert await coordinator.lease_owner("conversation:1") == "w1"
+
+        await coordinator.release_lease("conversation:1", "w1")
+        assert await coordinator.acquire_lease("conversation:1", "w2", 30)
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_can_be_taken(self, coordinator):
+        """Test that a lease its owner stopped renewing passes to another worker."""
+        assert await coordinator.acquire_lease("conversation:1", "w1", 0.01)
+        await asyncio.sleep(0.02)
+
+        assert await coordinator.lease_owner("conversation:1") is None
+        assert await coordinator.acquire_lease("conversation:1", "w2", 30)
+
+
+class TestJobs:
+    """Test suite for leased jobs."""
+
+    @pytest.mark.asyncio
+    async def test_claim_complete_and_wait(self, coordinator):
+        """Test that a claimed job's result reaches the waiter and only the owner can complete it."""
+        job_id = await coordinator.enqueue("q", {"n": 1})
+        job = await coordinator.claim("q", "w1", 30)
+
+        assert job.id == job_id and job.payload == {"n": 1} and job.attempts == 1
+        assert await coordinator.claim("q", "w2", 30) is None
+        assert not await coordinator.complete(job_id, "w2", "stolen")
+        assert await coordinator.complete(job_id, "w1", "done")
+
+        result = await coordinator.wait_for(job_id, timeout=1)
+        assert result.status == JOB_SUCCEEDED
+        assert result.result == "done"
+
+    @pytest.mark.asyncio
+    async def test_lost_job_is_reclaimed_then_failed(self, coordinator):
+        """Test that a job whose worker vanished is re-queued, and failed once attempts run out."""
+        job_id = await coordinator.enqueue("q", {})
+
+        with patch("app.services.coordinator.settings.COORDINATION_JOB_MAX_ATTEMPTS", 2):
+            assert (await coordinator.claim("q", "w1", 0.01)).attempts == 1
+            await asyncio.sleep(0.02)
+            assert (await coordinator.claim("q", "w2", 0.01)).attempts == 2
+            assert not await coordinator.renew_job(job_id, "w1", 30)
+            await asyncio.sleep(0.02)
+            assert await coordinator.claim("q", "w3", 30) is None
+
+        job = await coordinator.wait_for(job_id, timeout=1)
+        assert job.status == JOB_FAILED
+        assert "worker lost" in job.result
+
+    @pytest.mark.asyncio
+    async def test_wait_timeout_abandons_the_job(self, coordinator):
+        """Test that a job with no result in time is failed, so no worker picks it up later."""
+        job_id = await coordinator.enqueue("q", {})
+
+        with pytest.raises(asyncio.TimeoutError):
+            await coordinator.wait_for(job_id, timeout=0.05)
+
+        assert await coordinator.claim("q", "w1", 30) is None
+        assert not await coordinator.abandon(job_id, "again")
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_abandons_the_job(self, coordinator):
+        """Test that cancelling the waiter fails its job, so no worker runs it for nobody."""
+        job_id = await coordinator.enqueue("q", {})
+        waiter = asyncio.create_task(coordinator.wait_for(job_id, timeout=1))
+        await asyncio.sleep(0.01)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert await coordinator.claim("q", "w1", 30) is None
+
+    @pytest.mark.asyncio
+    async def test_collected_job_is_deleted(self, coordinator):
+        """Test that a job is deleted once its waiter has the result, and kept until then."""
+        job_id = await coordinator.enqueue("q", {})
+        await coordinator.discard(job_id)
+        assert await coordinator.get_job(job_id) is not None
+
+        await coordinator.claim("q", "w1", 30)
+        await coordinator.complete(job_id, "w1", "done")
+        assert (await coordinator.wait_for(job_id, timeout=1)).result == "done"
+
+        assert await coordinator.get_job(job_id) is None
+
+    @pytest.mark.asyncio
+    async def test_completion_wakes_the_waiter(self, coordinator):
+        """Test that a waiter returns as soon as the job completes, not at the next poll."""
+        job_id = await coordinator.enqueue("q", {})
+        await coordinator.claim("q", "w1", 30)
+
+        async def finish():
+            await asyncio.sleep(0.01)
+            await coordinator.complete(job_id, "w1", "done")
+
+        with patch("app.services.coordinator.settings.COORDINATION_POLL_INTERVAL", 60):
+            finisher = asyncio.create_task(finish())
+            job = await coordinator.wait_for(job_id, timeout=1)
+            await finisher
+
+        assert job.result == "done"
+
+    @pytest.mark.asyncio
+    async def test_enqueue_signals_the_queue(self, coordinator):
+        """Test that enqueueing wakes whoever waits for work on the queue."""
+        wakeup = coordinator.wakeup(queue_key("q"))
+
+        await coordinator.enqueue("q", {})
+
+        assert wakeup.is_set()
+
+
+class TestJobWorker:
+    """Test suite for JobWorker."""
+
+    @pytest.mark.asyncio
+    async def test_worker_runs_jobs_and_records_errors(self):
+        """Test that the worker stores handler results and failures on the jobs."""
+        coordinator = InMemoryCoordinator()
+
+        async def handler(payload):
+            if payload["fail"]:
+                raise ValueError("bad input")
+            return payload["n"] * 2
+
+        with patch("app.services.coordinator.settings.COORDINATION_POLL_INTERVAL", 0.01):
+            async with JobWorker(coordinator, "q", handler, owner="w1").running():
+                ok = await coordinator.enqueue("q", {"n": 21, "fail": False})
+                bad = await coordinator.enqueue("q", {"n": 0, "fail": True})
+                ok_job = await coordinator.wait_for(ok, timeout=1)
+                bad_job = await coordinator.wait_for(bad, timeout=1)
+
+        assert ok_job.status == JOB_SUCCEEDED and ok_job.result == 42
+        assert bad_job.status == JOB_FAILED and bad_job.result == "Error: bad input"
+
+    @pytest.mark.asyncio
+    async def test_enqueue_wakes_an_idle_worker(self):
+        """Test that an idle worker claims a new job right away rather than at the next poll."""
+        coordinator = InMemoryCoordinator()
+
+        async def handler(payload):
+            return "ran"
+
+        with patch("app.services.coordinator.settings.COORDINATION_POLL_INTERVAL", 60):
+            async with JobWorker(coordinator, "q", handler, owner="w1").running():
+                await asyncio.sleep(0.01)  # the worker found nothing and is waiting
+                job_id = await coordinator.enqueue("q", {})
+                job = await coordinator.wait_for(job_id, timeout=1)
+
+        assert job.result == "ran"
+
+    @pytest.mark.asyncio
+    async def test_stopping_waits_for_running_handlers(self):
+        """Test that leaving running() returns only after the cancelled handlers have unwound."""
+        coordinator = InMemoryCoordinator()
+        started = asyncio.Event()
+        unwound = []
+
+        async def handler(payload):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            finally:
+                await asyncio.sleep(0.01)
+                unwound.append(True)
+
+        async with JobWorker(coordinator, "q", handler, owner="w1").running():
+            await coordinator.enqueue("q", {})
+            await asyncio.wait_for(started.wait(), 1)
+
+        assert unwound == [True]
+
+    @pytest.mark.asyncio
+    async def test_abandoned_job_is_stopped(self):
+        """Test that a handler whose job was abandoned by its waiter is cancelled at the next renewal."""
+        coordinator = InMemoryCoordinator()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def handler(payload):
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with patch("app.services.coordinator.settings.COORDINATION_JOB_LEASE_TTL", 0.03):
+            async with JobWorker(coordinator, "q", handler, owner="w1").running():
+                job_id = await coordinator.enqueue("q", {})
+                await asyncio.wait_for(started.wait(), 1)
+                await coordinator.abandon(job_id, "waiter cancelled")
+                await asyncio.wait_for(cancelled.wait(), 1)
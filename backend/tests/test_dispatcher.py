@@ -0,0 +1,120 @@
+"""
+Unit tests for the per-connection inbound MessageDispatcher.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock
+from app.services.dispatcher import MessageDispatcher
+
+
+class TestDispatch:
+    """Test suite for lanes and concurrency."""
+
+    @pytest.mark.asyncio
+    async def test_lane_runs_handlers_in_order_while_others_proceed(self):
+        """Test that a lane is serialised but a handler without a lane is not held up by it."""
+        dispatcher = MessageDispatcher(on_error=AsyncMock())
+        release = asyncio.Event()
+        events = []
+
+        async def chat(n):
+            events.append(f"chat{n} start")
+            await release.wait()
+            events.append(f"chat{n} end")
+
+        async def control():
+            events.append("control")
+
+        dispatcher.dispatch(lambda: chat(1), "chat")
+        dispatcher.dispatch(lambda: chat(2), "chat")
+        dispatcher.dispatch(control)
+        await asyncio.sleep(0.01)
+
+        assert events == ["chat1 start", "control"]
+
+        release.set()
+        await asyncio.sleep(0.01)
+        assert events[2:] == ["chat1 end", "chat2 start", "chat2 end"]
+        assert len(dispatcher) == 0
+
+    @pytest.mark.asyncio
+    async def test_failing_handler_is_reported(self):
+        """Test that a handler's exception goes to on_error and later messages still run."""
+        on_error = AsyncMock()
+        dispatcher = MessageDispatcher(on_error=on_error)
+        ran = []
+
+        async def broken():
+            raise ValueError("bad message")
+
+        async def fine():
+            ran.append(True)
+
+        dispatcher.dispatch(broken, "chat")
+        dispatcher.dispatch(fine, "chat")
+        await asyncio.sleep(0.01)
+
+        assert str(on_error.await_args.args[0]) == "bad message"
+        assert ran == [True]
+
+    @pytest.mark.asyncio
+    async def test_excess_messages_are_rejected(self):
+        """Test that dispatch refuses handlers beyond max_pending."""
+        dispatcher = MessageDispatcher(on_error=AsyncMock(), max_pending=2)
+        blocked = asyncio.Event()
+
+        assert dispatcher.dispatch(blocked.wait)
+        assert dispatcher.dispatch(blocked.wait)
+        assert not dispatcher.dispatch(blocked.wait)
+
+        await dispatcher.close()
+
+    @pytest.mark.asyncio
+    async def test_full_chat_lane_does_not_block_control_messages(self):
+        """Test that a backlog of chat turns leaves room for messages without a lane."""
+        dispatcher = MessageDispatcher(on_error=AsyncMock(), max_pending=2)
+        blocked = asyncio.Event()
+        handled = asyncio.Event()
+
+        assert dispatcher.dispatch(blocked.wait, "chat")
+        assert dispatcher.dispatch(blocked.wait, "chat")
+        assert not dispatcher.dispatch(blocked.wait, "chat")
+        assert dispatcher.dispatch(AsyncMock(side_effect=lambda: handled.set()))
+        await asyncio.wait_for(handled.wait(), 1)
+
+        await dispatcher.close()
+
+
+class TestCancellation:
+    """Test suite for cancelling handlers."""
+
+    @pytest.mark.asyncio
+    async def test_cancel_lane_stops_running_and_queued_handlers(self):
+        """Test that cancel_lane cancels only the lane's handlers."""
+        dispatcher = MessageDispatcher(on_error=AsyncMock())
+        blocked = asyncio.Event()
+        cancelled = []
+
+        async def chat(n):
+            try:
+                await blocked.wait()
+            except asyncio.CancelledError:
+                cancelled.append(n)
+                raise
+
+        dispatcher.dispatch(lambda: chat(1), "chat")
+        dispatcher.dispatch(lambda: chat(2), "chat")
+        dispatcher.dispatch(blocked.wait)
+        await asyncio.sleep(0.01)
+
+        assert dispatcher.cancel_lane("chat") == 2
+        await asyncio.sleep(0.01)
+
+        # The queued handler never started, so only the running one saw the cancellation
+        assert cancelled == [1]
+        assert len(dispatcher) == 1
+
+        await dispatcher.close()
+        assert len(dispatcher) == 0
@@ -0,0 +1,105 @@
+"""
+Unit tests for the content-addressed EmbeddingCache.
+"""
+
+import sqlite3
+
+import pytest
+from app.core.compute_pool import ComputePool
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_service import EmbeddingService
+
+
+class CountingEmbedder:
+    """Fake embed function that counts the texts it embeds."""
+
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, model_name, texts):
+        self.texts.extend(texts)
+        return [[float(len(t)), 0.5] for t in texts]
+
+
+class TestEmbeddingCache:
+    """Test suite for EmbeddingCache class."""
+
+    @pytest.fixture
+    def pool(self):
+        pool = ComputePool(workers=1)
+        yield pool
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_memory_tier_is_keyed_by_model(self):
+        """Test that the same text under another model is a miss."""
+        cache = EmbeddingCache()
+        await cache.put_many("a", {"hello": [1.0, 2.0]})
+
+        assert await cache.get_many("a", ["hello", "bye"]) == {"hello": [1.0, 2.0]}
+        assert await cache.get_many("b", ["hello"]) == {}
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        """Test that the memory tier holds at most max_memory_entries vectors."""
+        cache = EmbeddingCache(max_memory_entries=2)
+        cache.put_memory("m", {"a": [1.0], "b": [2.0]})
+        cache.get_memory("m", ["a"])
+        cache.put_memory("m", {"c": [3.0]})
+
+        assert set(cache.get_memory("m", ["a", "b", "c"])) == {"a", "c"}
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_restart(self, tmp_path):
+        """Test that vectors written by one cache are read back by a new one."""
+        path = str(tmp_path / "cache" / "embeddings.sqlite3")
+        first = EmbeddingCache(path=path)
+        await first.put_many("m", {"hello": [0.25, -1.5]})
+        first.close()
+
+        second = EmbeddingCache(path=path)
+        assert await second.get_many("m", ["hello", "other"]) == {"hello": [0.25, -1.5]}
+        # Disk hits are promoted to memory
+        assert second.get_memory("m", ["hello"]) == {"hello": [0.25, -1.5]}
+        second.close()
+
+    def test_disk_tier_evicts_least_recently_used(self, tmp_path, monkeypatch):
+        """Test that the disk tier holds at most max_disk_entries vectors, keeping recently read ones."""
+        clock = iter(range(1, 100))
+        monkeypatch.setattr("app.services.embedding_cache.time.time", lambda: next(clock))
+        cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite3"), max_disk_entries=2)
+        cache.put_disk("m", {"a": [1.0]})
+        cache.put_disk("m", {"b": [2.0]})
+        cache.get_disk("m", ["a"])
+        cache.put_disk("m", {"c": [3.0]})
+
+        assert set(cache.get_disk("m", ["a", "b", "c"])) == {"a", "c"}
+        cache.close()
+
+    def test_disk_tier_upgrades_older_files(self, tmp_path):
+        """Test that a cache file written without last_used is upgraded in place."""
+        path = str(tmp_path / "embeddings.sqlite3")
+        db = sqlite3.connect(path)
+        db.execute(
+            "CREATE TABLE embeddings (model TEXT NOT NULL, digest TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, digest)) WITHOUT ROWID"
+        )
+        db.commit()
+        db.close()
+
+        cache = EmbeddingCache(path=path, max_disk_entries=10)
+        cache.put_disk("m", {"a": [1.0]})
+        assert cache.get_disk("m", ["a"]) == {"a": [1.0]}
+        cache.close()
+
+    @pytest.mark.asyncio
+    async def test_service_skips_model_for_cached_texts(self, pool):
+        """Test that EmbeddingService only embeds texts missing from the cache."""
+        embedder = CountingEmbedder()
+        service = EmbeddingService("m", max_latency_ms=1, pool=pool, embed_fn=embedder, cache=EmbeddingCache())
+
+        first = await service.embed(["hello", "hi", "hello"])
+        second = await service.embed(["hi", "hey"])
+
+        assert embedder.texts == ["hello", "hi", "hey"]
+        assert first == [[5.0, 0.5], [2.0, 0.5], [5.0, 0.5]]
+        assert second == [[2.0, 0.5], [3.0, 0.5]]
@@ -0,0 +1,103 @@
+"""
+Unit tests for the micro-batching EmbeddingService.
+"""
+
+import asyncio
+import threading
+import pytest
+from app.core.compute_pool import ComputePool
+from app.services.embedding_service import EmbeddingService
+
+
+class RecordingEmbedder:
+    """Fake embed function that records each forward pass."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, model_name, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), float(i)] for i, t in enumerate(texts)]
+
+
+class TestEmbeddingService:
+    """Test suite for EmbeddingService class."""
+
+    @pytest.fixture
+    def pool(self):
+        pool = ComputePool(workers=1)
+        yield pool
+        pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_forward_pass(self, pool):
+        """Test that requests arriving within the latency window are batched."""
+        embedder = RecordingEmbedder()
+        service = EmbeddingService("m", max_batch=100, max_latency_ms=20, pool=pool, embed_fn=embedder)
+
+        a, b = await asyncio.gather(service.embed(["hello", "hi"]), service.embed(["hey"]))
+
+        assert len(embedder.calls) == 1
+        assert embedder.calls[0] == ["hello", "hi", "hey"]
+        assert [v[0] for v in a] == [5.0, 2.0]
+        assert [v[0] for v in b] == [3.0]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_texts_embedded_once(self, pool):
+        """Test that identical texts in a batch share a single embedding."""
+        embedder = RecordingEmbedder()
+        service = EmbeddingService("m", max_latency_ms=20, pool=pool, embed_fn=embedder)
+
+        a, b = await asyncio.gather(service.embed(["same"]), service.embed(["same", "other"]))
+
+        assert embedder.calls == [["same", "other"]]
+        assert a[0] == b[0]
+
+    @pytest.mark.asyncio
+    async def test_max_batch_splits_passes(self, pool):
+        """Test that a full batch flushes immediately and leftovers go in the next pass."""
+        embedder = RecordingEmbedder()
+        service = EmbeddingService("m", max_batch=2, max_latency_ms=1000, pool=pool, embed_fn=embedder)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(service.embed(["a", "b"]), service.embed(["c"]), service.embed(["d"])),
+            timeout=1,
+        )
+
+        assert embedder.calls == [["a", "b"], ["c", "d"]]
+        assert [len(r) for r in results] == [2, 1, 1]
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_all_callers(self, pool):
+        """Test that a failed forward pass fails every request in the batch."""
+        def failing(model_name, texts):
+            raise RuntimeError("model unavailable")
+
+        service = EmbeddingService("m", max_latency_ms=5, pool=pool, embed_fn=failing)
+        results = await asyncio.gather(service.embed(["a"]), service.embed(["b"]), return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_flush_in_flight_is_held_and_cancels_its_callers(self, pool):
+        """Test that a running flush is referenced by the service and cancelling it cancels the waiting callers."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(model_name, texts):
+            started.set()
+            release.wait(5)
+            return [[1.0] for _ in texts]
+
+        service = EmbeddingService("m", max_latency_ms=1, pool=pool, embed_fn=slow)
+        caller = asyncio.create_task(service.embed(["a"]))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+
+        [flush] = service._flushes
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        release.set()
+        await asyncio.sleep(0)
+        assert service._flushes == set()
@@ -0,0 +1,67 @@
+"""
+Import-time budget tests.
+
+Importing the app must not pull in the ML stack or provider SDKs; those are
+loaded on first use. Each check runs in a fresh interpreter so modules
+already imported by other tests do not hide regressions.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that must only be imported lazily
+HEAVY_MODULES = [
+    "torch",
+    "sentence_transformers",
+    "faiss",
+    "tiktoken",
+    "langchain_huggingface",
+    "langchain_community",
+    "langchain_openai",
+    "langchain_anthropic",
+    "phoenix",
+    "openinference.instrumentation.langchain",
+]
+
+# Wall-clock budget for `import app.main`, overridable on slow CI machines
+IMPORT_TIME_BUDGET = float(os.environ.get("IMPORT_TIME_BUDGET", "5.0"))
+
+
+def _run(code: str) -> str:
+    env = {**os.environ, "DATABASE_URL": os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///:memory:")}
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+class TestImportTime:
+    """Test suite for app import cost."""
+
+    def test_app_import_skips_heavy_modules(self):
+        """Test that importing app.main does not import the ML stack or provider SDKs."""
+        loaded = _run(
+            "import sys, app.main; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        assert loaded == ""
+
+    @pytest.mark.slow
+    def test_app_import_within_budget(self):
+        """Test that importing app.main stays within the import-time budget."""
+        elapsed = float(_run(
+            "import time; t0 = time.perf_counter(); import app.main; "
+            "print(time.perf_counter() - t0)"
+        ))
+        assert elapsed < IMPORT_TIME_BUDGET
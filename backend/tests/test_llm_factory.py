@@ -88,3 +88,32 @@ class TestLLMFactory:
                 provider_type="unsupported"
             )
 
+
+
+class TestPromptCaching:
+    """Test suite for prompt cache breakpoints."""
+
+    def _llm(self, llm_type):
+        llm = MagicMock(spec=["_llm_type"])
+        llm._llm_type = llm_type
+        return llm
+
+    def test_anthropic_marks_system_prefix_and_last_message(self):
+        """Test that Anthropic prompts get breakpoints on the system prompt and last message."""
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        messages = [SystemMessage(content="stable"), SystemMessage(content="memory"), HumanMessage(content="hi")]
+        marked = LLMFactory.mark_cache_breakpoints(self._llm("anthropic-chat"), messages)
+
+        assert marked[0].content == [{"type": "text", "text": "stable", "cache_control": {"type": "ephemeral"}}]
+        assert marked[1].content == "memory"
+        assert marked[2].content[-1]["cache_control"] == {"type": "ephemeral"}
+        # The caller's messages (e.g. graph state) are left untouched
+        assert messages[0].content == "stable"
+
+    def test_other_providers_are_unchanged(self):
+        """Test that providers with automatic prefix caching get the messages as-is."""
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        messages = [SystemMessage(content="stable"), HumanMessage(content="hi")]
+        assert LLMFactory.mark_cache_breakpoints(self._llm("openai-chat"), messages) is messages
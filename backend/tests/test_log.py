@@ -0,0 +1,94 @@
+"""
+Unit tests for the structured logging helpers.
+
+Tests lazy previews, sampling, per-logger budgets and JSON output.
+"""
+
+import json
+import logging
+from unittest.mock import patch
+from app.core.log import BudgetFilter, JsonFormatter, SamplingFilter, build_queue_logging, preview
+
+
+def _record(name="app.agent", level=logging.INFO, msg="hello", **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, (), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class TestPreview:
+    """Test suite for lazy log previews."""
+
+    def test_preview_is_lazy(self):
+        """Test that the wrapped value is not stringified until formatted."""
+        class Exploding:
+            def __str__(self):
+                raise AssertionError("formatted eagerly")
+
+        logger = logging.getLogger("tests.preview")
+        logger.setLevel(logging.INFO)
+        logger.debug("value: %s", preview(Exploding()))
+
+    def test_preview_truncates(self):
+        """Test that long values are truncated with a length hint."""
+        assert str(preview("a" * 10, 4)) == "aaaa... (+6 chars)"
+        assert str(preview("short", 10)) == "short"
+        assert str(preview("", 10)) == "(empty)"
+
+
+class TestFilters:
+    """Test suite for sampling and budget filters."""
+
+    def test_sampling_keeps_warnings(self):
+        """Test that warnings always pass and info records are sampled."""
+        sampler = SamplingFilter(rate=0.0)
+        assert sampler.filter(_record(level=logging.WARNING)) is True
+        assert sampler.filter(_record(level=logging.INFO)) is False
+
+    def test_budget_limits_per_logger(self):
+        """Test that a logger prefix is capped per interval and reports suppressed records."""
+        budget = BudgetFilter({"app.agent": 2}, interval=60)
+        results = [budget.filter(_record(name="app.agent.tools")) for _ in range(4)]
+        assert results == [True, True, False, False]
+        assert budget.filter(_record(name="app.chat")) is True
+        assert budget.filter(_record(name="app.agent", level=logging.ERROR)) is True
+
+        with patch("app.core.log.time.monotonic", return_value=10**9):
+            record = _record(name="app.agent")
+            assert budget.filter(record) is True
+            assert record.suppressed == 2
+
+
+class TestJsonLogging:
+    """Test suite for JSON formatting and queue-based handling."""
+
+    def test_json_formatter_includes_extra(self):
+        """Test that extra fields are rendered as JSON keys."""
+        line = JsonFormatter().format(_record(msg="done", tool="list_pods", duration_s=0.5))
+        payload = json.loads(line)
+        assert payload["message"] == "done"
+        assert payload["logger"] == "app.agent"
+        assert payload["tool"] == "list_pods"
+        assert payload["duration_s"] == 0.5
+
+    def test_queue_handler_defers_formatting(self):
+        """Test that records are enqueued unformatted and emitted by the listener."""
+        emitted = []
+
+        class Collector(logging.Handler):
+            def emit(self, record):
+                emitted.append(self.format(record))
+
+        handler, listener = build_queue_logging(Collector())
+        record = _record(msg="value=%s")
+        record.args = (preview("x" * 50, 5),)
+
+        handler.handle(record)
+        queued = handler.queue.get_nowait()
+        assert queued.msg == "value=%s"
+
+        handler.queue.put_nowait(queued)
+        listener.start()
+        listener.stop()
+        assert emitted == ["value=xxxxx... (+45 chars)"]
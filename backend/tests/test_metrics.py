@@ -0,0 +1,76 @@
+"""
+Unit tests for Prometheus metrics helpers and the /metrics endpoint.
+"""
+
+from unittest.mock import MagicMock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from prometheus_client import REGISTRY
+from app.api.endpoints import metrics as metrics_endpoint
+from app.core.metrics import llm_labels, record_llm_call, record_tool_call
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics:
+    """Test suite for metrics recording helpers."""
+
+    def test_llm_labels_unwraps_bound_models(self):
+        """Test that provider/model labels come from the wrapped chat model."""
+        chat_model = MagicMock(spec=["_llm_type", "model_name"])
+        chat_model._llm_type = "openai-chat"
+        chat_model.model_name = "gpt-4o"
+        bound = MagicMock(spec=["bound"])
+        bound.bound = chat_model
+
+        assert llm_labels(bound) == ("openai-chat", "gpt-4o")
+
+    def test_record_llm_call_counts_tokens(self):
+        """Test that latency and usage_metadata token counts are recorded."""
+        llm = MagicMock(spec=["_llm_type", "model_name"])
+        llm._llm_type = "anthropic-chat"
+        llm.model_name = "claude-test"
+        labels = {"provider": "anthropic-chat", "model": "claude-test", "operation": "agent"}
+        response = AIMessage(
+            content="hi",
+            usage_metadata={
+                "input_tokens": 100,
+                "output_tokens": 20,
+                "total_tokens": 120,
+                "input_token_details": {"cache_read": 80},
+            },
+        )
+        before_count = _sample("vantage_llm_request_seconds_count", **labels)
+        before_cached = _sample("vantage_llm_tokens_total", kind="cache_read", **labels)
+
+        record_llm_call(llm, "agent", 1.5, response)
+
+        assert _sample("vantage_llm_request_seconds_count", **labels) == before_count + 1
+        assert _sample("vantage_llm_tokens_total", kind="input_tokens", **labels) >= 100
+        assert _sample("vantage_llm_tokens_total", kind="cache_read", **labels) == before_cached + 80
+
+    def test_record_tool_call_tracks_errors(self):
+        """Test that tool calls are counted by outcome."""
+        record_tool_call("k8s", "list_pods_metrics_test", 0.2, ok=True)
+        record_tool_call("k8s", "list_pods_metrics_test", 0.4, ok=False)
+
+        labels = {"server": "k8s", "tool": "list_pods_metrics_test"}
+        assert _sample("vantage_tool_calls_total", outcome="success", **labels) == 1
+        assert _sample("vantage_tool_calls_total", outcome="error", **labels) == 1
+        assert _sample("vantage_tool_call_seconds_count", **labels) == 2
+
+    def test_metrics_endpoint_exposes_text_format(self):
+        """Test that /metrics serves the Prometheus exposition format."""
+        app = FastAPI()
+        app.include_router(metrics_endpoint.router)
+        response = TestClient(app).get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "vantage_active_websockets" in response.text
+        assert "# TYPE vantage_db_pool_checkouts_total counter" in response.text
+        assert "# TYPE vantage_db_pool_wait_seconds_total counter" in response.text
+        assert "# TYPE vantage_db_pool_wait_seconds_max gauge" in response.text
@@ -0,0 +1,83 @@
+"""
+Unit tests for the per-connection WebSocket OutboundQueue.
+"""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import AsyncMock
+from fastapi import WebSocketDisconnect
+from app.services.outbound import SLOW_CLIENT_CLOSE_CODE, OutboundQueue
+
+
+def _status(subtask_id, status, seq):
+    return {"type": "subtask_status_update", "task_id": "t1", "subtask_id": subtask_id, "status": status, "seq": seq}
+
+
+def _chunk(text, task_id="t1"):
+    return {"type": "task_summary_chunk", "task_id": task_id, "content": text}
+
+
+def _queued(outbound):
+    return [msg for _, msg in outbound._queue]
+
+
+class TestCoalescing:
+    """Test suite for how queued messages are combined."""
+
+    @pytest.mark.asyncio
+    async def test_status_update_replaces_queued_update_for_same_subtask(self):
+        """Test that only the latest status of a subtask stays queued, after other messages."""
+        outbound = OutboundQueue(AsyncMock())
+        await outbound.send_json(_status("a", "in_progress", 1))
+        await outbound.send_json(_status("b", "in_progress", 2))
+        await outbound.send_json(_status("a", "succeeded", 3))
+
+        assert [(m["subtask_id"], m["status"]) for m in _queued(outbound)] == [("b", "in_progress"), ("a", "succeeded")]
+
+    @pytest.mark.asyncio
+    async def test_summary_chunks_are_merged_and_superseded(self):
+        """Test that queued deltas merge, and are dropped once the complete summary is queued."""
+        outbound = OutboundQueue(AsyncMock())
+        await outbound.send_json(_chunk("Hel"))
+        await outbound.send_json(_chunk("lo"))
+        assert [m["content"] for m in _queued(outbound)] == ["Hello"]
+
+        await outbound.send_json(_chunk("x", task_id="t2"))
+        await outbound.send_json({"type": "task_completed", "task_id": "t1", "summary": "Hello world"})
+
+        assert [(m["type"], m["task_id"]) for m in _queued(outbound)] == [
+            ("task_summary_chunk", "t2"), ("task_completed", "t1"),
+        ]
+
+
+class TestWriter:
+    """Test suite for the writer task and slow clients."""
+
+    @pytest.mark.asyncio
+    async def test_messages_are_written_in_order(self):
+        """Test that the writer sends queued messages in order and drains on exit."""
+        websocket = AsyncMock()
+        async with OutboundQueue(websocket).running() as outbound:
+            for i in range(5):
+                await outbound.send_json({"type": "update", "n": i})
+
+        assert [json.loads(c.args[0])["n"] for c in websocket.send_text.await_args_list] == list(range(5))
+
+    @pytest.mark.asyncio
+    async def test_slow_client_is_disconnected(self):
+        """Test that a client whose queue reaches twice the limit is closed and further sends fail."""
+        websocket = AsyncMock()
+        blocked = asyncio.Event()
+        websocket.send_text.side_effect = lambda data: blocked.wait()
+
+        async with OutboundQueue(websocket, max_size=3).running() as outbound:
+            for i in range(6):
+                await outbound.send_json({"type": "update", "n": i})
+            await asyncio.sleep(0)
+
+            assert outbound.closed
+            websocket.close.assert_awaited_once_with(code=SLOW_CLIENT_CLOSE_CODE)
+            with pytest.raises(WebSocketDisconnect):
+                await outbound.send_json({"type": "update"})
@@ -0,0 +1,64 @@
+"""
+Unit tests for the decomposition PlanCache.
+"""
+
+import pytest
+from app.schemas.task_graph import SubtaskSpec
+from app.services.plan_cache import PlanCache, request_substitutions, tool_fingerprint
+
+
+class FakeEmbeddings:
+    """Embeds requests by their first word."""
+
+    async def embed(self, texts):
+        return [[1.0, 0.0] if t.startswith("deploy") else [0.0, 1.0] for t in texts]
+
+
+SPECS = [
+    SubtaskSpec(name="Build billing", description="Build billing", executor="system"),
+    SubtaskSpec(name="Deploy", description="Deploy billing to staging", executor="system", depends_on=["Build billing"]),
+]
+TOOLS = [{"name": "kubectl", "description": ""}]
+
+
+class TestRequestSubstitutions:
+    """Test suite for request_substitutions function."""
+
+    def test_replaced_phrases_are_returned(self):
+        """Test that swapped words between two requests are extracted."""
+        assert request_substitutions("Deploy billing to staging", "deploy search to prod") == [
+            ("billing", "search"), ("staging", "prod"),
+        ]
+
+    def test_structural_changes_are_rejected(self):
+        """Test that inserted words or large rewrites do not match."""
+        assert request_substitutions("deploy billing to staging", "deploy billing to staging and prod") is None
+        assert request_substitutions("deploy billing", "restart search") is None
+
+
+class TestPlanCache:
+    """Test suite for PlanCache class."""
+
+    @pytest.fixture
+    def cache(self):
+        return PlanCache(threshold=0.9, embeddings=FakeEmbeddings())
+
+    @pytest.mark.asyncio
+    async def test_lookup_adapts_cached_plan(self, cache):
+        """Test that a matching plan comes back with the new request's parameters."""
+        await cache.store(1, TOOLS, "deploy billing to staging", SPECS)
+
+        specs = await cache.lookup(1, TOOLS, "deploy search to staging")
+
+        assert [s.name for s in specs] == ["Build search", "Deploy"]
+        assert specs[1].depends_on == ["Build search"]
+        assert SPECS[0].name == "Build billing"
+
+    @pytest.mark.asyncio
+    async def test_plans_are_scoped_by_tool_set(self, cache):
+        """Test that a plan is not reused when the available tools differ."""
+        await cache.store(1, TOOLS, "deploy billing to staging", SPECS)
+
+        assert await cache.lookup(1, TOOLS + [{"name": "helm"}], "deploy billing to staging") is None
+        assert await cache.lookup(2, TOOLS, "deploy billing to staging") is None
+        assert tool_fingerprint(TOOLS) == tool_fingerprint(list(reversed(TOOLS)))
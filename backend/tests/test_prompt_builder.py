@@ -0,0 +1,92 @@
+"""
+Unit tests for the budget-aware PromptBuilder.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from app.services.prompt_builder import PromptBuilder, truncate_to_tokens
+
+
+def _words(text):
+    return len(text.split())
+
+
+def _render(context):
+    return f"Do the thing.\n{context}"
+
+
+class TestTruncateToTokens:
+    """Test suite for truncate_to_tokens function."""
+
+    def test_short_text_is_unchanged(self):
+        """Test that text within the limit is returned as-is."""
+        assert truncate_to_tokens("a b c", 5, _words) == "a b c"
+
+    def test_long_text_keeps_head_and_tail(self):
+        """Test that truncated text keeps both ends around an omission marker."""
+        text = " ".join(f"w{i}" for i in range(100))
+        result = truncate_to_tokens(text, 10, _words)
+
+        assert result.startswith("w0 w1")
+        assert result.endswith("w99")
+        assert "90 of 100 tokens omitted" in result
+
+
+class TestPromptBuilder:
+    """Test suite for PromptBuilder class."""
+
+    @pytest.mark.asyncio
+    async def test_small_prompt_is_sent_whole(self):
+        """Test that history and sections within budget pass through unchanged."""
+        builder = PromptBuilder("test", 1000, mode="truncate", count=_words)
+        history = [SystemMessage(content="sys"), HumanMessage(content="question")]
+
+        messages = await builder.build(history, [("[dep]", "result text")], _render)
+
+        assert messages[:2] == history
+        assert messages[-1].content == "Do the thing.\n[dep]: result text"
+        assert builder.usage["sections"] == 3
+
+    @pytest.mark.asyncio
+    async def test_oversized_result_is_truncated_to_budget(self):
+        """Test that a large dependency result is cut while a small one is kept whole."""
+        builder = PromptBuilder("test", 60, mode="truncate", weights={"sections": 1, "history": 0}, count=_words)
+        big = " ".join(f"log{i}" for i in range(500))
+
+        messages = await builder.build(
+            [HumanMessage(content="q")], [("[small]", "ok"), ("[big]", big)], _render,
+        )
+
+        prompt = messages[-1].content
+        assert "[small]: ok" in prompt
+        assert "tokens omitted" in prompt
+        assert _words(prompt) < 80
+
+    @pytest.mark.asyncio
+    async def test_history_trimmed_to_whole_recent_turns(self):
+        """Test that old turns are dropped without separating tool calls from results."""
+        builder = PromptBuilder("test", 12, mode="truncate", weights={"sections": 1, "history": 1}, count=_words)
+        history = [
+            SystemMessage(content="sys"),
+            HumanMessage(content="old question with many words in it"),
+            AIMessage(content="", tool_calls=[{"name": "t", "args": {}, "id": "1"}]),
+            ToolMessage(content="old tool output", tool_call_id="1"),
+            HumanMessage(content="new question"),
+        ]
+
+        messages = await builder.build(history, [], _render)
+
+        assert [m.content for m in messages[:-1]] == ["sys", "new question"]
+
+    @pytest.mark.asyncio
+    async def test_summarise_mode_condenses_with_llm(self):
+        """Test that summarise mode asks the LLM to condense oversized results."""
+        llm = MagicMock()
+        llm.ainvoke = AsyncMock(return_value=AIMessage(content="condensed"))
+        builder = PromptBuilder("test", 30, llm=llm, mode="summarise", weights={"sections": 1, "history": 0}, count=_words)
+
+        messages = await builder.build([], [("[big]", "x " * 200)], _render, focus="find errors")
+
+        assert messages[-1].content.endswith("[big]: condensed")
+        assert "find errors" in llm.ainvoke.await_args.args[0][0].content
@@ -0,0 +1,78 @@
+"""
+Unit tests for the semantic ResponseCache.
+"""
+
+import pytest
+from unittest.mock import patch
+from app.services import response_cache as response_cache_module
+from app.services.response_cache import ResponseCache
+
+
+class FakeEmbeddings:
+    """Embeds known questions to fixed vectors."""
+
+    VECTORS = {
+        "how do I reset my password?": [1.0, 0.0, 0.0],
+        "how can I reset my password": [0.98, 0.2, 0.0],
+        "what is the refund policy?": [0.0, 1.0, 0.0],
+    }
+
+    async def embed(self, texts):
+        return [self.VECTORS[t] for t in texts]
+
+
+class TestResponseCache:
+    """Test suite for ResponseCache class."""
+
+    @pytest.fixture
+    def cache(self):
+        return ResponseCache(threshold=0.9, max_entries=10, embeddings=FakeEmbeddings())
+
+    @pytest.mark.asyncio
+    async def test_similar_question_hits(self, cache):
+        """Test that a paraphrased question returns the cached answer."""
+        await cache.store(1, "prompt", "how do I reset my password?", "Use the reset link.")
+
+        assert await cache.lookup(1, "prompt", "how can I reset my password") == "Use the reset link."
+        assert await cache.lookup(1, "prompt", "what is the refund policy?") is None
+
+    @pytest.mark.asyncio
+    async def test_scoped_by_category_and_system_prompt(self, cache):
+        """Test that other categories and edited system prompts do not share entries."""
+        await cache.store(1, "prompt", "how do I reset my password?", "answer")
+
+        assert await cache.lookup(2, "prompt", "how do I reset my password?") is None
+        assert await cache.lookup(1, "edited prompt", "how do I reset my password?") is None
+
+    @pytest.mark.asyncio
+    async def test_entries_expire(self, cache):
+        """Test that entries are not served after their TTL."""
+        with patch.object(response_cache_module.time, "time", return_value=1000.0):
+            await cache.store(1, "prompt", "how do I reset my password?", "answer", ttl=60)
+        with patch.object(response_cache_module.time, "time", return_value=1061.0):
+            assert await cache.lookup(1, "prompt", "how do I reset my password?") is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_drops_category(self, cache):
+        """Test that invalidate removes every entry for the category."""
+        await cache.store(1, "prompt", "how do I reset my password?", "answer")
+        await cache.store(1, "other", "what is the refund policy?", "answer")
+
+        assert cache.invalidate(1) == 2
+        assert await cache.lookup(1, "prompt", "how do I reset my password?") is None
+
+    @pytest.mark.asyncio
+    async def test_zero_ttl_is_not_the_default(self, cache):
+        """Test that an explicit ttl of 0 caches nothing instead of falling back to RESPONSE_CACHE_TTL."""
+        await cache.store(1, "prompt", "how do I reset my password?", "answer", ttl=0)
+
+        assert await cache.lookup(1, "prompt", "how do I reset my password?") is None
+
+    @pytest.mark.asyncio
+    async def test_best_match_wins(self, cache):
+        """Test that the most similar cached question is served when several pass the threshold."""
+        await cache.store(1, "prompt", "how can I reset my password", "close")
+        await cache.store(1, "prompt", "what is the refund policy?", "unrelated")
+        await cache.store(1, "prompt", "how do I reset my password?", "exact")
+
+        assert await cache.lookup(1, "prompt", "how do I reset my password?") == "exact"
@@ -0,0 +1,148 @@
+"""
+Unit tests for the SchemaCompiler service.
+
+Tests JSON Schema to Pydantic compilation and model memoisation.
+"""
+
+import pytest
+from pydantic import ValidationError
+from app.services.schema_compiler import SchemaCompiler, dump_arguments, schema_fingerprint
+
+
+class TestSchemaCompiler:
+    """Test suite for SchemaCompiler class."""
+
+    def test_required_and_optional_fields(self):
+        """Test that required fields are enforced and optional ones default to None."""
+        compiler = SchemaCompiler()
+        model = compiler.compile({
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "count": {"type": "integer"},
+            },
+            "required": ["name"],
+        }, "CreateInput")
+
+        instance = model(name="svc")
+        assert instance.name == "svc"
+        assert instance.count is None
+        with pytest.raises(ValidationError):
+            model(count=3)
+
+    def test_defaults_are_preserved(self):
+        """Test that schema defaults become field defaults."""
+        compiler = SchemaCompiler()
+        model = compiler.compile({
+            "type": "object",
+            "properties": {"region": {"type": "string", "default": "us-east-1"}},
+        })
+        assert model().region == "us-east-1"
+
+    def test_nested_objects_and_typed_arrays(self):
+        """Test that nested objects compile to models and array items are typed."""
+        compiler = SchemaCompiler()
+        model = compiler.compile({
+            "type": "object",
+            "properties": {
+                "target": {
+                    "type": "object",
+                    "properties": {"host": {"type": "string"}, "port": {"type": "integer"}},
+                    "required": ["host"],
+                },
+                "ports": {"type": "array", "items": {"type": "integer"}},
+            },
+            "required": ["target"],
+        }, "DeployInput")
+
+        instance = model(target={"host": "a", "port": "8080"}, ports=["1", 2])
+        assert instance.target.port == 8080
+        assert instance.ports == [1, 2]
+        with pytest.raises(ValidationError):
+            model(target={"port": 1})
+        with pytest.raises(ValidationError):
+            model(target={"host": "a"}, ports=["not-a-number"])
+
+    def test_enum_and_union(self):
+        """Test that enums restrict values and anyOf accepts each member."""
+        compiler = SchemaCompiler()
+        model = compiler.compile({
+            "type": "object",
+            "properties": {
+                "env": {"enum": ["staging", "prod"]},
+                "limit": {"anyOf": [{"type": "integer"}, {"type": "null"}]},
+            },
+            "required": ["env"],
+        })
+
+        assert model(env="prod", limit=None).env == "prod"
+        assert model(env="staging", limit=5).limit == 5
+        with pytest.raises(ValidationError):
+            model(env="dev")
+
+    def test_refs_are_resolved(self):
+        """Test that local $defs references compile to nested models."""
+        compiler = SchemaCompiler()
+        model = compiler.compile({
+            "type": "object",
+            "$defs": {
+                "Tag": {
+                    "type": "object",
+                    "properties": {"key": {"type": "string"}, "value": {"type": "string"}},
+                    "required": ["key", "value"],
+                },
+            },
+            "properties": {"tags": {"type": "array", "items": {"$ref": "#/$defs/Tag"}}},
+        })
+
+        instance = model(tags=[{"key": "team", "value": "infra"}])
+        assert instance.tags[0].key == "team"
+        with pytest.raises(ValidationError):
+            model(tags=[{"key": "team"}])
+
+    def test_empty_schema_takes_no_arguments(self):
+        """Test that tools without an input schema compile to an empty model."""
+        compiler = SchemaCompiler()
+        model = compiler.compile({}, "PingInput")
+        assert model.model_fields == {}
+
+    def test_dump_arguments_returns_plain_data(self):
+        """Test that nested models are converted back to JSON data for MCP calls."""
+        compiler = SchemaCompiler()
+        model = compiler.compile({
+            "type": "object",
+            "properties": {
+                "target": {"type": "object", "properties": {"host": {"type": "string"}}},
+            },
+        })
+        instance = model(target={"host": "a"})
+
+        assert dump_arguments({"target": instance.target, "n": 1}) == {"target": {"host": "a"}, "n": 1}
+
+    def test_compiled_models_are_memoised(self):
+        """Test that equivalent schemas are compiled only once."""
+        compiler = SchemaCompiler()
+        schema_a = {"type": "object", "properties": {"a": {"type": "string"}}, "required": ["a"]}
+        schema_b = {"required": ["a"], "properties": {"a": {"type": "string"}}, "type": "object"}
+
+        first = compiler.compile(schema_a, "ToolInput")
+        second = compiler.compile(schema_b, "ToolInput")
+
+        assert first is second
+        assert schema_fingerprint(schema_a) == schema_fingerprint(schema_b)
+        assert compiler.hits == 1
+        assert compiler.misses == 1
+
+    def test_cache_eviction_is_bounded(self):
+        """Test that the least recently used model is evicted past max_entries."""
+        compiler = SchemaCompiler(max_entries=2)
+        schemas = [
+            {"type": "object", "properties": {f"field{i}": {"type": "string"}}}
+            for i in range(3)
+        ]
+        first = compiler.compile(schemas[0])
+        compiler.compile(schemas[1])
+        compiler.compile(schemas[2])
+
+        assert len(compiler) == 2
+        assert compiler.compile(schemas[0]) is not first
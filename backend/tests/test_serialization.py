@@ -0,0 +1,67 @@
+"""
+Unit tests for the JSON serialisation helpers.
+"""
+
+import json
+
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core import serialization
+from app.core.serialization import FastJSONResponse, dumps, dumps_text, loads, send_json
+from app.schemas.task_graph import Subtask, SubtaskExecutor, SubtaskStatus
+
+
+def _subtask():
+    return Subtask(
+        id="a", name="Fetch", description="Fetch the logs", executor=SubtaskExecutor.SYSTEM,
+        dependencies=[], status=SubtaskStatus.SUCCEEDED, result="Größe: 42 " * 3,
+    )
+
+
+class TestDumps:
+    """Test suite for dumps and loads."""
+
+    def test_models_and_enums_are_serialised(self):
+        """Test that Pydantic models inside messages serialise like model_dump_json."""
+        subtask = _subtask()
+        msg = {"type": "subtask_added", "subtask": subtask, "status": SubtaskStatus.PENDING}
+
+        decoded = loads(dumps(msg))
+
+        assert decoded["subtask"] == json.loads(subtask.model_dump_json())
+        assert decoded["status"] == "pending"
+
+    def test_stdlib_fallback_matches(self):
+        """Test that without orjson the output decodes to the same value, non-ASCII unescaped."""
+        msg = {"subtask": _subtask(), "n": 1}
+        fast = dumps_text(msg)
+
+        with patch.object(serialization, "orjson", None):
+            slow = dumps_text(msg)
+            assert "Größe" in slow
+            assert loads(slow) == loads(fast)
+
+    def test_unknown_types_raise(self):
+        """Test that objects without a JSON form still fail loudly."""
+        with pytest.raises(TypeError):
+            dumps({"x": object()})
+
+
+class TestResponses:
+    """Test suite for the response class and WebSocket helper."""
+
+    def test_response_renders_compact_json(self):
+        """Test that FastJSONResponse renders with dumps."""
+        response = FastJSONResponse({"message": "hi", "items": [1, 2]})
+
+        assert response.body == b'{"message":"hi","items":[1,2]}'
+        assert response.media_type == "application/json"
+
+    @pytest.mark.asyncio
+    async def test_send_json_sends_text(self):
+        """Test that send_json writes one text frame."""
+        websocket = AsyncMock()
+
+        await send_json(websocket, {"type": "chat_response", "content": "hi"})
+
+        websocket.send_text.assert_awaited_once_with('{"type":"chat_response","content":"hi"}')
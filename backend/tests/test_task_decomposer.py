@@ -4,12 +4,45 @@ Unit tests for the TaskDecomposer service.
 Tests task decomposition logic and DAG validation.
 """
 
+import json
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import AIMessageChunk
+from app.services.plan_cache import PlanCache
 from app.services.task_decomposer import TaskDecomposer
 from app.schemas.task_graph import DecompositionResponse, SubtaskSpec, Subtask, SubtaskStatus
 
 
+class FakeEmbeddings:
+    """Embeds every request to the same vector, so any plan matches."""
+
+    async def embed(self, texts):
+        return [[1.0, 0.0] for _ in texts]
+
+
+class StreamingLLM:
+    """Streams a JSON payload a few characters per chunk and counts chunks sent."""
+
+    def __init__(self, payload, chunk_size=7):
+        self.text = json.dumps(payload)
+        self.chunk_size = chunk_size
+        self.sent = 0
+
+    async def astream(self, messages):
+        for i in range(0, len(self.text), self.chunk_size):
+            self.sent += 1
+            yield AIMessageChunk(content=self.text[i:i + self.chunk_size])
+
+
+@pytest.fixture(autouse=True)
+def plan_cache():
+    """Give each test an empty plan cache that does not load the embedding model."""
+    cache = PlanCache(threshold=0.9, embeddings=FakeEmbeddings())
+    with patch('app.services.task_decomposer.get_plan_cache', return_value=cache):
+        yield cache
+
+
 class TestTaskDecomposer:
     """Test suite for TaskDecomposer class."""
 
@@ -164,3 +197,104 @@ class TestTaskDecomposer:
         # Assert
         assert is_valid is True
 
+
+    @pytest.mark.asyncio
+    async def test_repeated_request_reuses_cached_plan(self):
+        """Test that a near-identical request is planned from the cache without the LLM."""
+        mock_category = MagicMock()
+        mock_category.id = 1
+        mock_response = DecompositionResponse(
+            should_decompose=True,
+            reasoning="Multi-step deployment",
+            subtasks=[
+                SubtaskSpec(name="Build billing", description="Build the billing image", executor="system", tools=["tool1"]),
+                SubtaskSpec(name="Deploy billing", description="Deploy billing to staging", executor="system",
+                            depends_on=["Build billing"], tools=["tool1"]),
+            ],
+        )
+        mock_structured = AsyncMock()
+        mock_structured.ainvoke.return_value = mock_response
+        mock_llm = MagicMock()
+        mock_llm.with_structured_output.return_value = mock_structured
+        tools = [{"name": "tool1", "description": "Tool 1"}]
+
+        with patch('app.services.task_decomposer.LLMFactory.create_llm', return_value=mock_llm):
+            first = await TaskDecomposer.maybe_decompose("deploy billing to staging", [], mock_category, tools)
+            second = await TaskDecomposer.maybe_decompose("deploy search to staging", [], mock_category, tools)
+
+        assert mock_structured.ainvoke.await_count == 1
+        assert [s.name for s in second.subtasks] == ["Build search", "Deploy search"]
+        assert second.subtasks[1].description == "Deploy search to staging"
+        assert second.subtasks[1].dependencies == [second.subtasks[0].id]
+        assert {s.id for s in first.subtasks}.isdisjoint(s.id for s in second.subtasks)
+        assert second.task_id != first.task_id
+
+
+class TestStreamingDecomposition:
+    """Test suite for incremental decomposition with on_subtask."""
+
+    @pytest.mark.asyncio
+    async def test_subtasks_are_emitted_while_plan_streams(self):
+        """Test that each subtask is reported once it and its dependencies are complete."""
+        llm = StreamingLLM({
+            "should_decompose": True,
+            "reasoning": "Several steps",
+            "subtasks": [
+                {"name": "Fetch", "description": "Fetch data", "executor": "system", "depends_on": [], "tools": ["tool1"]},
+                {"name": "Report", "description": "Write report", "executor": "system",
+                 "depends_on": ["Fetch", "Check"], "tools": []},
+                {"name": "Check", "description": "Check data", "executor": "user", "depends_on": ["Fetch"], "tools": []},
+                {"name": "Notify", "description": "Notify team", "executor": "system", "depends_on": [], "tools": []},
+            ],
+        })
+        events = []
+
+        async def on_subtask(task_id, subtask):
+            events.append((task_id, subtask.name, list(subtask.dependencies), llm.sent))
+
+        with patch('app.services.task_decomposer.LLMFactory.create_llm', return_value=llm):
+            result = await TaskDecomposer.maybe_decompose(
+                "Build the report", [], MagicMock(), [{"name": "tool1", "description": "Tool 1"}], on_subtask=on_subtask,
+            )
+
+        total_chunks = llm.sent
+        ids = {s.name: s.id for s in result.subtasks}
+        assert [e[1] for e in events] == ["Fetch", "Check", "Report", "Notify"]
+        assert {e[0] for e in events} == {result.task_id}
+        assert events[0][3] < total_chunks  # the first subtask arrives before the plan is finished
+        assert events[2][2] == [ids["Fetch"], ids["Check"]]
+        assert [s.name for s in result.subtasks] == ["Fetch", "Report", "Check", "Notify"]
+
+    @pytest.mark.asyncio
+    async def test_streaming_stops_when_not_decomposing(self):
+        """Test that the stream is abandoned once the model decides not to decompose."""
+        llm = StreamingLLM({"should_decompose": False, "reasoning": "x" * 500, "subtasks": []})
+        on_subtask = AsyncMock()
+
+        with patch('app.services.task_decomposer.LLMFactory.create_llm', return_value=llm):
+            result = await TaskDecomposer.maybe_decompose("What is Python?", [], MagicMock(), [], on_subtask=on_subtask)
+
+        assert result is None
+        on_subtask.assert_not_awaited()
+        assert llm.sent * llm.chunk_size < len(llm.text)
+
+    @pytest.mark.asyncio
+    async def test_malformed_streamed_spec_is_left_to_the_final_parse(self):
+        """Test that an invalid spec stops streaming without raising, and the final parse decides the plan."""
+        llm = StreamingLLM({
+            "should_decompose": True,
+            "reasoning": "Several steps",
+            "subtasks": [
+                {"name": "Fetch", "description": "Fetch data", "executor": "system", "depends_on": [], "tools": []},
+                {"name": "Check", "executor": "user"},
+                {"name": "Notify", "description": "Notify team", "executor": "system", "depends_on": [], "tools": []},
+            ],
+        })
+        on_subtask = AsyncMock()
+
+        with patch('app.services.task_decomposer.LLMFactory.create_llm', return_value=llm):
+            result = await TaskDecomposer.maybe_decompose("Build the report", [], MagicMock(), [], on_subtask=on_subtask)
+
+        assert result is None
+        assert [c.args[1].name for c in on_subtask.await_args_list] == ["Fetch"]
+        assert llm.sent * llm.chunk_size >= len(llm.text)  # the plan was read to the end
@@ -0,0 +1,186 @@
+"""
+Unit tests for the TaskExecutor final summary (map-reduce and streaming), ready-subtask accounting
+and subtask placement.
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from app.core.metrics import READY_SUBTASKS
+from app.schemas.task_graph import Subtask, SubtaskExecutor, SubtaskStatus, TaskGraph
+from app.services.coordinator import InMemoryCoordinator
+from app.services.task_executor import TaskExecutor
+
+
+class WordTokenizer:
+    """Counts whitespace-separated words as tokens."""
+
+    def encode(self, text):
+        return text.split()
+
+
+class FakeLLM:
+    """Condenses to a fixed string and streams a fixed final answer."""
+
+    def __init__(self):
+        self.condensed = []
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.condensed.append(messages[-1].content)
+        return AIMessage(content="short version")
+
+    async def astream(self, messages):
+        self.prompts.append(messages)
+        for piece in ["Final ", "answer."]:
+            yield AIMessageChunk(content=piece)
+
+
+@pytest.fixture(autouse=True)
+def word_tokens():
+    """Count tokens as words so tests do not need the tiktoken download."""
+    with patch("app.services.prompt_builder.get_tokenizer", return_value=WordTokenizer()):
+        yield
+
+
+def _user_subtask(name, dependencies=()):
+    return Subtask(
+        id=name, name=name, description=f"Do {name}", executor=SubtaskExecutor.USER,
+        dependencies=list(dependencies), status=SubtaskStatus.PENDING,
+    )
+
+
+def _executor(llm, subtasks, coordinator=None):
+    websocket = AsyncMock()
+    graph = TaskGraph(task_id="t1", user_message="Summarise the logs", subtasks=subtasks)
+    executor = TaskExecutor(
+        graph, [], llm, [HumanMessage(content="Summarise the logs")], websocket, coordinator=coordinator, queue="q",
+    )
+    return executor, websocket
+
+
+def _sent(websocket, msg_type):
+    return [c.args[0] for c in websocket.send_json.await_args_list if c.args[0]["type"] == msg_type]
+
+
+class TestFinalSummary:
+    """Test suite for the incremental map-reduce final summary."""
+
+    @pytest.mark.asyncio
+    async def test_large_results_are_condensed_before_the_reduce(self):
+        """Test that a long result is condensed when its subtask succeeds and the summary uses the condensed text."""
+        llm = FakeLLM()
+        executor, websocket = _executor(llm, [_user_subtask("a"), _user_subtask("b", ["a"])])
+        long_result = " ".join(f"line{i}" for i in range(50))
+
+        with patch("app.services.task_executor.settings.FINAL_SUMMARY_MAP_TOKENS", 10):
+            await executor.handle_user_output("a", long_result)
+            # Condensing runs in the background, before the rest of the graph is done
+            assert await executor._condensed["a"] == "short version"
+            assert llm.condensed == [long_result]
+            await executor.handle_user_output("b", "ok")
+
+        final_prompt = llm.prompts[0][-1].content
+        assert "[SUCCEEDED] a: short version" in final_prompt
+        assert "line49" not in final_prompt
+        assert "[SUCCEEDED] b: ok" in final_prompt
+
+    @pytest.mark.asyncio
+    async def test_final_answer_is_streamed(self):
+        """Test that the final answer is sent as chunks followed by task_completed."""
+        executor, websocket = _executor(FakeLLM(), [_user_subtask("a")])
+
+        await executor.handle_user_output("a", "done")
+
+        assert [m["content"] for m in _sent(websocket, "task_summary_chunk")] == ["Final ", "answer."]
+        [completed] = _sent(websocket, "task_completed")
+        assert completed["summary"] == "Final answer."
+        types = [c.args[0]["type"] for c in websocket.send_json.await_args_list]
+        assert types.index("task_completed") > types.index("task_summary_chunk")
+
+    @pytest.mark.asyncio
+    async def test_summary_waits_for_streamed_plan(self):
+        """Test that finishing every subtask does not complete the task while planning continues."""
+        executor, websocket = _executor(FakeLLM(), [])
+        executor.planning = True
+        first = _user_subtask("a")
+        executor.graph.subtasks.append(first)
+        executor._subtask_map[first.id] = first
+
+        await executor.handle_user_output("a", "done")
+        assert _sent(websocket, "task_completed") == []
+
+        await executor.finish_planning(TaskGraph(task_id="t1", user_message="Summarise the logs", subtasks=[first]))
+        assert len(_sent(websocket, "task_completed")) == 1
+
+
+    @pytest.mark.asyncio
+    async def test_summary_is_sent_once(self):
+        """Test that branches completing together and a late user output produce a single summary."""
+        llm = FakeLLM()
+        executor, websocket = _executor(llm, [_user_subtask("a"), _user_subtask("b")])
+        for subtask in executor.graph.subtasks:
+            subtask.status = SubtaskStatus.SUCCEEDED
+            subtask.result = "ok"
+
+        await asyncio.gather(executor._send_final_response(), executor._send_final_response())
+        await executor.handle_user_output("a", "late")
+
+        assert len(llm.prompts) == 1
+        assert len(_sent(websocket, "task_completed")) == 1
+
+
+class TestReadyGauge:
+    """Test suite for the ready-subtasks gauge."""
+
+    @pytest.mark.asyncio
+    async def test_gauge_is_released_when_execution_raises(self):
+        """Test that ready subtasks not reached because the loop raised are taken off the gauge."""
+        subtasks = [_user_subtask("a"), _user_subtask("b")]
+        for subtask in subtasks:
+            subtask.executor = SubtaskExecutor.SYSTEM
+        executor, _ = _executor(FakeLLM(), subtasks)
+        before = READY_SUBTASKS._value.get()
+
+        with patch.object(executor, "_execute_system_subtask", AsyncMock(side_effect=RuntimeError("boom"))):
+            with pytest.raises(RuntimeError):
+                await executor.execute_ready_subtasks()
+
+        assert READY_SUBTASKS._value.get() == before
+
+
+class TestSubtaskPlacement:
+    """Test suite for where system subtasks run."""
+
+    @pytest.mark.asyncio
+    async def test_runs_in_process_without_a_distributed_coordinator(self):
+        """Test that subtasks are not queued when no other process could claim them."""
+        coordinator = InMemoryCoordinator()
+        subtask = _user_subtask("a")
+        subtask.executor = SubtaskExecutor.SYSTEM
+        executor, _ = _executor(FakeLLM(), [subtask], coordinator)
+
+        with patch("app.services.task_executor.run_subtask", AsyncMock(return_value="ran")) as run, \
+                patch.object(coordinator, "enqueue", AsyncMock()) as enqueue:
+            await executor._execute_system_subtask(subtask)
+
+        run.assert_awaited_once()
+        enqueue.assert_not_awaited()
+        assert subtask.status == SubtaskStatus.SUCCEEDED and subtask.result == "ran"
+
+    @pytest.mark.asyncio
+    async def test_job_without_result_fails_the_subtask(self):
+        """Test that a queued subtask whose job times out is marked failed."""
+        coordinator = MagicMock(distributed=True)
+        coordinator.enqueue = AsyncMock(return_value="j1")
+        coordinator.wait_for = AsyncMock(side_effect=asyncio.TimeoutError("Job j1: no result within 900s"))
+        subtask = _user_subtask("a")
+        subtask.executor = SubtaskExecutor.SYSTEM
+        executor, _ = _executor(FakeLLM(), [subtask], coordinator)
+
+        await executor._execute_system_subtask(subtask)
+
+        assert subtask.status == SubtaskStatus.FAILED
+        assert "no result within" in subtask.result
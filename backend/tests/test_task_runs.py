@@ -0,0 +1,209 @@
+"""
+Unit tests for detached task runs (TaskChannel, TaskRun and TaskRegistry).
+"""
+
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.schemas.task_graph import TaskGraph
+from app.services.coordinator import WORKER_ID, InMemoryCoordinator
+from app.services.task_runs import TaskChannel, TaskRegistry, TaskRun, task_lease
+
+
+def _sent(websocket):
+    return [c.args[0] for c in websocket.send_json.await_args_list]
+
+
+class TestTaskChannel:
+    """Test suite for TaskChannel buffering and replay."""
+
+    @pytest.mark.asyncio
+    async def test_messages_are_numbered_and_forwarded(self):
+        """Test that messages get sequence numbers and reach the attached socket."""
+        websocket = AsyncMock()
+        channel = TaskChannel("t1", websocket)
+
+        await channel.send_json({"type": "a"})
+        await channel.send_json({"type": "b"})
+
+        assert [(m["type"], m["seq"]) for m in _sent(websocket)] == [("a", 1), ("b", 2)]
+
+    @pytest.mark.asyncio
+    async def test_disconnected_client_does_not_stop_the_task(self):
+        """Test that a failing socket is detached and later messages are buffered."""
+        websocket = AsyncMock()
+        websocket.send_json.side_effect = RuntimeError("socket closed")
+        channel = TaskChannel("t1", websocket)
+
+        await channel.send_json({"type": "a"})
+        await channel.send_json({"type": "task_completed", "summary": "done"})
+
+        assert channel.websocket is None
+        assert websocket.send_json.await_count == 1
+        assert channel.summary == "done"
+        assert [m["seq"] for m in channel.events_after(0)] == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_reconnect_replays_missed_messages(self):
+        """Test that attaching replays messages after the client's last seq, then streams live."""
+        channel = TaskChannel("t1")
+        for i in range(3):
+            await channel.send_json({"type": "update", "n": i})
+
+        websocket = AsyncMock()
+        await channel.attach(websocket, after_seq=1)
+        await channel.send_json({"type": "update", "n": 3})
+
+        assert [m["seq"] for m in _sent(websocket)] == [2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_replay_reports_dropped_messages(self):
+        """Test that the client is told when the buffer no longer holds everything it missed."""
+        channel = TaskChannel("t1", max_events=2)
+        for i in range(4):
+            await channel.send_json({"type": "update", "n": i})
+
+        websocket = AsyncMock()
+        await channel.attach(websocket, after_seq=0)
+
+        sent = _sent(websocket)
+        assert sent[0] == {"type": "task_events_truncated", "task_id": "t1", "first_seq": 3}
+        assert [m["seq"] for m in sent[1:]] == [3, 4]
+
+
+class TestTaskRegistry:
+    """Test suite for TaskRun and TaskRegistry."""
+
+    def _run(self, task_id="t1", complete=False, on_finish=None):
+        executor = MagicMock()
+        executor.graph = TaskGraph(task_id=task_id, user_message="Summarise the logs", subtasks=[])
+        executor.is_complete.return_value = complete
+        return TaskRun(executor, TaskChannel(task_id), category_id=1, on_finish=on_finish)
+
+    @pytest.mark.asyncio
+    async def test_finished_runs_are_pruned_after_retention(self):
+        """Test that finished runs are dropped once TASK_RUN_RETENTION has passed."""
+        registry = TaskRegistry()
+        finished, running = self._run("t1", complete=True), self._run("t2")
+        registry.add(finished)
+        registry.add(running)
+
+        finished.spawn(asyncio.sleep(0))
+        await asyncio.sleep(0.01)
+        assert finished.finished_at is not None
+
+        with patch("app.services.task_runs.settings.TASK_RUN_RETENTION", 0):
+            registry.add(self._run("t3"))
+
+        assert registry.get("t1") is None
+        assert registry.get("t2") is running
+
+    def test_detach_keeps_runs(self):
+        """Test that closing a socket detaches it from its runs without removing them."""
+        registry = TaskRegistry()
+        run = self._run()
+        websocket = AsyncMock()
+        run.channel.websocket = websocket
+        registry.add(run)
+
+        registry.detach(websocket)
+
+        assert registry.get("t1") is run
+        assert run.channel.websocket is None
+        assert run.snapshot().connected is False
+
+    @pytest.mark.asyncio
+    async def test_finished_run_releases_once(self):
+        """Test that on_finish is called once when a run completes, however often it is then cancelled."""
+        on_finish = MagicMock()
+        run = self._run(complete=True, on_finish=on_finish)
+
+        run.spawn(asyncio.sleep(0))
+        await asyncio.sleep(0.01)
+        run.cancel()
+
+        on_finish.assert_called_once_with()
+
+    def test_idle_runs_are_cancelled_and_dropped(self):
+        """Test that a run that sent nothing for TASK_RUN_IDLE_TIMEOUT is cancelled, released and dropped."""
+        registry = TaskRegistry()
+        on_finish = MagicMock()
+        idle, active = self._run("t1", on_finish=on_finish), self._run("t2")
+        registry.add(idle)
+        registry.add(active)
+        idle.channel.last_sent_at -= 120
+
+        with patch("app.services.task_runs.settings.TASK_RUN_IDLE_TIMEOUT", 60):
+            registry._prune()
+
+        assert registry.get("t1") is None and idle.cancelled
+        idle.executor.cancel.assert_called_once_with()
+        on_finish.assert_called_once_with()
+        assert registry.get("t2") is active and not active.cancelled
+
+    def test_old_runs_are_cancelled_and_dropped(self):
+        """Test that a run older than TASK_RUN_MAX_AGE is evicted even while it is still sending."""
+        registry = TaskRegistry()
+        run = self._run()
+        registry.add(run)
+        run.created_at -= 120
+
+        with patch("app.services.task_runs.settings.TASK_RUN_MAX_AGE", 60):
+            registry._prune()
+
+        assert registry.get("t1") is None and run.cancelled
+
+    @pytest.mark.asyncio
+    async def test_stop_cancels_unfinished_runs(self):
+        """Test that stopping the registry cancels the runs still going and releases them."""
+        registry = TaskRegistry(sweep_interval=60)
+        on_finish = MagicMock()
+        run = self._run(on_finish=on_finish)
+        registry.add(run)
+        registry.start()
+
+        await registry.stop()
+
+        assert run.cancelled
+        on_finish.assert_called_once_with()
+
+
+class TestTaskLeases:
+    """Test suite for the task leases that tell workers where a run lives."""
+
+    _run = TestTaskRegistry._run
+
+    def _coordinator(self):
+        coordinator = InMemoryCoordinator()
+        coordinator.distributed = True
+        return coordinator
+
+    @pytest.mark.asyncio
+    async def test_run_holds_its_lease_while_registered(self):
+        """Test that a registered run's task lease is held by this worker and released when it is dropped."""
+        coordinator = self._coordinator()
+        registry = TaskRegistry(coordinator=coordinator)
+        registry.add(self._run("t1"))
+        await asyncio.sleep(0.01)
+
+        assert await coordinator.lease_owner(task_lease("t1")) == WORKER_ID
+
+        registry.remove("t1")
+        await asyncio.sleep(0.01)
+        assert await coordinator.lease_owner(task_lease("t1")) is None
+
+    @pytest.mark.asyncio
+    async def test_owner_of_names_the_other_worker(self):
+        """Test that a task run elsewhere is reported with its worker, and local or unknown ones are not."""
+        coordinator = self._coordinator()
+        registry = TaskRegistry(coordinator=coordinator)
+        registry.add(self._run("t1"))
+        await coordinator.acquire_lease(task_lease("t2"), "host:2:abc", 30)
+
+        assert await registry.owner_of("t2") == "host:2:abc"
+        assert await registry.owner_of("t1") is None
+        assert await registry.owner_of("t3") is None
+
+        await registry.stop()
+        assert await coordinator.lease_owner(task_lease("t1")) is None
@@ -0,0 +1,63 @@
+"""
+Unit tests for the task status endpoints.
+"""
+
+import httpx
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi import FastAPI
+from app.api.endpoints import tasks
+from app.schemas.task_graph import TaskGraph
+from app.services.coordinator import InMemoryCoordinator
+from app.services.task_runs import TaskChannel, TaskRegistry, TaskRun, task_lease
+
+
+@pytest.fixture
+async def registry():
+    """A task registry with one local run, t1, sharing a distributed coordinator with other workers."""
+    coordinator = InMemoryCoordinator()
+    coordinator.distributed = True
+    registry = TaskRegistry(coordinator=coordinator)
+    executor = MagicMock()
+    executor.graph = TaskGraph(task_id="t1", user_message="Summarise the logs", subtasks=[])
+    executor.is_complete.return_value = False
+    registry.add(TaskRun(executor, TaskChannel("t1"), category_id=1))
+    yield registry
+    await registry.stop()
+
+
+@pytest.fixture
+async def client(registry):
+    """An API client over the task routes, backed by the registry fixture."""
+    app = FastAPI()
+    app.include_router(tasks.router, prefix="/tasks")
+    with patch("app.api.endpoints.tasks.get_task_registry", return_value=registry):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+
+class TestTaskLookup:
+    """Test suite for finding a task run across workers."""
+
+    @pytest.mark.asyncio
+    async def test_local_task_is_served(self, client):
+        """Test that a task run by this worker is returned."""
+        response = await client.get("/tasks/t1")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "pending_approval"
+
+    @pytest.mark.asyncio
+    async def test_task_on_another_worker_names_it(self, client, registry):
+        """Test that a task held by another worker is answered with 421 and that worker's id."""
+        await registry.coordinator.acquire_lease(task_lease("t2"), "host:2:abc", 30)
+
+        response = await client.get("/tasks/t2/events")
+
+        assert response.status_code == 421
+        assert response.headers["X-Task-Worker"] == "host:2:abc"
+
+    @pytest.mark.asyncio
+    async def test_unknown_task_is_not_found(self, client):
+        """Test that a task no worker holds is a 404."""
+        assert (await client.get("/tasks/t3")).status_code == 404
@@ -0,0 +1,101 @@
+"""
+Unit tests for large tool output spilling and the blob store.
+"""
+
+import os
+import time
+import pytest
+from unittest.mock import patch
+from app.core.config import settings
+from app.services.blob_store import BlobNotFound, BlobStore
+from app.services import tool_output
+from app.services.tool_output import READ_TOOL_OUTPUT, read_tool_output, spill_large_output
+
+
+class TestBlobStore:
+    """Test suite for BlobStore class."""
+
+    def test_put_is_content_addressed(self, tmp_path):
+        """Test that identical content maps to one digest and reads back."""
+        store = BlobStore(str(tmp_path))
+        digest = store.put("hello")
+
+        assert store.put("hello") == digest
+        assert store.get(digest) == "hello"
+
+    def test_unknown_or_malformed_digest_raises(self, tmp_path):
+        """Test that missing blobs and path-like refs raise BlobNotFound."""
+        store = BlobStore(str(tmp_path))
+
+        with pytest.raises(BlobNotFound):
+            store.get("0" * 64)
+        with pytest.raises(BlobNotFound):
+            store.get("../../etc/passwd")
+
+
+    def test_sweep_removes_expired_blobs_then_least_recently_used(self, tmp_path):
+        """Test that blobs past the TTL go first, then the oldest until the total fits."""
+        store = BlobStore(str(tmp_path), ttl=100, max_bytes=10)
+        expired, old, recent = store.put("a" * 4), store.put("b" * 6), store.put("c" * 6)
+        now = time.time()
+        for digest, age in ((expired, 500), (old, 50), (recent, 10)):
+            os.utime(store._path(digest), (now - age, now - age))
+
+        assert store.sweep() == 2
+        assert store.get(recent) == "c" * 6
+        for digest in (expired, old):
+            with pytest.raises(BlobNotFound):
+                store.get(digest)
+
+    def test_reading_a_blob_keeps_it(self, tmp_path):
+        """Test that a read refreshes a blob, so it outlives the TTL counted from its write."""
+        store = BlobStore(str(tmp_path), ttl=100)
+        digest = store.put("hello")
+        past = time.time() - 500
+        os.utime(store._path(digest), (past, past))
+
+        store.get(digest)
+
+        assert store.sweep() == 0
+
+
+class TestSpillLargeOutput:
+    """Test suite for tool output spilling."""
+
+    @pytest.fixture(autouse=True)
+    def store(self, tmp_path):
+        store = BlobStore(str(tmp_path))
+        with patch.object(tool_output, "get_blob_store", return_value=store), \
+             patch.object(settings, "TOOL_OUTPUT_SPILL_CHARS", 100), \
+             patch.object(settings, "TOOL_OUTPUT_PREVIEW_CHARS", 10), \
+             patch.object(settings, "TOOL_OUTPUT_PAGE_CHARS", 50):
+            yield store
+
+    @pytest.mark.asyncio
+    async def test_small_output_is_returned_inline(self):
+        """Test that outputs under the threshold are not spilled."""
+        assert await spill_large_output("logs", "short") == "short"
+
+    @pytest.mark.asyncio
+    async def test_large_output_is_replaced_by_reference(self, store):
+        """Test that a large output is stored once and replaced by a ref and preview."""
+        output = "".join(str(i % 10) for i in range(120))
+        result = await spill_large_output("logs", output)
+
+        assert len(result) < len(output) + 200
+        assert result.count(output[:10]) == 1
+        assert READ_TOOL_OUTPUT in result
+        ref = result.split('ref="')[1].split('"')[0]
+        assert store.get(ref.removeprefix("blob:")) == output
+
+    @pytest.mark.asyncio
+    async def test_read_tool_output_pages_through_content(self):
+        """Test that read_tool_output returns each page and rejects bad requests."""
+        output = "a" * 50 + "b" * 50 + "c" * 20
+        result = await spill_large_output("logs", output)
+        ref = result.split('ref="')[1].split('"')[0]
+
+        assert await read_tool_output(ref, 2) == "[Page 2 of 3]\n" + "b" * 50
+        assert (await read_tool_output(ref, 3)).endswith("c" * 20)
+        assert "out of range" in await read_tool_output(ref, 4)
+        assert "no stored output" in await read_tool_output("blob:" + "f" * 64)
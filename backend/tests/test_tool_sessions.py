@@ -0,0 +1,80 @@
+"""
+Unit tests for the process-wide MCP tool session pool.
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.schemas.category import Category
+from app.services.tool_sessions import ToolSessionPool
+
+
+def _category(updated_at=datetime(2026, 1, 1)):
+    return Category(
+        id=1, name="Ops", system_prompt="", mcp_servers=[], created_at=datetime(2026, 1, 1), updated_at=updated_at,
+    )
+
+
+@pytest.fixture
+def opened():
+    """Count session openings and closings instead of connecting to MCP servers."""
+    events = []
+
+    async def open_sessions(stack, category):
+        events.append(("open", category.updated_at))
+        stack.callback(lambda: events.append(("close", category.updated_at)))
+        return {}, [{"id": 7, "connected": True}]
+
+    bundle = MagicMock(tools=[], llm=MagicMock())
+    with patch("app.services.tool_sessions.open_mcp_sessions", open_sessions), \
+            patch("app.services.tool_sessions.AgentService.get_agent_runnable_with_sessions",
+                  AsyncMock(return_value=bundle)):
+        yield events
+
+
+class TestToolSessionPool:
+    """Test suite for ToolSessionPool sharing and release."""
+
+    @pytest.mark.asyncio
+    async def test_holders_share_sessions_until_the_last_release(self, opened):
+        """Test that sessions are opened once per category version and closed when no one holds them."""
+        pool = ToolSessionPool()
+        first = await pool.acquire(_category())
+        second = await pool.acquire(_category())
+
+        assert first is second
+        assert first.connection_status == [{"id": 7, "connected": True}]
+        first.release()
+        await asyncio.sleep(0)
+        assert opened == [("open", datetime(2026, 1, 1))]
+
+        second.release()
+        await second.close()
+        assert opened[-1] == ("close", datetime(2026, 1, 1))
+
+    @pytest.mark.asyncio
+    async def test_new_version_gets_new_sessions(self, opened):
+        """Test that a changed category opens new sessions while holders of the old ones keep them."""
+        pool = ToolSessionPool()
+        old = await pool.acquire(_category())
+        new = await pool.acquire(_category(datetime(2026, 1, 2)))
+
+        assert old is not new
+        assert [e for e in opened if e[0] == "close"] == []
+        await pool.close()
+        assert len([e for e in opened if e[0] == "close"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_open_is_raised_and_retried(self, opened):
+        """Test that an agent build error reaches the caller and the next acquire tries again."""
+        pool = ToolSessionPool()
+        with patch("app.services.tool_sessions.AgentService.get_agent_runnable_with_sessions",
+                   AsyncMock(side_effect=RuntimeError("no LLM configured"))):
+            with pytest.raises(RuntimeError, match="no LLM configured"):
+                await pool.acquire(_category())
+
+        sessions = await pool.acquire(_category())
+        assert sessions.bundle is not None
+        await pool.close()
@@ -0,0 +1,118 @@
+"""
+Unit tests for lazy tracing initialisation and span export bounding.
+"""
+
+import threading
+import time
+import pytest
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode
+from prometheus_client import REGISTRY
+from app.core import tracing
+from app.core.span_processing import BoundedSpanProcessor, CountingExporter
+
+
+def _spans(outcome):
+    return REGISTRY.get_sample_value("vantage_tracing_spans_total", {"outcome": outcome}) or 0.0
+
+
+def _dropped():
+    return _spans("dropped")
+
+
+class _BlockingExporter(InMemorySpanExporter):
+    """Exporter that holds the export thread until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def export(self, spans):
+        self.release.wait(5)
+        return super().export(spans)
+
+
+class TestSpanProcessor:
+    """Test suite for the bounded, filtering span processor."""
+
+    def test_errors_only_filter(self, monkeypatch):
+        """Test that the errors sampler exports only errored spans."""
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(BoundedSpanProcessor(exporter, tracing._keep_errors))
+        tracer = provider.get_tracer("test")
+
+        with tracer.start_as_current_span("ok"):
+            pass
+        with tracer.start_as_current_span("failed") as span:
+            span.set_status(Status(StatusCode.ERROR))
+        provider.force_flush()
+
+        assert [s.name for s in exporter.get_finished_spans()] == ["failed"]
+        provider.shutdown()
+
+    def test_full_queue_drops_instead_of_blocking(self, monkeypatch):
+        """Test that spans beyond the queue bound are dropped and counted."""
+        monkeypatch.setattr(tracing.settings, "TRACING_MAX_QUEUE_SIZE", 2)
+        monkeypatch.setattr(tracing.settings, "TRACING_EXPORT_BATCH_SIZE", 1)
+        monkeypatch.setattr(tracing.settings, "TRACING_SCHEDULE_DELAY_MS", 1)
+        exporter = _BlockingExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(BoundedSpanProcessor(exporter, tracing._keep_all))
+        tracer = provider.get_tracer("test")
+        before = _dropped()
+
+        t0 = time.time()
+        for i in range(10):
+            with tracer.start_as_current_span(f"span-{i}"):
+                pass
+        assert time.time() - t0 < 1.0
+        assert _dropped() - before == 8
+
+        exporter.release.set()
+        provider.shutdown()
+
+    def test_failure_result_is_counted_as_failed(self):
+        """Test that an exporter returning FAILURE counts its spans as export_failed, not exported."""
+        exporter = InMemorySpanExporter()
+        exporter.export = lambda spans: SpanExportResult.FAILURE
+        released = []
+        counting = CountingExporter(exporter, released.append)
+        exported, failed = _spans("exported"), _spans("export_failed")
+
+        assert counting.export([object(), object()]) == SpanExportResult.FAILURE
+        assert _spans("exported") == exported
+        assert _spans("export_failed") - failed == 2
+        assert released == [2]
+
+    def test_processor_is_an_sdk_span_processor(self):
+        """Test that hooks not overridden (e.g. _on_ending) come from the SDK base class."""
+        processor = BoundedSpanProcessor(InMemorySpanExporter(), tracing._keep_all)
+        assert isinstance(processor, SpanProcessor)
+        assert "_on_ending" not in vars(BoundedSpanProcessor)
+        processor.shutdown()
+
+
+class TestInitTracing:
+    """Test suite for tracing startup."""
+
+    @pytest.mark.asyncio
+    async def test_disabled_tracing_skips_setup(self, monkeypatch):
+        """Test that nothing is imported or configured when tracing is disabled."""
+        monkeypatch.setattr(tracing.settings, "TRACING_ENABLED", False)
+        monkeypatch.setattr(tracing, "_setup_tracing", lambda: pytest.fail("setup should not run"))
+        await tracing.init_tracing()
+
+    @pytest.mark.asyncio
+    async def test_startup_budget_is_enforced(self, monkeypatch):
+        """Test that slow tracing setup does not hold up startup past the budget."""
+        monkeypatch.setattr(tracing.settings, "TRACING_ENABLED", True)
+        monkeypatch.setattr(tracing.settings, "TRACING_STARTUP_BUDGET", 0.05)
+        monkeypatch.setattr(tracing, "_setup_tracing", lambda: time.sleep(0.5))
+
+        t0 = time.time()
+        await tracing.init_tracing()
+        assert time.time() - t0 < 0.4
+
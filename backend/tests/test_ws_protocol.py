@@ -0,0 +1,119 @@
+"""
+Unit tests for WebSocket subprotocol negotiation and the compact wire format.
+"""
+
+import json
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.services import ws_protocol
+from app.services.ws_protocol import COMPACT_JSON, COMPACT_MSGPACK, CompactState, WireCodec, negotiate
+
+
+def _status(status, result=None, prompt=None):
+    return {
+        "type": "subtask_status_update", "task_id": "t1", "subtask_id": "a",
+        "status": status, "result": result, "prompt": prompt,
+    }
+
+
+class TestCompactState:
+    """Test suite for the diffs sent to compact clients."""
+
+    def test_status_updates_carry_only_changed_fields(self):
+        """Test that result and prompt are sent once, and status always."""
+        state = CompactState()
+        prompt = "Paste this into your LLM " * 50
+
+        first = state.reduce(_status("waiting_for_user", prompt=prompt))
+        second = state.reduce(_status("succeeded", result="42", prompt=prompt))
+
+        assert first["prompt"] == prompt and first["result"] is None
+        assert second == {
+            "type": "subtask_status_update", "task_id": "t1", "subtask_id": "a",
+            "status": "succeeded", "result": "42",
+        }
+
+    def test_graph_repeats_only_new_subtask_fields(self):
+        """Test that task_graph_created leaves out subtask fields already sent by subtask_added."""
+        state = CompactState()
+        subtask = {"id": "a", "name": "Fetch", "description": "Fetch logs", "status": "pending"}
+
+        state.reduce({"type": "subtask_added", "task_id": "t1", "subtask": subtask})
+        graph = state.reduce({
+            "type": "task_graph_created", "task_id": "t1",
+            "subtasks": [subtask, {"id": "b", "name": "Report"}],
+        })
+
+        assert graph["subtasks"] == [{"id": "a"}, {"id": "b", "name": "Report"}]
+
+    def test_completed_summary_refers_to_streamed_chunks(self):
+        """Test that the summary is left out only when the chunks sent spell it exactly."""
+        state = CompactState()
+        state.reduce({"type": "task_summary_chunk", "task_id": "t1", "content": "Hello "})
+        state.reduce({"type": "task_summary_chunk", "task_id": "t1", "content": "world"})
+
+        done = state.reduce({"type": "task_completed", "task_id": "t1", "summary": "Hello world"})
+        other = state.reduce({"type": "task_completed", "task_id": "t2", "summary": "Fallback"})
+
+        assert done == {"type": "task_completed", "task_id": "t1", "summary_from_chunks": True}
+        assert other["summary"] == "Fallback"
+
+
+class TestWireCodec:
+    """Test suite for negotiation and frame encoding."""
+
+    def test_negotiate_picks_first_supported_offer(self):
+        """Test that unknown subprotocols are skipped and no offer means plain JSON."""
+        websocket = MagicMock()
+        websocket.scope = {"subprotocols": ["chat.v9", COMPACT_JSON]}
+        assert negotiate(websocket) == COMPACT_JSON
+
+        websocket.scope = {}
+        assert negotiate(websocket) is None
+
+    @pytest.mark.asyncio
+    async def test_plain_clients_get_full_messages(self):
+        """Test that without a subprotocol messages are sent unchanged as JSON text."""
+        websocket = AsyncMock()
+        msg = _status("succeeded", result="42")
+
+        await WireCodec().send(websocket, msg)
+        await WireCodec().send(websocket, msg)
+
+        assert [json.loads(c.args[0]) for c in websocket.send_text.await_args_list] == [msg, msg]
+
+    @pytest.mark.asyncio
+    async def test_compact_json_text_frames(self):
+        """Test that compact JSON clients get diffed text frames."""
+        websocket = AsyncMock()
+        codec = WireCodec(COMPACT_JSON)
+
+        await codec.send(websocket, _status("in_progress"))
+        await codec.send(websocket, _status("in_progress"))
+
+        frames = [json.loads(c.args[0]) for c in websocket.send_text.await_args_list]
+        assert frames[1] == {"type": "subtask_status_update", "task_id": "t1", "subtask_id": "a", "status": "in_progress"}
+
+    @pytest.mark.asyncio
+    async def test_msgpack_round_trip(self):
+        """Test that msgpack clients get binary frames and may send binary messages."""
+        if ws_protocol.msgpack is None:
+            pytest.skip("msgpack is not installed")
+        websocket = AsyncMock()
+        codec = WireCodec(COMPACT_MSGPACK)
+
+        await codec.send(websocket, {"type": "chat_response", "content": "hi"})
+        frame = websocket.send_bytes.await_args.args[0]
+        assert ws_protocol.msgpack.unpackb(frame) == {"type": "chat_response", "content": "hi"}
+
+        websocket.receive.return_value = {"type": "websocket.receive", "bytes": frame}
+        assert await codec.receive(websocket) == {"type": "chat_response", "content": "hi"}
+
+    @pytest.mark.asyncio
+    async def test_plain_text_is_a_chat_message(self):
+        """Test that a text frame that is not JSON is received as a chat message."""
+        websocket = AsyncMock()
+        websocket.receive.return_value = {"type": "websocket.receive", "text": "hello there"}
+
+        assert await WireCodec().receive(websocket) == {"type": "chat_message", "content": "hello there"}
@@ -120,6 +120,8 @@ export const ChatInterface = forwardRef<ChatInterfaceHandle, ChatInterfaceProps>
     const [input, setInput] = useState("");
     const [isEnhancing, setIsEnhancing] = useState(false);
     const ws = useRef<WebSocket | null>(null);
+    // Kept across reconnects so the server sees the same conversation
+    const conversationId = useRef(Math.random().toString(36).slice(2) + Date.now().toString(36));
     const messagesEndRef = useRef<HTMLDivElement>(null);
 
     useEffect(() => {
@@ -132,7 +134,7 @@ export const ChatInterface = forwardRef<ChatInterfaceHandle, ChatInterfaceProps>
           ? process.env.NEXT_PUBLIC_API_URL.replace("http", "ws").replace("/api/v1", "") + `/ws/chat/${categoryId}`
           : `ws://localhost:8000/ws/chat/${categoryId}`;
 
-        socket = new WebSocket(wsUrl);
+        socket = new WebSocket(`${wsUrl}?conversation_id=${conversationId.current}`);
 
         socket.onopen = () => {
           if (cancelled) {